@@ -1,5 +1,18 @@
+import sys
+
 import pygame
-import random
+
+from drdr64_core import (
+    GRID_WIDTH, GRID_HEIGHT, FPS, TICK_RATE,
+    BLACK, WHITE, GRAY, COLOR_MASK, VIRUS_FLAG, PILL_FLAG, PALETTE,
+    ACTION_NONE, ACTION_LEFT, ACTION_RIGHT, ACTION_DOWN, ACTION_ROTATE,
+    DrMarioGame as DrMarioRules, VersusMatch, FixedTimestep, KeyRepeat,
+)
+from drdr64_ai import BotController, PlanBudget
+from drdr64_hints import HintEngine
+from drdr64_levels import LevelBank
+from drdr64_replay import Replay, ReplayPlayer, ReplayRecorder
+from drdr64_rewind import RewindBuffer
 
 # --------------------------------------------------------
 # Configuration & Global Constants
@@ -7,375 +20,310 @@ import random
 SCREEN_WIDTH = 800  # Make it wider so we can place two grids side-by-side
 SCREEN_HEIGHT = 600
 GRID_SIZE = 20  # Each cell is 20x20 pixels
-
-# For single-player or left grid in Versus mode
-GRID_WIDTH = 10
-GRID_HEIGHT = 20
-
-FPS = 60
-INITIAL_DROP_SPEED = FPS // 2  # Capsule drop every half second initially
-
-# Colors
-BLACK  = (0, 0, 0)
-WHITE  = (255, 255, 255)
-RED    = (255, 0, 0)
-GREEN  = (0, 255, 0)
-BLUE   = (0, 0, 255)
-YELLOW = (255, 255, 0)
-GRAY   = (100, 100, 100)
-
-# Virus Count by level
-LEVEL_VIRUS_COUNTS = {
-    1: 10,
-    2: 15,
-    3: 20,
-    4: 25,
-    5: 30
-}
-MAX_LEVEL = 5
-
-pygame.init()
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Dr. Mario 64 Inspired Clone")
-clock = pygame.time.Clock()
+RENDER_FPS = FPS  # Only caps drawing; the game itself runs at TICK_RATE
+MAX_VERSUS_BOARDS = 8
+GHOST_FLAG = 0x40  # Renderer-only cell bit: hint outline, never stored in a Grid
+
+# Keyboard layouts for human players, in the order boards are handed out
+KEYMAPS = [
+    {"left": pygame.K_a, "right": pygame.K_d, "down": pygame.K_s, "rotate": pygame.K_w},
+    {"left": pygame.K_LEFT, "right": pygame.K_RIGHT, "down": pygame.K_DOWN, "rotate": pygame.K_UP},
+    {"left": pygame.K_j, "right": pygame.K_l, "down": pygame.K_k, "rotate": pygame.K_i},
+    {"left": pygame.K_KP4, "right": pygame.K_KP6, "down": pygame.K_KP5, "rotate": pygame.K_KP8},
+]
+
+# The window is only opened by init_display(), so importing this module
+# (or drdr64_core) never creates one.
+screen = None
+clock = None
+
+def init_display():
+    global screen, clock
+    if screen is None:
+        pygame.init()
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        pygame.display.set_caption("Dr. Mario 64 Inspired Clone")
+        clock = pygame.time.Clock()
+    return screen
+
+def read_actions(pressed, keymap):
+    """Translate held keys into a drdr64_core ACTION_* bitmask."""
+    actions = ACTION_NONE
+    if pressed[keymap["left"]]:
+        actions |= ACTION_LEFT
+    if pressed[keymap["right"]]:
+        actions |= ACTION_RIGHT
+    if pressed[keymap["down"]]:
+        actions |= ACTION_DOWN
+    if pressed[keymap["rotate"]]:
+        actions |= ACTION_ROTATE
+    return actions
+
+def player_actions(game, controls, pressed):
+    """
+    This tick's actions for one board. controls is either a keymap dict
+    (held keys go through the game's KeyRepeat) or a controller object
+    with an actions(game) method (e.g. drdr64_ai.BotController).
+    """
+    if isinstance(controls, dict):
+        return game.key_repeat.update(read_actions(pressed, controls))
+    return controls.actions(game)
 
 # --------------------------------------------------------
-# Block, Virus, and Grid Classes
+# Board Drawing
 # --------------------------------------------------------
-class Block:
-    def __init__(self, x, y, color):
-        self.x = x
-        self.y = y
-        self.color = color
-
-    def draw(self, surface, origin_x=0, origin_y=0):
-        """
-        origin_x, origin_y allow us to offset drawing 
-        (useful in Versus mode where each grid is offset)
-        """
-        px = origin_x + self.x * GRID_SIZE
-        py = origin_y + self.y * GRID_SIZE
-        pygame.draw.rect(surface, self.color, (px, py, GRID_SIZE, GRID_SIZE))
-
-class Virus(Block):
-    """A specialized Block that we can later expand if needed."""
-    pass
+class SpriteCache:
+    """
+    One pre-rendered Surface per cell byte (color + pill/virus kind),
+    built the first time it is needed at the current cell size and
+    thrown away when the size changes.
+    """
+    def __init__(self, cell_size=GRID_SIZE):
+        self.cell_size = cell_size
+        self.sprites = {}
+
+    def set_cell_size(self, cell_size):
+        if cell_size != self.cell_size:
+            self.cell_size = cell_size
+            self.sprites.clear()
+
+    def get(self, cell):
+        sprite = self.sprites.get(cell)
+        if sprite is None:
+            sprite = self.sprites[cell] = self.build(cell)
+        return sprite
+
+    def build(self, cell):
+        size = self.cell_size
+        color = PALETTE[cell & COLOR_MASK]
+        sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+        inset = max(1, size // 10)
+        body = pygame.Rect(inset, inset, size - 2 * inset, size - 2 * inset)
+        if cell & GHOST_FLAG:
+            # Hint ghost: just the pill's outline
+            pygame.draw.rect(sprite, color, body, max(1, size // 8), border_radius=size // 4)
+        elif cell & VIRUS_FLAG:
+            # Round body with two eyes
+            pygame.draw.circle(sprite, color, body.center, body.width // 2)
+            eye = max(1, size // 8)
+            for dx in (-1, 1):
+                center = (body.centerx + dx * size // 5, body.centery - size // 10)
+                pygame.draw.circle(sprite, WHITE, center, eye)
+                pygame.draw.circle(sprite, BLACK, center, max(1, eye // 2))
+        else:
+            # Pill half: rounded block with a highlight
+            pygame.draw.rect(sprite, color, body, border_radius=size // 4)
+            shine = pygame.Rect(body.x + inset, body.y + inset, body.width // 3, body.height // 4)
+            pygame.draw.rect(sprite, WHITE, shine, border_radius=max(1, size // 10))
+        if pygame.display.get_surface() is not None:
+            sprite = sprite.convert_alpha()
+        return sprite
+
+class BoardRenderer:
+    """
+    Draws one board incrementally. The grid lines are pre-rendered once
+    into a background Surface; each frame only cells whose contents
+    changed since the last draw are repainted, and draw() returns the
+    screen rects touched so the caller can pygame.display.update() them.
+    The HUD line sits under the board and is only re-rendered when its
+    text changes. Cells are drawn from a SpriteCache in one
+    Surface.blits() batch.
+    """
+    HUD_HEIGHT = 24
 
-class Grid:
-    """Manages the playfield, storing blocks and viruses."""
-    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT):
+    def __init__(self, width, height, origin_x=0, origin_y=0, cell_size=GRID_SIZE,
+                 sprites=None):
         self.width = width
         self.height = height
-        self.grid = [[None for _ in range(self.width)] for _ in range(self.height)]
-        self.virus_count = 0
-
-    def add_block(self, block):
-        """Add a single block (or virus) to the grid if valid."""
-        if 0 <= block.y < self.height and 0 <= block.x < self.width:
-            self.grid[block.y][block.x] = block
-
-    def remove_matches(self):
-        """
-        Remove horizontal/vertical matches of 4 or more same-colored pieces
-        Returns the number of matched blocks removed. We'll use this for scoring.
-        """
-        removed_count = 0
-        blocks_to_remove = set()
-
+        self.origin_x = origin_x
+        self.origin_y = origin_y
+        self.font = None
+        # Boards drawn at the same size can share one SpriteCache
+        self.sprites = sprites if sprites is not None else SpriteCache(cell_size)
+        self.cell_size = None
+        self.set_cell_size(cell_size)
+
+    def set_cell_size(self, cell_size):
+        """Rebuild the background and sprites for a new cell size."""
+        if cell_size == self.cell_size:
+            return
+        self.cell_size = cell_size
+        self.sprites.set_cell_size(cell_size)
+        self.font = None
+        self.background = pygame.Surface((self.width * cell_size, self.height * cell_size))
+        self.background.fill(BLACK)
         for y in range(self.height):
             for x in range(self.width):
-                if self.grid[y][x] is not None:
-                    color = self.grid[y][x].color
-
-                    # Horizontal check
-                    if x <= self.width - 4:
-                        run_length = 1
-                        for i in range(1, 4):
-                            if self.grid[y][x + i] and self.grid[y][x + i].color == color:
-                                run_length += 1
-                            else:
-                                break
-                        if run_length == 4:
-                            for i in range(4):
-                                blocks_to_remove.add((x + i, y))
-
-                    # Vertical check
-                    if y <= self.height - 4:
-                        run_length = 1
-                        for i in range(1, 4):
-                            if self.grid[y + i][x] and self.grid[y + i][x].color == color:
-                                run_length += 1
-                            else:
-                                break
-                        if run_length == 4:
-                            for i in range(4):
-                                blocks_to_remove.add((x, y + i))
-
-        # Remove blocks
-        for (rx, ry) in blocks_to_remove:
-            if isinstance(self.grid[ry][rx], Virus):
-                # Decrease virus count if a virus is removed
-                self.virus_count -= 1
-            self.grid[ry][rx] = None
-
-        removed_count = len(blocks_to_remove)
-        return removed_count
-
-    def apply_gravity(self):
-        """
-        Let any floating blocks fall down until they land on another block
-        or the bottom of the grid.
-        """
-        for y in range(self.height - 1, -1, -1):
-            for x in range(self.width):
-                if self.grid[y][x] is None:
-                    temp_y = y - 1
-                    while temp_y >= 0 and self.grid[y][x] is None:
-                        if self.grid[temp_y][x] is not None:
-                            self.grid[y][x] = self.grid[temp_y][x]
-                            self.grid[temp_y][x] = None
-                        temp_y -= 1
-
-    def draw(self, surface, origin_x=0, origin_y=0):
-        # Draw grid background (e.g., gray squares)
-        for row_index in range(self.height):
-            for col_index in range(self.width):
-                rect_x = origin_x + col_index * GRID_SIZE
-                rect_y = origin_y + row_index * GRID_SIZE
-                pygame.draw.rect(surface, GRAY, 
-                                 (rect_x, rect_y, GRID_SIZE, GRID_SIZE), 1)
-
-        # Draw blocks
-        for row in self.grid:
-            for block in row:
-                if block is not None:
-                    block.draw(surface, origin_x, origin_y)
-
-# --------------------------------------------------------
-# Capsule Class
-# --------------------------------------------------------
-class Capsule:
-    """Represents the falling pair of blocks."""
-    def __init__(self, x, y, grid_width, grid_height):
-        colors = [RED, GREEN, BLUE, YELLOW]
-        self.blocks = [
-            Block(x, y, random.choice(colors)),
-            Block(x + 1, y, random.choice(colors))
-        ]
-        self.locked = False
-        self.grid_width = grid_width
-        self.grid_height = grid_height
-
-    def move(self, dx, dy, grid):
-        if self.locked:
-            return
-        new_positions = [(b.x + dx, b.y + dy) for b in self.blocks]
-
-        if all(
-            0 <= nx < self.grid_width and 0 <= ny < self.grid_height and
-            (grid.grid[ny][nx] is None or (nx, ny) in [(bl.x, bl.y) for bl in self.blocks])
-            for (nx, ny) in new_positions
-        ):
-            for block, (nx, ny) in zip(self.blocks, new_positions):
-                block.x = nx
-                block.y = ny
-
-    def rotate(self, grid):
-        if self.locked:
-            return
-        pivot = self.blocks[0]
-        pivot_x, pivot_y = pivot.x, pivot.y
-
-        new_positions = []
-        for block in self.blocks:
-            rel_x = block.x - pivot_x
-            rel_y = block.y - pivot_y
-            # 90-degree rotation: (x, y) -> (-y, x)
-            new_x = pivot_x - rel_y
-            new_y = pivot_y + rel_x
-            new_positions.append((new_x, new_y))
-
-        # Check collision
-        if all(
-            0 <= nx < self.grid_width and 0 <= ny < self.grid_height and
-            (grid.grid[ny][nx] is None or (nx, ny) in [(b.x, b.y) for b in self.blocks])
-            for (nx, ny) in new_positions
-        ):
-            for block, (nx, ny) in zip(self.blocks, new_positions):
-                block.x = nx
-                block.y = ny
-
-    def drop(self, grid):
-        if self.locked:
-            return
-        new_positions = [(b.x, b.y + 1) for b in self.blocks]
-        can_move = True
-        for (nx, ny), block in zip(new_positions, self.blocks):
-            if ny >= self.grid_height:
-                can_move = False
-                break
-            if grid.grid[ny][nx] is not None and (nx, ny) not in [(b.x, b.y) for b in self.blocks]:
-                can_move = False
-                break
-
-        if can_move:
-            for block, (nx, ny) in zip(self.blocks, new_positions):
-                block.x = nx
-                block.y = ny
+                pygame.draw.rect(self.background, GRAY,
+                                 (x * cell_size, y * cell_size, cell_size, cell_size), 1)
+        self.hud_rect = pygame.Rect(self.origin_x,
+                                    self.origin_y + self.height * cell_size + 6,
+                                    0, self.HUD_HEIGHT)
+        self.invalidate()
+
+    def invalidate(self):
+        """Force a full redraw on the next draw() (e.g. after a screen clear)."""
+        self.shown = None
+        self.hud_text = None
+
+    def board_rect(self):
+        return pygame.Rect(self.origin_x, self.origin_y,
+                           self.width * self.cell_size, self.height * self.cell_size)
+
+    def compose(self, game):
+        """The board as it should look: grid cells, hint ghost, falling capsule."""
+        frame = bytearray(game.grid.cells)
+        if game.hints is not None:
+            for x, y, color in game.hints.hint_cells():
+                if not frame[y * self.width + x]:
+                    frame[y * self.width + x] = color | PILL_FLAG | GHOST_FLAG
+        if game.capsule and not game.capsule.locked:
+            for block in game.capsule.blocks:
+                if 0 <= block.x < self.width and 0 <= block.y < self.height:
+                    frame[block.y * self.width + block.x] = block.color | PILL_FLAG
+        return frame
+
+    def draw(self, surface, game, hud_text):
+        frame = self.compose(game)
+        rects = []
+        if self.shown is None:
+            surface.blit(self.background, (self.origin_x, self.origin_y))
+            changed = [i for i in range(len(frame)) if frame[i]]
+            rects.append(self.board_rect())
+        elif frame != self.shown:
+            shown = self.shown
+            changed = [i for i in range(len(frame)) if frame[i] != shown[i]]
         else:
-            self.locked = True
-            for block in self.blocks:
-                grid.add_block(block)
-
-    def draw(self, surface, origin_x=0, origin_y=0):
-        for block in self.blocks:
-            block.draw(surface, origin_x, origin_y)
+            changed = ()
+
+        size = self.cell_size
+        background = self.background
+        sprite = self.sprites.get
+        batch = []
+        for i in changed:
+            y, x = divmod(i, self.width)
+            area = pygame.Rect(x * size, y * size, size, size)
+            rect = area.move(self.origin_x, self.origin_y)
+            batch.append((background, rect, area))
+            if frame[i]:
+                batch.append((sprite(frame[i]), rect))
+            if self.shown is not None:
+                rects.append(rect)
+        if batch:
+            surface.blits(batch, doreturn=False)
+        self.shown = frame
+
+        if hud_text != self.hud_text:
+            rects.append(self.draw_hud(surface, hud_text))
+        return rects
+
+    def draw_hud(self, surface, text):
+        if self.font is None:
+            self.font = pygame.font.SysFont(None, min(self.HUD_HEIGHT, self.cell_size + 6))
+        text_surf = self.font.render(text, True, WHITE)
+        old_rect = self.hud_rect
+        surface.fill(BLACK, old_rect)
+        surface.blit(text_surf, old_rect.topleft)
+        self.hud_rect = pygame.Rect(old_rect.topleft, text_surf.get_size())
+        self.hud_text = text
+        return old_rect.union(self.hud_rect)
 
 # --------------------------------------------------------
 # Single Player Dr. Mario Game Class (with improved chain scoring)
 # --------------------------------------------------------
-class DrMarioGame:
-    def __init__(self, x_offset=0, y_offset=0, 
-                 grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT, 
-                 initial_level=1, player_name="Player"):
+class DrMarioGame(DrMarioRules):
+    """The drdr64_core rules plus keyboard input and pygame drawing."""
+    def __init__(self, x_offset=0, y_offset=0,
+                 grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT,
+                 initial_level=1, player_name="Player", rng=None, seed=None,
+                 cell_size=GRID_SIZE, sprites=None):
+        super().__init__(grid_width=grid_width, grid_height=grid_height,
+                         initial_level=initial_level, player_name=player_name,
+                         rng=rng, seed=seed)
         self.x_offset = x_offset
         self.y_offset = y_offset
-        self.grid_width = grid_width
-        self.grid_height = grid_height
-
-        self.grid = Grid(width=self.grid_width, height=self.grid_height)
-        self.level = initial_level
-        self.score = 0
-        self.capsule = None
-        self.drop_timer = 0
-        self.drop_speed = INITIAL_DROP_SPEED
-        self.running = True
-        self.player_name = player_name
-
-    def start_level(self, level):
-        self.level = level
-        self.grid = Grid(width=self.grid_width, height=self.grid_height)
-        self.score = 0
-        self.drop_speed = max(FPS // (2 + level // 2), 5)
-        virus_count = LEVEL_VIRUS_COUNTS.get(level, 10)
-        self.grid.virus_count = virus_count
-
-        # Place viruses randomly in lower rows
-        available_positions = [
-            (x, y) for y in range(3, self.grid_height)
-            for x in range(self.grid_width)
-        ]
-        random.shuffle(available_positions)
-        for i in range(virus_count):
-            vx, vy = available_positions[i]
-            virus_color = random.choice([RED, GREEN, BLUE, YELLOW])
-            self.grid.add_block(Virus(vx, vy, virus_color))
-
-        self.spawn_next_capsule()
-
-    def spawn_next_capsule(self):
-        self.capsule = Capsule(self.grid_width // 2 - 1, 0, 
-                               self.grid_width, self.grid_height)
-        # If it collides, game over
-        for block in self.capsule.blocks:
-            if self.grid.grid[block.y][block.x] is not None:
-                self.running = False  # Topped out
-
-    def handle_input(self, keymap):
-        """
-        keymap is a dict telling which keys correspond to left, right, rotate, drop, etc.
-        This allows us to pass unique controls for 2 players in Versus mode.
-        """
+        self.renderer = BoardRenderer(grid_width, grid_height, x_offset, y_offset,
+                                      cell_size, sprites)
+        self.key_repeat = KeyRepeat()
+        self.hints = None  # a HintEngine while hints are switched on
+
+    def read_input(self, keymap):
+        """Pump window events and return the ACTION_* bits held right now."""
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running = False
                 # In a real app, you might want to handle a global exit.
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_h:
+                self.toggle_hints()
 
         # Key states
-        pressed = pygame.key.get_pressed()
-        if pressed[keymap["left"]]:
-            self.capsule.move(-1, 0, self.grid)
-        if pressed[keymap["right"]]:
-            self.capsule.move(1, 0, self.grid)
-        if pressed[keymap["down"]]:
-            self.capsule.drop(self.grid)
-        if pressed[keymap["rotate"]]:
-            self.capsule.rotate(self.grid)
-
-    def update(self):
-        if not self.running:
-            return
-
-        self.drop_timer += 1
-        if self.drop_timer >= self.drop_speed:
-            self.capsule.drop(self.grid)
-            self.drop_timer = 0
-
-        if self.capsule.locked:
-            # Attempt chain combos
-            chain_count = 0
-            while True:
-                removed = self.grid.remove_matches()
-                if removed > 0:
-                    chain_count += 1
-                    self.grid.apply_gravity()
-                else:
-                    break
+        return read_actions(pygame.key.get_pressed(), keymap)
 
-            # Score example: (blocks_removed) + chain bonus
-            # We can do something like 100 points for first chain, 200 for second, etc.
-            if chain_count > 0:
-                # Just a simple chain bonus for demonstration
-                chain_bonus = 100 * chain_count
-                self.score += chain_bonus
-
-            # Check virus condition
-            if self.grid.virus_count <= 0:
-                # Next level or done
-                if self.level < MAX_LEVEL:
-                    self.start_level(self.level + 1)
-                else:
-                    # Completed all levels
-                    self.running = False
-                    return
+    def toggle_hints(self):
+        self.hints = None if self.hints is not None else HintEngine()
 
-            # Spawn next capsule
-            self.spawn_next_capsule()
+    def hud_text(self):
+        if self.renderer.cell_size < GRID_SIZE:
+            # Shrunk boards (N-player versus) get a short HUD
+            return f"{self.player_name} L{self.level} {self.score} V{self.grid.virus_count}"
+        return f"{self.player_name} | Lvl: {self.level} Score: {self.score} Viruses: {self.grid.virus_count}"
 
     def draw(self, surface):
-        # Draw the grid and capsule
-        self.grid.draw(surface, self.x_offset, self.y_offset)
-        if self.capsule:
-            self.capsule.draw(surface, self.x_offset, self.y_offset)
-
-        # UI text
-        font = pygame.font.SysFont(None, 24)
-        info_text = f"{self.player_name} | Lvl: {self.level} Score: {self.score} Viruses: {self.grid.virus_count}"
-        text_surf = font.render(info_text, True, WHITE)
-        surface.blit(text_surf, (self.x_offset + 10, self.y_offset + 10))
-
-    def is_game_over(self):
-        # If the grid was topped out, or viruses cleared at max level
-        return not self.running
-
-    def run_single_player(self):
-        """A simple single-player loop to show usage."""
+        """Redraw what changed since the last frame; returns the dirty rects."""
+        return self.renderer.draw(surface, self, self.hud_text())
+
+    def run_single_player(self, record_path=None, render_fps=RENDER_FPS):
+        """
+        A simple single-player loop to show usage.
+        With record_path, the game's inputs are saved there as a Replay;
+        otherwise holding BACKSPACE rewinds the last few seconds.
+        H toggles the placement hint ghost.
+        The game runs at TICK_RATE whatever render_fps is (0 = uncapped).
+        """
+        init_display()
         self.start_level(self.level)
+        recorder = ReplayRecorder(self) if record_path else None
         keymap = {
             "left": pygame.K_LEFT,
             "right": pygame.K_RIGHT,
             "down": pygame.K_DOWN,
-            "rotate": pygame.K_UP
+            "rotate": pygame.K_UP,
+            "rewind": pygame.K_BACKSPACE
         }
+        # A replay log can't be rewound, so recording turns rewind off
+        rewind = None if recorder else RewindBuffer(self)
+        if rewind:
+            rewind.capture()
 
+        screen.fill(BLACK)
+        pygame.display.flip()
+        self.renderer.invalidate()
+        timestep = FixedTimestep(TICK_RATE)
+        self.key_repeat.reset()
+        clock.tick()
         while self.running:
-            self.handle_input(keymap)
-            self.update()
+            held = self.read_input(keymap)
+            rewinding = rewind and pygame.key.get_pressed()[keymap["rewind"]]
+            for _ in range(timestep.advance(clock.tick(render_fps) / 1000)):
+                if rewinding:
+                    rewind.rewind(1)
+                    self.key_repeat.reset()
+                    continue
+                actions = self.key_repeat.update(held)
+                if recorder:
+                    recorder.step(actions)
+                else:
+                    self.step(actions)
+                    rewind.capture()
+                if not self.running:
+                    break
+
+            if self.hints is not None:
+                self.hints.update(self)
+            pygame.display.update(self.draw(screen))
 
-            screen.fill(BLACK)
-            self.draw(screen)
-            pygame.display.flip()
-            clock.tick(FPS)
+        if recorder:
+            recorder.replay.save(record_path)
 
         # Game Over or Victory
         self.show_game_over()
@@ -383,7 +331,7 @@ class DrMarioGame:
     def show_game_over(self):
         screen.fill(BLACK)
         font = pygame.font.SysFont(None, 48)
-        if self.grid.virus_count <= 0 and self.level >= MAX_LEVEL:
+        if self.has_cleared_all():
             msg = f"{self.player_name} beat the game!"
         else:
             msg = f"{self.player_name} - GAME OVER"
@@ -395,91 +343,122 @@ class DrMarioGame:
         pygame.time.wait(3000)
 
 # --------------------------------------------------------
-# Versus Dr. Mario Game (2-Player)
+# Versus Dr. Mario Game (2 to 8 Players)
 # --------------------------------------------------------
+def layout_boards(count, grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT, margin=20):
+    """
+    Fit count boards on the screen in up to four columns.
+    Returns (cell_size, [(x_offset, y_offset), ...]).
+    """
+    columns = min(count, 4)
+    rows = -(-count // columns)
+    slot_w = SCREEN_WIDTH // columns
+    slot_h = SCREEN_HEIGHT // rows
+    hud = BoardRenderer.HUD_HEIGHT + 6
+    cell_size = min(GRID_SIZE,
+                    (slot_w - 2 * margin) // grid_width,
+                    (slot_h - 2 * margin - hud) // grid_height)
+    board_w = grid_width * cell_size
+    board_h = grid_height * cell_size + hud
+    offsets = []
+    for i in range(count):
+        row, column = divmod(i, columns)
+        offsets.append((column * slot_w + (slot_w - board_w) // 2,
+                        row * slot_h + (slot_h - board_h) // 2))
+    return cell_size, offsets
+
 class VersusDrMarioGame:
     """
-    This class manages two DrMarioGame instances side by side.
+    This class manages 2 to 8 DrMarioGame boards on one screen.
     Each has its own controls, grid, score, viruses, etc.
-    The first to clear viruses wins, or if someone tops out, they lose.
-    """
-    def __init__(self):
-        # Each grid is 10 wide, 20 tall. We'll place them side by side.
-        self.player1 = DrMarioGame(
-            x_offset=50, y_offset=50,
-            grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT,
-            initial_level=1, player_name="Player 1"
-        )
-        self.player2 = DrMarioGame(
-            x_offset=400, y_offset=50,  # offset to draw on the right
-            grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT,
-            initial_level=1, player_name="Player 2"
-        )
-
-        # Define separate controls
-        self.keymap1 = {
-            "left": pygame.K_a,
-            "right": pygame.K_d,
-            "down": pygame.K_s,
-            "rotate": pygame.K_w
-        }
-        self.keymap2 = {
-            "left": pygame.K_LEFT,
-            "right": pygame.K_RIGHT,
-            "down": pygame.K_DOWN,
-            "rotate": pygame.K_UP
-        }
+    The first to clear viruses wins; a board that tops out is out, and
+    the last one standing wins.
 
+    By default two humans play (WASD and the arrow keys). Pass a
+    BotController as controls1/controls2 to let the CPU play a side, or
+    a controls list (keymap dicts and/or controllers, one per board)
+    for more boards.
+    """
+    def __init__(self, controls1=None, controls2=None, controls=None):
+        if controls is None:
+            controls = [controls1 or KEYMAPS[0], controls2 or KEYMAPS[1]]
+        if not 1 <= len(controls) <= MAX_VERSUS_BOARDS:
+            raise ValueError(f"versus takes 1 to {MAX_VERSUS_BOARDS} boards, got {len(controls)}")
+        self.controls = list(controls)
+        # Bots take turns starting their searches so they don't all land on one frame
+        self.plan_budget = PlanBudget()
+        for control in self.controls:
+            if isinstance(control, BotController) and control.budget is None:
+                control.budget = self.plan_budget
+
+        # Boards shrink to fit; they all share one set of sprites
+        cell_size, offsets = layout_boards(len(controls))
+        sprites = SpriteCache(cell_size)
+        self.players = [
+            DrMarioGame(
+                x_offset=x, y_offset=y,
+                grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT,
+                initial_level=1, player_name=f"Player {i + 1}",
+                cell_size=cell_size, sprites=sprites
+            )
+            for i, (x, y) in enumerate(offsets)
+        ]
+        self.match = VersusMatch(*self.players)
         self.running = True
 
-    def run_versus_mode(self):
-        """Main loop for 2-player battle."""
-        self.player1.start_level(1)
-        self.player2.start_level(1)
+    @property
+    def player1(self):
+        return self.players[0]
+
+    @property
+    def player2(self):
+        return self.players[1]
+
+    def step(self, pressed):
+        """One simulation tick for every board."""
+        self.plan_budget.tick()
+        self.match.step(*[player_actions(game, controls, pressed)
+                          for game, controls in zip(self.players, self.controls)])
+
+    def draw(self, surface):
+        """Redraw every board's changed cells; returns all the dirty rects."""
+        rects = []
+        for game in self.players:
+            rects += game.draw(surface)
+        return rects
+
+    def run_versus_mode(self, render_fps=RENDER_FPS):
+        """Main loop for the battle, simulated at TICK_RATE."""
+        init_display()
+        self.match.start(1)
+        screen.fill(BLACK)
+        pygame.display.flip()
+        for game in self.players:
+            game.renderer.invalidate()
+        timestep = FixedTimestep(TICK_RATE)
+        clock.tick()
 
         while self.running:
-            # Gather events once, pass to both
+            # Gather events once, for every board
             events = pygame.event.get()
             for event in events:
                 if event.type == pygame.QUIT:
                     self.running = False
 
-            # Player1 input
+            # Player input, then as many fixed ticks as real time calls for
             pressed = pygame.key.get_pressed()
-            if pressed[self.keymap1["left"]]:
-                self.player1.capsule.move(-1, 0, self.player1.grid)
-            if pressed[self.keymap1["right"]]:
-                self.player1.capsule.move(1, 0, self.player1.grid)
-            if pressed[self.keymap1["down"]]:
-                self.player1.capsule.drop(self.player1.grid)
-            if pressed[self.keymap1["rotate"]]:
-                self.player1.capsule.rotate(self.player1.grid)
-
-            # Player2 input
-            if pressed[self.keymap2["left"]]:
-                self.player2.capsule.move(-1, 0, self.player2.grid)
-            if pressed[self.keymap2["right"]]:
-                self.player2.capsule.move(1, 0, self.player2.grid)
-            if pressed[self.keymap2["down"]]:
-                self.player2.capsule.drop(self.player2.grid)
-            if pressed[self.keymap2["rotate"]]:
-                self.player2.capsule.rotate(self.player2.grid)
-
-            # Update both
-            self.player1.update()
-            self.player2.update()
-
-            # Check if either is done
-            if self.player1.is_game_over() or self.player2.is_game_over():
+            for _ in range(timestep.advance(clock.tick(render_fps) / 1000)):
+                self.step(pressed)
+                if self.match.is_over():
+                    break
+
+            # Check if the match is decided
+            if self.match.is_over():
                 self.running = False
                 break
 
-            # Render
-            screen.fill(BLACK)
-            self.player1.draw(screen)
-            self.player2.draw(screen)
-            pygame.display.flip()
-            clock.tick(FPS)
+            # Render just the cells that changed, one display update for all boards
+            pygame.display.update(self.draw(screen))
 
         # Determine winner
         self.show_winner()
@@ -488,25 +467,7 @@ class VersusDrMarioGame:
         screen.fill(BLACK)
         font = pygame.font.SysFont(None, 48)
 
-        p1_cleared = (self.player1.grid.virus_count <= 0 and self.player1.level >= MAX_LEVEL)
-        p2_cleared = (self.player2.grid.virus_count <= 0 and self.player2.level >= MAX_LEVEL)
-
-        if p1_cleared and not p2_cleared:
-            msg = "Player 1 Wins!"
-        elif p2_cleared and not p1_cleared:
-            msg = "Player 2 Wins!"
-        elif p1_cleared and p2_cleared:
-            msg = "Both Cleared! It's a tie!"
-        else:
-            # If nobody cleared all viruses, decide who lost by top-out
-            # In a full logic, you might check who topped out first.
-            # For now, we just do a simple check:
-            if self.player1.is_game_over() and not self.player2.is_game_over():
-                msg = "Player 2 Wins (P1 Topped Out)!"
-            elif self.player2.is_game_over() and not self.player1.is_game_over():
-                msg = "Player 1 Wins (P2 Topped Out)!"
-            else:
-                msg = "Both Topped Out! It's a tie!"
+        _, msg = self.match.result()
 
         text_surf = font.render(msg, True, WHITE)
         rect = text_surf.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
@@ -514,10 +475,58 @@ class VersusDrMarioGame:
         pygame.display.flip()
         pygame.time.wait(3000)
 
+# --------------------------------------------------------
+# Replay Viewer
+# --------------------------------------------------------
+def watch_replay(path, speed=4):
+    """
+    Play a saved Replay back at speed x real time.
+    LEFT/RIGHT jump 10 seconds back/forward, ESC quits.
+    """
+    init_display()
+    replay = Replay.load(path)
+    game = DrMarioGame(grid_width=replay.grid_width, grid_height=replay.grid_height,
+                       player_name="Replay")
+    player = ReplayPlayer(replay, game)
+    screen.fill(BLACK)
+    pygame.display.flip()
+    timestep = FixedTimestep(TICK_RATE * speed, max_ticks=TICK_RATE * speed // 4)
+    clock.tick()
+
+    watching = True
+    while watching:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                watching = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    watching = False
+                elif event.key == pygame.K_LEFT:
+                    player.seek(player.frame - 10 * FPS)
+                elif event.key == pygame.K_RIGHT:
+                    player.seek(player.frame + 10 * FPS)
+
+        for _ in range(timestep.advance(clock.tick(RENDER_FPS) / 1000)):
+            player.step()
+        pygame.display.update(game.draw(screen))
+
 # --------------------------------------------------------
 # Main Entry Point
 # --------------------------------------------------------
 def main():
+    # python DRDR64.py --replay FILE [SPEED] | --record FILE | --levels FILE [DIFFICULTY]
+    args = sys.argv[1:]
+    if args[:1] == ["--replay"] and len(args) > 1:
+        watch_replay(args[1], int(args[2]) if len(args) > 2 else 4)
+        pygame.quit()
+        return
+    record_path = args[1] if args[:1] == ["--record"] and len(args) > 1 else None
+    # Rated layouts from a drdr64_levels bank instead of random ones
+    level_bank = LevelBank(args[1]) if args[:1] == ["--levels"] and len(args) > 1 else None
+    difficulty = float(args[2]) if level_bank and len(args) > 2 else 0.5
+
+    init_display()
+
     # Choose between single-player or versus
     # For demonstration, we’ll do a quick menu:
     running = True
@@ -528,8 +537,12 @@ def main():
         font = pygame.font.SysFont(None, 48)
         text1 = font.render("Press 1 for Single Player", True, WHITE)
         text2 = font.render("Press 2 for Versus Mode", True, WHITE)
-        screen.blit(text1, (200, 200))
-        screen.blit(text2, (200, 300))
+        text3 = font.render("Press 3 for Versus CPU", True, WHITE)
+        text4 = font.render("Press 4 for 8-Board Battle", True, WHITE)
+        screen.blit(text1, (200, 150))
+        screen.blit(text2, (200, 250))
+        screen.blit(text3, (200, 350))
+        screen.blit(text4, (200, 450))
         pygame.display.flip()
 
         for event in pygame.event.get():
@@ -540,16 +553,31 @@ def main():
                     mode = 1
                 elif event.key == pygame.K_2:
                     mode = 2
+                elif event.key == pygame.K_3:
+                    mode = 3
+                elif event.key == pygame.K_4:
+                    mode = 4
 
         clock.tick(FPS)
 
     if mode == 1:
         # Single-player
         game = DrMarioGame(player_name="SinglePlayer")
-        game.run_single_player()
-    elif mode == 2:
-        # Versus
-        versus_game = VersusDrMarioGame()
+        game.level_bank, game.target_difficulty = level_bank, difficulty
+        game.run_single_player(record_path)
+    elif mode in (2, 3, 4):
+        if mode == 2:
+            # Versus
+            versus_game = VersusDrMarioGame()
+        elif mode == 3:
+            # Versus the placement-search bot
+            versus_game = VersusDrMarioGame(controls2=BotController())
+        else:
+            # Two humans against six bots
+            controls = KEYMAPS[:2] + [BotController() for _ in range(MAX_VERSUS_BOARDS - 2)]
+            versus_game = VersusDrMarioGame(controls=controls)
+        for game in versus_game.players:
+            game.level_bank, game.target_difficulty = level_bank, difficulty
         versus_game.run_versus_mode()
 
     pygame.quit()
@@ -1,7 +1,14 @@
 import pygame
+import os
 import sys
 import math
 import array
+import time
+from collections import OrderedDict, deque
+
+import boingys_levels
+import boingys_particles
+import boingys_save
 
 # -----------------------------------------------------------------------------
 # GLOBAL CONSTANTS
@@ -25,6 +32,37 @@ STATE_CONFIG_MENU = "CONFIG_MENU"
 STATE_GAMEPLAY    = "GAMEPLAY"
 STATE_EXIT        = "EXIT"
 
+# Player actions, one bit each: from the keyboard, or from Game.policy
+ACTION_NONE  = 0
+ACTION_LEFT  = 1
+ACTION_RIGHT = 2
+ACTION_JUMP  = 4
+
+# Frame scheduler: frames kept for frame-time statistics
+STATS_FRAMES = 600
+
+# Physics: fixed simulation ticks per second (may be lower than FPS; rendering
+# interpolates between ticks). Speeds are set in pixels per 1/60 s as before
+# and scaled by SPEED_SCALE to pixels per second.
+PHYSICS_HZ     = 60
+SPEED_SCALE    = 60
+GRAVITY        = 0.8 * SPEED_SCALE * SPEED_SCALE  # px/s^2
+MAX_FALL_SPEED = 10 * SPEED_SCALE                 # px/s
+MAX_FRAME_TIME = 0.25  # longest frame the simulation catches up on (s)
+
+# Seconds of gameplay between autosaves of the current slot
+AUTOSAVE_SECONDS = 5.0
+
+# Level streaming: chunks kept loaded at most (a chunk is 320x320 pixels,
+# ~400 KB once its static layer is rendered)
+MAX_LOADED_CHUNKS = 48
+# Chunks with fewer platforms + coins than this are cheaper to draw directly
+# (fill + a few rects) than to blit from a pre-rendered layer
+PRERENDER_MIN_OBJECTS = 12
+
+# Rendered menu/HUD strings kept by Game.text() (least recently used go first)
+TEXT_CACHE_SIZE = 64
+
 # -----------------------------------------------------------------------------
 # UTILITY - TONE GENERATION
 # -----------------------------------------------------------------------------
@@ -43,6 +81,82 @@ def generate_tone(freq=440, duration=1.0, volume=4096, sample_rate=44100):
     sound = pygame.mixer.Sound(buffer=buf)
     return sound
 
+# -----------------------------------------------------------------------------
+# SPATIAL HASH (BROADPHASE)
+# -----------------------------------------------------------------------------
+class SpatialHash:
+    """
+    Uniform grid over world space. Each object is bucketed under every
+    cell its bounding box touches, so a query only looks at objects in
+    the cells around the query box, however many there are in total.
+    Queries return objects in insertion order, like a scan of the list.
+    """
+    def __init__(self, cell_size=128):
+        self.cell_size = cell_size
+        self.cells = {}    # (cx, cy) -> list of objects
+        self.objects = {}  # object -> list of its cell keys
+        self.order = {}    # object -> insertion number
+        self.inserted = 0
+
+    def __len__(self):
+        return len(self.objects)
+
+    def _keys(self, x0, y0, x1, y1):
+        size = self.cell_size
+        return [(cx, cy)
+                for cx in range(int(x0 // size), int(x1 // size) + 1)
+                for cy in range(int(y0 // size), int(y1 // size) + 1)]
+
+    def insert(self, obj, x, y, width, height):
+        keys = self._keys(x, y, x + width, y + height)
+        self.objects[obj] = keys
+        self.order[obj] = self.inserted
+        self.inserted += 1
+        for key in keys:
+            self.cells.setdefault(key, []).append(obj)
+
+    def remove(self, obj):
+        self.order.pop(obj, None)
+        for key in self.objects.pop(obj, ()):
+            bucket = self.cells[key]
+            bucket.remove(obj)
+            if not bucket:
+                del self.cells[key]
+
+    def query(self, x0, y0, x1, y1):
+        """Objects whose cells overlap the box (a superset of the true overlaps)."""
+        found = []
+        seen = set()
+        cells = self.cells
+        for key in self._keys(x0, y0, x1, y1):
+            for obj in cells.get(key, ()):
+                if obj not in seen:
+                    seen.add(obj)
+                    found.append(obj)
+        if len(found) > 1:
+            found.sort(key=self.order.__getitem__)
+        return found
+
+def move_and_collect(player, platform_index, collectible_index, bounds=(WIDTH, HEIGHT),
+                     dt=1.0 / PHYSICS_HZ):
+    """
+    Advance the player one physics tick of dt seconds against the
+    platforms it could reach and collect what it swept through this
+    tick; collected items leave the index and are returned.
+    """
+    reach = player.radius + (abs(player.vel_x) + abs(player.vel_y) + GRAVITY * dt) * dt + 1
+    player.move(platform_index.query(player.x - reach, player.y - reach,
+                                     player.x + reach, player.y + reach), bounds, dt)
+    r = player.radius
+    collected = []
+    for c in collectible_index.query(min(player.x, player.prev_x) - r, min(player.y, player.prev_y) - r,
+                                     max(player.x, player.prev_x) + r, max(player.y, player.prev_y) + r):
+        c.check_collision(player)
+        if c.collected:
+            collectible_index.remove(c)
+            collected.append(c)
+    return collected
+
 # -----------------------------------------------------------------------------
 # CONFIG CLASS
 # -----------------------------------------------------------------------------
@@ -55,9 +169,16 @@ class Config:
 # PLAYER CLASS
 # -----------------------------------------------------------------------------
 class Player:
+    """
+    Speeds are in pixels per 1/60 s (see SPEED_SCALE); vel_x and vel_y are
+    in pixels per second. prev_x/prev_y hold the position before the last
+    physics tick, for swept collection and interpolated drawing.
+    """
     def __init__(self, x, y, speed=5, jump_speed=15, color=RED, radius=20):
         self.x = x
         self.y = y
+        self.prev_x = x
+        self.prev_y = y
         self.radius = radius
         self.color = color
         self.vel_x = 0
@@ -69,53 +190,94 @@ class Player:
 
     def handle_keys(self):
         keys = pygame.key.get_pressed()
-        self.vel_x = 0
-        # Left / Right Movement
+        actions = ACTION_NONE
         if keys[pygame.K_LEFT] or keys[pygame.K_a]:
-            self.vel_x = -self.speed
+            actions |= ACTION_LEFT
         if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
-            self.vel_x = self.speed
+            actions |= ACTION_RIGHT
+        if keys[pygame.K_SPACE] or keys[pygame.K_w] or keys[pygame.K_UP]:
+            actions |= ACTION_JUMP
+        self.apply_actions(actions)
+
+    def apply_actions(self, actions):
+        """Steer by an ACTION_* bitmask (right wins if both directions are set)."""
+        self.vel_x = 0
+        # Left / Right Movement
+        if actions & ACTION_LEFT:
+            self.vel_x = -self.speed * SPEED_SCALE
+        if actions & ACTION_RIGHT:
+            self.vel_x = self.speed * SPEED_SCALE
         # Jump
-        if (keys[pygame.K_SPACE] or keys[pygame.K_w] or keys[pygame.K_UP]) and self.on_ground:
-            self.vel_y = -self.jump_speed
-            self.on_ground = False
-
-    def apply_gravity(self, gravity=0.8):
-        self.vel_y += gravity
-        if self.vel_y > 10:
-            self.vel_y = 10
-
-    def move(self, platforms):
-        self.x += self.vel_x
-        self.y += self.vel_y
-
-        # Screen boundaries
-        if self.x - self.radius < 0:
-            self.x = self.radius
-        if self.x + self.radius > WIDTH:
-            self.x = WIDTH - self.radius
-        if self.y - self.radius < 0:
-            self.y = self.radius
-        if self.y + self.radius > HEIGHT:
-            self.y = HEIGHT - self.radius
+        if actions & ACTION_JUMP and self.on_ground:
+            self.jump()
+
+    def jump(self):
+        self.vel_y = -self.jump_speed * SPEED_SCALE
+        self.on_ground = False
+
+    def place(self, x, y):
+        """Put the player at (x, y) with nothing to interpolate from."""
+        self.x = self.prev_x = x
+        self.y = self.prev_y = y
+
+    def move(self, platforms, bounds=(WIDTH, HEIGHT), dt=1.0 / PHYSICS_HZ):
+        """
+        One physics tick: gravity, then a swept move. Platforms are one-way
+        (solid from above only), so the player lands on the first platform
+        top its bounding box's bottom edge crosses during the tick, at
+        any speed, rather than only on ones it overlaps afterwards.
+        """
+        r = self.radius
+        x0, y0 = self.x, self.y
+        self.prev_x, self.prev_y = x0, y0
+
+        # Constant-acceleration step (exact until the fall-speed cap), so
+        # jumps reach the same height at any tick rate
+        vel_y = min(self.vel_y + GRAVITY * dt, MAX_FALL_SPEED)
+        dx = self.vel_x * dt
+        dy = (self.vel_y + vel_y) * 0.5 * dt
+        self.vel_y = vel_y
+        x, y = x0 + dx, y0 + dy
+
+        # Collision with platforms: earliest top edge crossed while falling
+        self.on_ground = False
+        if dy > 0:
+            bottom0 = y0 + r
+            bottom1 = bottom0 + dy
+            landing = None
+            for platform in platforms:
+                top = platform.y
+                if bottom0 - 0.01 <= top <= bottom1 and (landing is None or top < landing):
+                    t = max(0.0, (top - bottom0) / dy)
+                    x_at = x0 + dx * t
+                    if x_at + r > platform.x and x_at - r < platform.x + platform.width:
+                        landing = top
+            if landing is not None:
+                y = landing - r
+                self.vel_y = 0
+                self.on_ground = True
+
+        # World boundaries (the bottom edge is ground too)
+        width, height = bounds
+        if x - r < 0:
+            x = r
+        if x + r > width:
+            x = width - r
+        if y - r < 0:
+            y = r
+            self.vel_y = max(0, self.vel_y)
+        if y + r > height:
+            y = height - r
             self.vel_y = 0
             self.on_ground = True
+        self.x, self.y = x, y
 
-        # Collision with platforms
-        self.on_ground = False
-        for platform in platforms:
-            if (self.x + self.radius > platform.x and
-                self.x - self.radius < platform.x + platform.width and
-                self.y + self.radius > platform.y and
-                self.y - self.radius < platform.y + platform.height):
-                # Check if above the platform
-                if self.vel_y > 0 and self.y - self.radius < platform.y:
-                    self.y = platform.y - self.radius
-                    self.vel_y = 0
-                    self.on_ground = True
-
-    def draw(self, surface):
-        pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), self.radius)
+    def draw(self, surface, offset=(0, 0), alpha=1.0):
+        """Draw at alpha (0..1) of the way from the previous tick's position."""
+        x = self.prev_x + (self.x - self.prev_x) * alpha
+        y = self.prev_y + (self.y - self.prev_y) * alpha
+        pygame.draw.circle(surface, self.color,
+                           (int(x - offset[0]), int(y - offset[1])), self.radius)
 
 # -----------------------------------------------------------------------------
 # PLATFORM CLASS
@@ -128,8 +290,12 @@ class Platform:
         self.height = height
         self.color = color
 
-    def draw(self, surface):
-        pygame.draw.rect(surface, self.color, pygame.Rect(self.x, self.y, self.width, self.height))
+    def draw(self, surface, offset=(0, 0)):
+        pygame.draw.rect(surface, self.color,
+                         pygame.Rect(self.x - offset[0], self.y - offset[1], self.width, self.height))
+
+    def add_to(self, index):
+        index.insert(self, self.x, self.y, self.width, self.height)
 
 # -----------------------------------------------------------------------------
 # COLLECTIBLE CLASS
@@ -142,23 +308,511 @@ class Collectible:
         self.color = color
         self.collected = False
 
-    def draw(self, surface):
+    def draw(self, surface, offset=(0, 0)):
         if not self.collected:
-            pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), self.radius)
+            pygame.draw.circle(surface, self.color,
+                               (int(self.x - offset[0]), int(self.y - offset[1])), self.radius)
+
+    def add_to(self, index):
+        index.insert(self, self.x - self.radius, self.y - self.radius,
+                     2 * self.radius, 2 * self.radius)
 
     def check_collision(self, player):
+        """Collect if the player's path over the last tick came close enough."""
         if not self.collected:
-            distance = math.hypot(self.x - player.x, self.y - player.y)
+            # Closest point to us on the segment prev -> current
+            px, py = player.prev_x, player.prev_y
+            dx, dy = player.x - px, player.y - py
+            length = dx * dx + dy * dy
+            t = 0.0
+            if length:
+                t = max(0.0, min(1.0, ((self.x - px) * dx + (self.y - py) * dy) / length))
+            distance = math.hypot(self.x - (px + dx * t), self.y - (py + dy * t))
             if distance < self.radius + player.radius:
                 self.collected = True
                 player.score += 1
 
+# -----------------------------------------------------------------------------
+# CACHED TEXT
+# -----------------------------------------------------------------------------
+class CachedText:
+    """A font.render() result kept until the text (or color) changes."""
+    def __init__(self, font, color=BLACK):
+        self.font = font
+        self.color = color
+        self.text = None
+        self.surface = None
+
+    def render(self, text, color=None):
+        color = self.color if color is None else color
+        if text != self.text or color != self.color:
+            self.text = text
+            self.color = color
+            self.surface = self.font.render(text, True, color)
+        return self.surface
+
+# -----------------------------------------------------------------------------
+# CAMERA
+# -----------------------------------------------------------------------------
+class Camera:
+    """Top-left corner of the screen in world space, kept inside the level."""
+    def __init__(self, width=WIDTH, height=HEIGHT):
+        self.width = width
+        self.height = height
+        self.x = 0
+        self.y = 0
+
+    def follow(self, target_x, target_y, bounds):
+        self.x = max(0, min(bounds[0] - self.width, target_x - self.width // 2))
+        self.y = max(0, min(bounds[1] - self.height, target_y - self.height // 2))
+
+    @property
+    def offset(self):
+        return (int(self.x), int(self.y))
+
+    def view(self):
+        return (self.x, self.y, self.x + self.width, self.y + self.height)
+
+# -----------------------------------------------------------------------------
+# LEVEL STREAMING
+# -----------------------------------------------------------------------------
+class Chunk:
+    """
+    One loaded chunk. If it holds at least PRERENDER_MIN_OBJECTS objects,
+    its platforms and uncollected coins are pre-rendered over the sky into
+    `surface` the first time it is drawn, and again only after a coin in
+    it is collected; sparser chunks just draw their few objects.
+    """
+    def __init__(self, key, x, y, size, platforms, collectibles):
+        self.key = key
+        self.x = x
+        self.y = y
+        self.size = size
+        self.platforms = platforms
+        self.collectibles = collectibles
+        self.surface = None
+        self.stale = True
+        self.prerender = len(platforms) + len(collectibles) >= PRERENDER_MIN_OBJECTS
+
+    def render(self):
+        if self.surface is None:
+            self.surface = pygame.Surface((self.size, self.size))
+            if pygame.display.get_surface() is not None:
+                self.surface = self.surface.convert()
+        surface = self.surface
+        surface.fill(SKY_BLUE)
+        offset = (self.x, self.y)
+        for platform in self.platforms:
+            platform.draw(surface, offset)
+        for c in self.collectibles:
+            c.draw(surface, offset)
+        self.stale = False
+
+    def draw(self, surface, offset):
+        """Blit the static layer, or draw the objects (over an already filled sky)."""
+        if not self.prerender:
+            for platform in self.platforms:
+                platform.draw(surface, offset)
+            for c in self.collectibles:
+                c.draw(surface, offset)
+            return
+        if self.stale:
+            self.render()
+        surface.blit(self.surface, (self.x - offset[0], self.y - offset[1]))
+
+class LevelStream:
+    """
+    A level file (see boingys_levels.py) loaded a chunk at a time. Each
+    frame update_view() loads the chunks around the camera and evicts the
+    least recently seen ones beyond max_chunks. Only loaded chunks are in
+    the spatial indexes, so everything off screen is left out of both
+    collisions and drawing. Collected coins are remembered in `collected`
+    as (chunk index, coin index), so they stay collected after their chunk
+    is evicted, and appended to `collected_log` packed for saving. Drawing blits each on-screen chunk's
+    pre-rendered static layer.
+    """
+    def __init__(self, source, max_chunks=MAX_LOADED_CHUNKS, margin=1):
+        self.reader = boingys_levels.LevelReader(source)
+        self.bounds = self.reader.pixel_size
+        self.spawn = self.reader.spawn
+        self.max_chunks = max_chunks
+        self.margin = margin  # chunks loaded beyond each edge of the view
+        self.loaded = OrderedDict()  # (cx, cy) -> Chunk, least recently seen first
+        self.collected = set()
+        self.collected_log = bytearray()
+        self.platform_index = SpatialHash()
+        self.collectible_index = SpatialHash()
+        self.chunk_loads = 0
+
+    def close(self):
+        self.reader.close()
+
+    def _chunk_range(self, x0, y0, x1, y1, margin):
+        size = self.reader.chunk_pixels
+        cx0 = max(0, int(x0 // size) - margin)
+        cy0 = max(0, int(y0 // size) - margin)
+        cx1 = min(self.reader.chunks_x - 1, int(x1 // size) + margin)
+        cy1 = min(self.reader.chunks_y - 1, int(y1 // size) + margin)
+        return [(cx, cy) for cy in range(cy0, cy1 + 1) for cx in range(cx0, cx1 + 1)]
+
+    def update_view(self, view):
+        """Load the chunks the view (plus margin) needs, evicting the stalest over the cap."""
+        loaded = self.loaded
+        needed = self._chunk_range(*view, self.margin)
+        for key in needed:
+            if key in loaded:
+                loaded.move_to_end(key)
+            else:
+                loaded[key] = self._load(key)
+        while len(loaded) > max(self.max_chunks, len(needed)):
+            self._evict(loaded.popitem(last=False)[1])
+
+    def visible_chunks(self, view):
+        loaded = self.loaded
+        return [loaded[key] for key in self._chunk_range(*view, 0) if key in loaded]
+
+    def _load(self, key):
+        rects, coins = self.reader.chunk_objects(*key)
+        platforms = [Platform(*rect) for rect in rects]
+        collectibles = []
+        for i, (x, y) in enumerate(coins):
+            c = Collectible(x, y)
+            c.key = (key[1] * self.reader.chunks_x + key[0], i)
+            if c.key in self.collected:
+                c.collected = True
+            collectibles.append(c)
+        for platform in platforms:
+            platform.add_to(self.platform_index)
+        for c in collectibles:
+            if not c.collected:
+                c.add_to(self.collectible_index)
+        self.chunk_loads += 1
+        size = self.reader.chunk_pixels
+        return Chunk(key, key[0] * size, key[1] * size, size, platforms, collectibles)
+
+    def _evict(self, chunk):
+        for platform in chunk.platforms:
+            self.platform_index.remove(platform)
+        for c in chunk.collectibles:
+            if not c.collected:
+                self.collectible_index.remove(c)
+
+    def collect(self, collected):
+        """Remember newly collected coins and mark their chunks for re-rendering."""
+        for c in collected:
+            self.collected.add(c.key)
+            self.collected_log += boingys_save.COIN.pack(*c.key)
+            cy, cx = divmod(c.key[0], self.reader.chunks_x)
+            chunk = self.loaded.get((cx, cy))
+            if chunk is not None:
+                chunk.stale = True
+
+    def draw(self, surface, camera):
+        chunks = self.visible_chunks(camera.view())
+        # One aligned full-screen fill is far cheaper than filling each
+        # sparse chunk's (unaligned) rect; pre-rendered chunks cover it
+        if (self.bounds[0] < camera.width or self.bounds[1] < camera.height
+                or not all(chunk.prerender for chunk in chunks)):
+            surface.fill(SKY_BLUE)
+        offset = camera.offset
+        for chunk in chunks:
+            chunk.draw(surface, offset)
+
+# -----------------------------------------------------------------------------
+# FRAME SCHEDULER
+# -----------------------------------------------------------------------------
+class FrameScheduler:
+    """
+    Owns the one frame loop. Each frame it gathers input, advances the
+    OST, and calls the current state's handler: handle(events),
+    update(dt), render(surface). Handlers never block or flip on their
+    own. Active states are paced against a single monotonic deadline, one
+    budget of 1/fps seconds per frame. Idle states (a menu with nothing
+    to redraw) sleep until input or the next OST note instead. The work
+    time of recent frames is kept for stats().
+    """
+    def __init__(self, fps=FPS, history=STATS_FRAMES):
+        self.budget = 1.0 / fps
+        self.work = deque(maxlen=history)       # seconds of work per frame
+        self.intervals = deque(maxlen=history)  # seconds between paced frames
+        self.frames = 0
+        self.over_budget = 0
+
+    def run(self, game):
+        """Run frames until game.state becomes STATE_EXIT."""
+        state = None
+        last = deadline = time.perf_counter()
+        paced = False
+        while game.state != STATE_EXIT:
+            handler = game.handlers[game.state]
+            if game.state != state:
+                state = game.state
+                handler.enter()
+            if handler.idle():
+                events = game.wait_for_events()
+                paced = False
+            else:
+                events = pygame.event.get()
+
+            start = time.perf_counter()
+            dt = start - last
+            if paced:
+                self.intervals.append(dt)
+            last = start
+            game.play_ost(dt)
+            if any(event.type == pygame.QUIT for event in events):
+                game.state = STATE_EXIT
+                break
+            handler.handle(events)
+            if game.state == state:
+                handler.update(dt)
+                if handler.render(game.screen):
+                    pygame.display.flip()
+
+            work = time.perf_counter() - start
+            self.work.append(work)
+            self.frames += 1
+            if work > self.budget:
+                self.over_budget += 1
+
+            # Pace active states against the deadline; after falling a
+            # whole frame behind, start again from now instead of rushing
+            paced = game.state == state and not handler.idle()
+            if paced:
+                if deadline < start - self.budget:
+                    deadline = start
+                deadline += self.budget
+                delay = deadline - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                deadline = time.perf_counter()
+
+    def stats(self):
+        """Frame-time percentiles in milliseconds over the last `history` frames."""
+        def percentiles(samples):
+            samples = sorted(samples)
+            if not samples:
+                return {}
+            at = lambda q: samples[min(len(samples) - 1, int(len(samples) * q))] * 1000
+            return {"p50": at(0.50), "p95": at(0.95), "p99": at(0.99), "max": samples[-1] * 1000}
+        return {
+            "frames": self.frames,
+            "budget": self.budget * 1000,
+            "over_budget": self.over_budget,
+            "work": percentiles(self.work),
+            "interval": percentiles(self.intervals),
+        }
+
+# -----------------------------------------------------------------------------
+# STATE HANDLERS
+# -----------------------------------------------------------------------------
+class MenuState:
+    """
+    A vertical menu with a title. It redraws only when the selection or a
+    label changes, and is idle (see FrameScheduler) the rest of the time.
+    on_select(option) is called on RETURN; on_adjust(option, -1 or +1) on
+    LEFT/RIGHT returns True if the option's label changed; label(option)
+    gives the text shown for an option.
+    """
+    def __init__(self, game, title, options, on_select, on_adjust=None, label=None,
+                 underline_selected=True):
+        self.game = game
+        self.title = title
+        self.options = options
+        self.on_select = on_select
+        self.on_adjust = on_adjust
+        self.label = label
+        self.underline_selected = underline_selected
+        self.selected = 0
+        self.dirty = True
+
+    def enter(self):
+        self.selected = 0
+        self.dirty = True
+
+    def idle(self):
+        return not self.dirty
+
+    def handle(self, events):
+        for event in events:
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_UP:
+                    self.selected = (self.selected - 1) % len(self.options)
+                    self.dirty = True
+                elif event.key == pygame.K_DOWN:
+                    self.selected = (self.selected + 1) % len(self.options)
+                    self.dirty = True
+                elif event.key in (pygame.K_LEFT, pygame.K_RIGHT) and self.on_adjust is not None:
+                    direction = -1 if event.key == pygame.K_LEFT else 1
+                    if self.on_adjust(self.options[self.selected], direction):
+                        self.dirty = True
+                elif event.key == pygame.K_RETURN:
+                    state = self.game.state
+                    self.on_select(self.options[self.selected])
+                    self.dirty = True
+                    if self.game.state != state:
+                        return  # the rest of the input belongs to the next state
+            elif event.type == pygame.WINDOWEXPOSED:
+                self.dirty = True
+
+    def update(self, dt):
+        pass
+
+    def render(self, surface):
+        if not self.dirty:
+            return False
+        game = self.game
+        surface.fill(SKY_BLUE)
+        title_text = game.text(game.menu_font, self.title, BLACK)
+        surface.blit(title_text, (WIDTH // 2 - title_text.get_width() // 2, HEIGHT // 4))
+
+        # Draw each option
+        for idx, option in enumerate(self.options):
+            selected = idx == self.selected
+            color = WHITE if selected else GRAY
+            menu_item = game.text(game.instruct_font, self.label(option) if self.label else option, color)
+            x_pos = WIDTH // 2 - menu_item.get_width() // 2
+            y_pos = HEIGHT // 2 + idx * 50
+            surface.blit(menu_item, (x_pos, y_pos))
+            if selected and self.underline_selected:
+                pygame.draw.line(
+                    surface,
+                    color,
+                    (x_pos, y_pos + menu_item.get_height() + 2),
+                    (x_pos + menu_item.get_width(), y_pos + menu_item.get_height() + 2),
+                    2
+                )
+        self.dirty = False
+        return True
+
+class GameplayState:
+    """
+    Boingy's Adventure itself: ESC goes back to the main menu and F3
+    toggles the frame-time overlay (FrameScheduler.stats()).
+    """
+    def __init__(self, game):
+        self.game = game
+        self.show_stats = False
+        self.stats_text = CachedText(game.font)
+        self.since_save = 0.0
+        self.accumulator = 0.0  # simulation time owed, less than one tick after update()
+        self.alpha = 1.0        # how far the rendered frame is between the last two ticks
+
+    def enter(self):
+        self.accumulator = 0.0
+        self.alpha = 1.0
+
+    def idle(self):
+        return False
+
+    def handle(self, events):
+        for event in events:
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    self.game.autosave()
+                    self.game.state = STATE_MAIN_MENU
+                elif event.key == pygame.K_F3:
+                    self.show_stats = not self.show_stats
+
+    def update(self, dt):
+        game = self.game
+        player = game.player
+        level = game.level
+        particles = game.particles
+
+        # Fixed-step physics: run as many ticks as the frame owes, whatever
+        # the frame rate; render() interpolates between the last two
+        tick = 1.0 / game.physics_hz
+        self.accumulator += min(dt, MAX_FRAME_TIME)
+        while self.accumulator >= tick:
+            self.accumulator -= tick
+
+            # Handle player input (a policy, when one plays instead of the keyboard)
+            grounded = player.on_ground
+            if game.policy is None:
+                player.handle_keys()
+            else:
+                player.apply_actions(game.policy(game))
+            if grounded and not player.on_ground:
+                particles.effect(boingys_particles.EFFECT_JUMP, player.x, player.y + player.radius)
+            grounded = player.on_ground
+
+            # Stream in the chunks around the camera, then move the player and
+            # check collectible collisions (loaded, nearby objects only)
+            level.update_view(game.camera.view())
+            collected = move_and_collect(player, level.platform_index,
+                                         level.collectible_index, level.bounds, tick)
+            level.collect(collected)
+            if player.on_ground and not grounded:
+                particles.effect(boingys_particles.EFFECT_LAND, player.x, player.y + player.radius)
+            for c in collected:
+                particles.effect(boingys_particles.EFFECT_COLLECT, c.x, c.y)
+            game.furthest_x = max(game.furthest_x, player.x)
+            game.camera.follow(player.x, player.y, level.bounds)
+        self.alpha = self.accumulator / tick
+
+        # Effects move once per frame, however many ticks ran
+        particles.update(min(dt, MAX_FRAME_TIME))
+
+        # Autosave: the writer thread does the encoding and disk work
+        self.since_save += dt
+        if self.since_save >= game.autosave_seconds:
+            self.since_save = 0.0
+            game.autosave()
+
+    def render(self, surface):
+        game = self.game
+
+        # The camera follows the player where it is drawn, between ticks
+        player = game.player
+        alpha = self.alpha
+        game.camera.follow(player.prev_x + (player.x - player.prev_x) * alpha,
+                           player.prev_y + (player.y - player.prev_y) * alpha, game.level.bounds)
+
+        # Drawing: the on-screen chunks' static layers, then the dynamic sprites
+        game.level.draw(surface, game.camera)
+        game.particles.draw(surface, game.camera.offset)
+
+        # Draw player
+        player.draw(surface, game.camera.offset, alpha)
+
+        # Draw score
+        surface.blit(game.score_text.render(f"Score: {game.player.score}"), (10, 10))
+
+        if self.show_stats:
+            scheduler = game.scheduler
+            if scheduler.frames % 30 == 0 or self.stats_text.text is None:
+                work = scheduler.stats()["work"]
+                if work:
+                    self.stats_text.render(f"frame p50 {work['p50']:.2f} ms / "
+                                           f"p99 {work['p99']:.2f} ms / max {work['max']:.2f} ms / "
+                                           f"{game.particles.count} particles")
+            if self.stats_text.surface is not None:
+                surface.blit(self.stats_text.surface, (10, 40))
+        return True
+
 # -----------------------------------------------------------------------------
 # MAIN GAME CLASS (STATE MACHINE)
 # -----------------------------------------------------------------------------
 class Game:
-    def __init__(self):
+    """
+    headless=True runs on SDL's dummy video and audio drivers and skips
+    synthesizing the OST and loading the saved config, for playtests
+    (see boingys_playtest.py). The drivers are read by pygame.init(), so
+    a headless Game should be the first to initialize pygame in the
+    process.
+
+    save_dir overrides where the save slots live (default
+    boingys_save.SAVE_DIR), so benches and playtests can keep off the
+    player's real saves and config.
+    """
+    def __init__(self, headless=False, save_dir=None):
         # Initialize pygame
+        self.headless = headless
+        if headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            os.environ["SDL_AUDIODRIVER"] = "dummy"
         pygame.init()
         pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
 
@@ -166,38 +820,118 @@ class Game:
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         pygame.display.set_caption("BOINGYS Adventure")
 
-        # Create clock
-        self.clock = pygame.time.Clock()
+        # The frame loop (see FrameScheduler)
+        self.scheduler = FrameScheduler()
 
         # Font resources
         self.font          = pygame.font.SysFont(None, 36)
         self.menu_font     = pygame.font.SysFont(None, 72)
         self.instruct_font = pygame.font.SysFont(None, 36)
+        self.score_text    = CachedText(self.font)
+        self.text_cache    = OrderedDict()  # (font, text, color) -> Surface
 
         # Config & initial state
         self.config = Config()
         self.state  = STATE_MAIN_MENU
 
         # OST/music variables
-        self.ost_sounds    = self.create_ost()
+        self.ost_sounds    = [] if headless else self.create_ost()
         self.current_note  = 0
         self.note_duration = 0.3
         self.note_timer    = 0
         self.ost_channel   = pygame.mixer.Channel(0)
 
-        # Game objects
-        self.player = Player(100, HEIGHT - 100, speed=self.config.player_speed)
-        self.platforms = [
-            Platform(0, HEIGHT - 40, WIDTH, 40),
-            Platform(200, HEIGHT - 150, 200, 20),
-            Platform(500, HEIGHT - 250, 200, 20),
-            Platform(300, HEIGHT - 350, 200, 20),
-        ]
-        self.collectibles = [
-            Collectible(250, HEIGHT - 170),
-            Collectible(550, HEIGHT - 270),
-            Collectible(350, HEIGHT - 370),
-        ]
+        # Save slots: config comes from whichever slot was saved last
+        self.saves = boingys_save.SaveWriter()
+        self.save_dir = boingys_save.SAVE_DIR if save_dir is None else save_dir
+        self.level_dir = boingys_levels.LEVEL_DIR
+        self.slot = None
+        self.autosave_seconds = AUTOSAVE_SECONDS
+        if not headless:
+            self.load_config()
+        self.physics_hz = PHYSICS_HZ
+        self.policy = None  # policy(game) -> ACTION_* bits per physics tick; None = keyboard
+
+        # Game objects: "Start Game" plays the original room until a level is chosen
+        self.camera = Camera()
+        self.particles = boingys_particles.ParticlePool()
+        self.level = None
+        self.level_number = 0
+        tiles, spawn = boingys_levels.room_tiles()
+        self.load_level(boingys_levels.encode_level(tiles, spawn))
+
+        # Per-state handlers, driven by the scheduler
+        self.handlers = {
+            STATE_MAIN_MENU:   self.main_menu(),
+            STATE_FILE_SELECT: self.file_select_menu(),
+            STATE_CONFIG_MENU: self.config_menu(),
+            STATE_GAMEPLAY:    GameplayState(self),
+        }
+
+    def load_level(self, source, number=0, slot=None):
+        """Start a level from a level file path (or level bytes) with a fresh player."""
+        if self.level is not None:
+            self.level.close()
+        self.level = LevelStream(source)
+        self.level_number = number
+        self.slot = slot
+        self.particles.clear()
+        x, y = self.level.spawn
+        self.player = Player(x, y, speed=self.config.player_speed)
+        self.furthest_x = x
+        self.camera.follow(x, y, self.level.bounds)
+
+    # -------------------------------------------------------------------------
+    # SAVE SLOTS
+    # -------------------------------------------------------------------------
+    def slot_path(self, slot):
+        return boingys_save.slot_path(slot, self.save_dir)
+
+    def load_config(self):
+        headers = [boingys_save.read_header(self.slot_path(slot))
+                   for slot in (boingys_save.SETTINGS_SLOT,) + boingys_save.SLOTS]
+        headers = [h for h in headers if h is not None]
+        if headers:
+            newest = max(headers, key=lambda h: h.saved_at)
+            self.config.sound_volume = newest.sound_volume
+            self.config.player_speed = newest.player_speed
+
+    def start_slot(self, slot):
+        """Play File Select slot `slot` (its level is the slot number), resuming its save."""
+        self.load_level(boingys_levels.ensure_level(slot, self.level_dir), slot, slot)
+        try:
+            saved = boingys_save.read_save(self.slot_path(slot))
+        except (OSError, ValueError):
+            return
+        self.level.collected = boingys_save.coin_keys(saved.collected)
+        self.level.collected_log[:] = saved.collected
+        player = self.player
+        player.place(saved.x, saved.y)
+        # Saves keep velocities in pixels per 1/60 s, like the speed settings
+        player.vel_x, player.vel_y = saved.vel_x * SPEED_SCALE, saved.vel_y * SPEED_SCALE
+        player.score = saved.score
+        self.furthest_x = saved.furthest_x
+        self.camera.follow(player.x, player.y, self.level.bounds)
+
+    def save_state(self):
+        """A SaveState of the current game; cheap enough to take every frame."""
+        player = self.player
+        return boingys_save.SaveState(
+            self.slot or boingys_save.SETTINGS_SLOT, self.level_number,
+            player.x, player.y, player.vel_x / SPEED_SCALE, player.vel_y / SPEED_SCALE, player.score,
+            self.furthest_x, self.level.bounds[0],
+            self.config.sound_volume, self.config.player_speed,
+            collected=bytes(self.level.collected_log))
+
+    def autosave(self):
+        """Queue a save of the current slot (a no-op outside File Select levels)."""
+        if self.slot is not None:
+            self.saves.save(self.slot_path(self.slot), self.save_state())
+
+    def save_settings(self):
+        self.saves.save(self.slot_path(boingys_save.SETTINGS_SLOT), boingys_save.SaveState(
+            boingys_save.SETTINGS_SLOT, sound_volume=self.config.sound_volume,
+            player_speed=self.config.player_speed, collected=b""))
 
     # -------------------------------------------------------------------------
     # OST GENERATION
@@ -218,6 +952,8 @@ class Game:
         """
         Loops through the set of notes for a simple melody.
         """
+        if not self.ost_sounds:
+            return
         self.note_timer += dt
         if self.note_timer >= self.note_duration:
             self.note_timer = 0
@@ -233,282 +969,123 @@ class Game:
         """
         # Start playing the first note in the background
         self.ost_channel.set_volume(self.config.sound_volume)
-        self.ost_channel.play(self.ost_sounds[self.current_note], loops=-1)
-
-        while self.state != STATE_EXIT:
-            dt = self.clock.tick(FPS) / 1000.0  # Delta time in seconds
-            self.screen.fill(SKY_BLUE)
-
-            # State-based logic
-            if self.state == STATE_MAIN_MENU:
-                self.main_menu(dt)
-
-            elif self.state == STATE_FILE_SELECT:
-                self.file_select_menu(dt)
-
-            elif self.state == STATE_CONFIG_MENU:
-                self.config_menu(dt)
-
-            elif self.state == STATE_GAMEPLAY:
-                self.gameplay(dt)
+        if self.ost_sounds:
+            self.ost_channel.play(self.ost_sounds[self.current_note], loops=-1)
 
-            pygame.display.flip()
+        self.scheduler.run(self)
 
-        # Graceful shutdown
+        # Graceful shutdown, once the last saves are on disk
+        self.autosave()
+        self.saves.close()
         pygame.quit()
         sys.exit()
 
     # -------------------------------------------------------------------------
-    # UNIVERSAL MENU HELPER
+    # CACHED TEXT & IDLE WAITING
     # -------------------------------------------------------------------------
-    def run_menu(self, title, options, on_select_callback):
+    def text(self, font, text, color):
         """
-        Displays a generic vertical menu with a given title and list of options.
-        :param title: (str) The menu title displayed near the top of the screen
-        :param options: (list[str]) The selectable options (strings)
-        :param on_select_callback: (function) Called with the string of the chosen option
+        font.render() of text, rendered once per (font, text, color) while
+        it stays among the TEXT_CACHE_SIZE most recently drawn strings.
         """
-        selected_option = 0
-
-        while True:
-            dt_menu = self.clock.tick(FPS) / 1000.0
-            self.play_ost(dt_menu)
-
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.state = STATE_EXIT
-                    return
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_UP:
-                        selected_option = (selected_option - 1) % len(options)
-                    elif event.key == pygame.K_DOWN:
-                        selected_option = (selected_option + 1) % len(options)
-                    elif event.key == pygame.K_RETURN:
-                        chosen = options[selected_option]
-                        # Let the caller decide how to handle it
-                        if on_select_callback(chosen):
-                            return  # Some menus cause a state change
-
-            # Render the menu screen
-            self.screen.fill(SKY_BLUE)
-            title_text = self.menu_font.render(title, True, BLACK)
-            self.screen.blit(title_text, (WIDTH // 2 - title_text.get_width() // 2, HEIGHT // 4))
-
-            # Draw each option
-            for idx, option in enumerate(options):
-                if idx == selected_option:
-                    color = WHITE
-                    underline = True
-                else:
-                    color = GRAY
-                    underline = False
-
-                menu_item = self.instruct_font.render(option, True, color)
-                x_pos = WIDTH // 2 - menu_item.get_width() // 2
-                y_pos = HEIGHT // 2 + idx * 50
-                self.screen.blit(menu_item, (x_pos, y_pos))
-                if underline:
-                    pygame.draw.line(
-                        self.screen,
-                        color,
-                        (x_pos, y_pos + menu_item.get_height() + 2),
-                        (x_pos + menu_item.get_width(), y_pos + menu_item.get_height() + 2),
-                        2
-                    )
-
-            pygame.display.flip()
+        cache = self.text_cache
+        key = (font, text, color)
+        surface = cache.get(key)
+        if surface is None:
+            surface = cache[key] = font.render(text, True, color)
+            if len(cache) > TEXT_CACHE_SIZE:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+        return surface
+
+    def wait_for_events(self):
+        """
+        Sleep until input arrives or the OST's next note is due, and
+        return the events that arrived.
+        """
+        timeout = max(1, math.ceil((self.note_duration - self.note_timer) * 1000))
+        first = pygame.event.wait(timeout)
+        if first.type == pygame.NOEVENT:
+            return []
+        return [first] + pygame.event.get()
 
     # -------------------------------------------------------------------------
     # MENU: MAIN MENU
     # -------------------------------------------------------------------------
-    def main_menu(self, dt):
+    def main_menu(self):
         def on_select(chosen_option):
             if chosen_option == "Start Game":
                 self.state = STATE_GAMEPLAY
-                return True
             elif chosen_option == "File Select":
                 self.state = STATE_FILE_SELECT
-                return True
             elif chosen_option == "Config":
                 self.state = STATE_CONFIG_MENU
-                return True
             elif chosen_option == "Exit":
                 self.state = STATE_EXIT
-                return True
-            return False
 
         menu_options = ["Start Game", "File Select", "Config", "Exit"]
-        self.run_menu("BOINGYS Adventure", menu_options, on_select)
+        return MenuState(self, "BOINGYS Adventure", menu_options, on_select)
 
     # -------------------------------------------------------------------------
     # MENU: FILE SELECT
     # -------------------------------------------------------------------------
-    def file_select_menu(self, dt):
+    def file_select_menu(self):
         def on_select(chosen_option):
             if chosen_option == "Back":
                 self.state = STATE_MAIN_MENU
-                return True
-            else:
-                self.display_message(f"Selected {chosen_option}")
-                # Remain in file select after showing message
-                # (Alternatively, you might want to load the level and start gameplay here)
-            return False
+                return
+            self.autosave()
+            self.start_slot(int(chosen_option.split()[-1]))
+            self.state = STATE_GAMEPLAY
+
+        def label(option):
+            # Preview from the slot's header only
+            if option == "Back":
+                return option
+            header = boingys_save.read_header(self.slot_path(int(option.split()[-1])))
+            if header is None:
+                return option
+            return f"{option}: {header.coins} coins, {header.progress:.0%}"
 
         file_options = ["Level 1", "Level 2", "Level 3", "Back"]
-        self.run_menu("File Select", file_options, on_select)
+        return MenuState(self, "File Select", file_options, on_select, label=label)
 
     # -------------------------------------------------------------------------
     # MENU: CONFIG MENU
     # -------------------------------------------------------------------------
-    def config_menu(self, dt):
+    def config_menu(self):
         """
-        We have a special case: adjusting volume & speed with LEFT/RIGHT keys.
-        We'll still use run_menu for the layout, but handle LEFT/RIGHT in on_select.
+        We have a special case: adjusting volume & speed with LEFT/RIGHT keys,
+        handled by on_adjust; the labels show the current values.
         """
         def on_select(chosen_option):
             if chosen_option == "Back":
+                self.save_settings()
                 self.state = STATE_MAIN_MENU
+
+        def on_adjust(option, direction):
+            if option == "Sound Volume":
+                volume = self.config.sound_volume + 0.1 * direction
+                self.config.sound_volume = round(min(1.0, max(0.0, volume)), 1)
+                self.ost_channel.set_volume(self.config.sound_volume)
+                return True
+            elif option == "Player Speed":
+                self.config.player_speed = min(10, max(1, self.config.player_speed + direction))
+                self.player.speed = self.config.player_speed
                 return True
             return False
 
-        config_options = ["Sound Volume", "Player Speed", "Back"]
-
-        # We do an inner loop that uses run_menu, but we also check for arrow keys
-        selected_option = 0
-
-        while True:
-            dt_menu = self.clock.tick(FPS) / 1000.0
-            self.play_ost(dt_menu)
-
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.state = STATE_EXIT
-                    return
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_UP:
-                        selected_option = (selected_option - 1) % len(config_options)
-                    elif event.key == pygame.K_DOWN:
-                        selected_option = (selected_option + 1) % len(config_options)
-                    elif event.key == pygame.K_LEFT:
-                        if config_options[selected_option] == "Sound Volume":
-                            self.config.sound_volume = max(0.0, self.config.sound_volume - 0.1)
-                            self.ost_channel.set_volume(self.config.sound_volume)
-                        elif config_options[selected_option] == "Player Speed":
-                            self.config.player_speed = max(1, self.config.player_speed - 1)
-                            self.player.speed = self.config.player_speed
-                    elif event.key == pygame.K_RIGHT:
-                        if config_options[selected_option] == "Sound Volume":
-                            self.config.sound_volume = min(1.0, self.config.sound_volume + 0.1)
-                            self.ost_channel.set_volume(self.config.sound_volume)
-                        elif config_options[selected_option] == "Player Speed":
-                            self.config.player_speed = min(10, self.config.player_speed + 1)
-                            self.player.speed = self.config.player_speed
-                    elif event.key == pygame.K_RETURN:
-                        chosen = config_options[selected_option]
-                        if on_select(chosen):
-                            return
-
-            # Render our config screen
-            self.screen.fill(SKY_BLUE)
-            title_text = self.menu_font.render("Config", True, BLACK)
-            self.screen.blit(title_text, (WIDTH // 2 - title_text.get_width() // 2, HEIGHT // 4))
-
-            for idx, option in enumerate(config_options):
-                if idx == selected_option:
-                    color = WHITE
-                else:
-                    color = GRAY
-
-                if option == "Sound Volume":
-                    text_disp = f"{option}: {self.config.sound_volume:.1f}"
-                elif option == "Player Speed":
-                    text_disp = f"{option}: {self.config.player_speed}"
-                else:
-                    text_disp = option
-
-                option_text = self.instruct_font.render(text_disp, True, color)
-                x_pos = WIDTH // 2 - option_text.get_width() // 2
-                y_pos = HEIGHT // 2 + idx * 50
-                self.screen.blit(option_text, (x_pos, y_pos))
-
-            pygame.display.flip()
-
-    # -------------------------------------------------------------------------
-    # FUNCTION: DISPLAY A SIMPLE MESSAGE
-    # -------------------------------------------------------------------------
-    def display_message(self, message):
-        showing = True
-        while showing:
-            self.clock.tick(FPS)
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.state = STATE_EXIT
-                    return
-                elif event.type == pygame.KEYDOWN:
-                    showing = False
-
-            self.screen.fill(SKY_BLUE)
-            msg_text = self.instruct_font.render(message, True, BLACK)
-            self.screen.blit(
-                msg_text, 
-                (WIDTH // 2 - msg_text.get_width() // 2, HEIGHT // 2)
-            )
-            pygame.display.flip()
-
-    # -------------------------------------------------------------------------
-    # GAME STATE: GAMEPLAY
-    # -------------------------------------------------------------------------
-    def gameplay(self, dt):
-        """
-        The main gameplay loop for Boingy's Adventure.
-        We'll exit if the user closes the window or presses ESC, or we can 
-        eventually add a pause/escape back to main menu if desired.
-        """
-        while self.state == STATE_GAMEPLAY:
-            dt_game = self.clock.tick(FPS) / 1000.0
-            self.play_ost(dt_game)
+        def label(option):
+            if option == "Sound Volume":
+                return f"{option}: {self.config.sound_volume:.1f}"
+            elif option == "Player Speed":
+                return f"{option}: {self.config.player_speed}"
+            return option
 
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.state = STATE_EXIT
-                    return
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
-                        self.state = STATE_MAIN_MENU
-                        return
-
-            # Handle player input
-            self.player.handle_keys()
-
-            # Apply gravity
-            self.player.apply_gravity()
-
-            # Move player
-            self.player.move(self.platforms)
-
-            # Check collectible collisions
-            for c in self.collectibles:
-                c.check_collision(self.player)
-
-            # Drawing
-            self.screen.fill(SKY_BLUE)
-
-            # Draw platforms
-            for platform in self.platforms:
-                platform.draw(self.screen)
-
-            # Draw collectibles
-            for c in self.collectibles:
-                c.draw(self.screen)
-
-            # Draw player
-            self.player.draw(self.screen)
-
-            # Draw score
-            score_text = self.font.render(f"Score: {self.player.score}", True, BLACK)
-            self.screen.blit(score_text, (10, 10))
-
-            pygame.display.flip()
+        config_options = ["Sound Volume", "Player Speed", "Back"]
+        return MenuState(self, "Config", config_options, on_select, on_adjust, label,
+                         underline_selected=False)
 
 # -----------------------------------------------------------------------------
 # ENTRY POINT
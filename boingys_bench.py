@@ -0,0 +1,576 @@
+"""
+Benchmarks and self-checks for BOINGYS Adventure.
+
+    python boingys_bench.py collide [OBJECTS FRAMES]
+    python boingys_bench.py stream [FRAMES]
+    python boingys_bench.py render [FRAMES]
+    python boingys_bench.py menu [SECONDS]
+    python boingys_bench.py frames [SECONDS]
+    python boingys_bench.py autosave [SECONDS]
+    python boingys_bench.py physics [FRAMES]
+    python boingys_bench.py particles [FRAMES]
+"""
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import boingys_levels
+import boingys_particles
+import boingys_save
+from M1KOOBOOSADVENTURE import (
+    WIDTH, HEIGHT, SKY_BLUE, BLACK, FPS, GRAVITY, MAX_FALL_SPEED, SPEED_SCALE,
+    SpatialHash, Player, Platform, Collectible, CachedText, Camera, LevelStream,
+    move_and_collect,
+)
+
+# -----------------------------------------------------------------------------
+# HELPERS
+# -----------------------------------------------------------------------------
+def _frame_stats(samples):
+    samples = sorted(samples)
+    return (statistics.fmean(samples) * 1e6,
+            samples[int(len(samples) * 0.99)] * 1e6)
+
+def _scripted_inputs(seed, frames, speed=5, jump_speed=15):
+    """Per-frame (speed setting, jump) a wandering player might produce."""
+    rng = random.Random(seed)
+    inputs = []
+    vel_x = speed
+    for _ in range(frames):
+        if rng.random() < 0.02:
+            vel_x = rng.choice((-speed, 0, speed, speed))
+        inputs.append((vel_x, rng.random() < 0.05))
+    return inputs
+
+def _headless_display():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import pygame
+    pygame.init()
+    return pygame, pygame.display.set_mode((WIDTH, HEIGHT))
+
+def _apply_input(player, vel_x, jump):
+    player.vel_x = vel_x * SPEED_SCALE
+    if jump and player.on_ground:
+        player.jump()
+
+# -----------------------------------------------------------------------------
+# SPATIAL HASH VS SCANNING EVERY OBJECT
+# -----------------------------------------------------------------------------
+def _random_world(n_objects, seed, screens=100):
+    """n_objects platforms and n_objects collectibles over a wide world."""
+    rng = random.Random(seed)
+    width, height = WIDTH * screens, HEIGHT * 4
+    platforms = [Platform(0, height - 40, width, 40)]
+    while len(platforms) < n_objects:
+        platforms.append(Platform(rng.randrange(0, width - 200), rng.randrange(100, height - 60),
+                                  rng.randrange(60, 200), 20))
+    collectibles = [Collectible(rng.randrange(20, width - 20), rng.randrange(20, height - 60))
+                    for _ in range(n_objects)]
+    return (width, height), platforms, collectibles
+
+def _run_linear(bounds, platforms, collectibles, inputs):
+    player = Player(100, bounds[1] - 100)
+    times = []
+    for vel_x, jump in inputs:
+        start = time.perf_counter()
+        _apply_input(player, vel_x, jump)
+        player.move(platforms, bounds)
+        for c in collectibles:
+            c.check_collision(player)
+        times.append(time.perf_counter() - start)
+    return player, times
+
+def _run_hashed(bounds, platforms, collectibles, inputs):
+    player = Player(100, bounds[1] - 100)
+    platform_index = SpatialHash()
+    for platform in platforms:
+        platform.add_to(platform_index)
+    collectible_index = SpatialHash()
+    for c in collectibles:
+        c.add_to(collectible_index)
+    times = []
+    for vel_x, jump in inputs:
+        start = time.perf_counter()
+        _apply_input(player, vel_x, jump)
+        move_and_collect(player, platform_index, collectible_index, bounds)
+        times.append(time.perf_counter() - start)
+    return player, times
+
+def bench_collide(n_objects=10000, frames=3000):
+    inputs = _scripted_inputs(1, frames)
+    results = {}
+    for name, run in (("scan all", _run_linear), ("spatial hash", _run_hashed)):
+        bounds, platforms, collectibles = _random_world(n_objects, 7)
+        start = time.perf_counter()
+        player, times = run(bounds, platforms, collectibles, inputs)
+        elapsed = time.perf_counter() - start
+        collected = [i for i, c in enumerate(collectibles) if c.collected]
+        results[name] = ((player.x, player.y, player.score), collected)
+        mean, p99 = _frame_stats(times)
+        print(f"  {name:>12}: {elapsed:.3f}s, per frame mean {mean:.1f}us / p99 {p99:.1f}us")
+    assert results["scan all"] == results["spatial hash"], "broadphase changed the outcome"
+    (x, y, score), _ = results["spatial hash"]
+    print(f"{n_objects} platforms + {n_objects} collectibles, {frames} frames: "
+          f"same path and pickups both ways (ended at {x:.0f},{y:.0f} with {score} collected)")
+
+# -----------------------------------------------------------------------------
+# STREAMED LEVELS OF GROWING SIZE
+# -----------------------------------------------------------------------------
+def _run_level(path, inputs):
+    """Play inputs on a streamed level; (open seconds, frame times, level, player)."""
+    start = time.perf_counter()
+    level = LevelStream(path)
+    opened = time.perf_counter() - start
+    player = Player(*level.spawn)
+    camera = Camera()
+    camera.follow(player.x, player.y, level.bounds)
+    times = []
+    peak = 0
+    for vel_x, jump in inputs:
+        start = time.perf_counter()
+        _apply_input(player, vel_x, jump)
+        level.update_view(camera.view())
+        move_and_collect(player, level.platform_index, level.collectible_index, level.bounds)
+        camera.follow(player.x, player.y, level.bounds)
+        level.visible_chunks(camera.view())
+        times.append(time.perf_counter() - start)
+        peak = max(peak, len(level.loaded))
+    level.close()
+    return opened, times, peak, player
+
+def bench_stream(frames=20000):
+    # Mostly running right, so the camera keeps crossing into new chunks
+    inputs = [(abs(vel_x) or 5, jump) for vel_x, jump in _scripted_inputs(3, frames, speed=10)]
+    with tempfile.TemporaryDirectory() as tmp:
+        for screens in (10, 100, 1000):
+            path = os.path.join(tmp, f"{screens}.blv")
+            boingys_levels.write_level(path, *boingys_levels.generate_tiles(screens, screens))
+            opened, times, peak, player = _run_level(path, inputs)
+            mean, p99 = _frame_stats(times)
+            print(f"{screens:>5} screens ({os.path.getsize(path) / 1024:.0f} KB): "
+                  f"open {opened * 1e3:.2f}ms, per frame mean {mean:.1f}us / p99 {p99:.1f}us, "
+                  f"peak {peak} chunks loaded, reached x={player.x:.0f} with {player.score} coins")
+
+# -----------------------------------------------------------------------------
+# LAYERED RENDERING VS REDRAWING EVERYTHING
+# -----------------------------------------------------------------------------
+def _all_objects(level):
+    """Every platform and coin in the level, as the original renderer kept them."""
+    reader = level.reader
+    platforms, collectibles = [], []
+    for cy in range(reader.chunks_y):
+        for cx in range(reader.chunks_x):
+            rects, coins = reader.chunk_objects(cx, cy)
+            platforms += [Platform(*rect) for rect in rects]
+            collectibles += [Collectible(x, y) for x, y in coins]
+    return platforms, collectibles
+
+def _render_frames(pygame, screen, path, inputs, mode):
+    level = LevelStream(path)
+    font = pygame.font.Font(None, 36)
+    score_text = CachedText(font)
+    if mode == "every object":
+        platforms, collectibles = _all_objects(level)
+    player = Player(*level.spawn)
+    camera = Camera()
+    camera.follow(player.x, player.y, level.bounds)
+    times = []
+    for vel_x, jump in inputs:
+        _apply_input(player, vel_x, jump)
+        level.update_view(camera.view())
+        level.collect(move_and_collect(player, level.platform_index,
+                                       level.collectible_index, level.bounds))
+        camera.follow(player.x, player.y, level.bounds)
+
+        start = time.perf_counter()
+        offset = camera.offset
+        if mode == "layered":
+            level.draw(screen, camera)
+            player.draw(screen, offset)
+            screen.blit(score_text.render(f"Score: {player.score}"), (10, 10))
+        else:
+            screen.fill(SKY_BLUE)
+            if mode == "every object":
+                visible = [(platforms, collectibles)]
+            else:
+                visible = [(c.platforms, c.collectibles) for c in level.visible_chunks(camera.view())]
+            for chunk_platforms, chunk_collectibles in visible:
+                for platform in chunk_platforms:
+                    platform.draw(screen, offset)
+                for c in chunk_collectibles:
+                    c.draw(screen, offset)
+            player.draw(screen, offset)
+            screen.blit(font.render(f"Score: {player.score}", True, BLACK), (10, 10))
+        pygame.display.flip()
+        times.append(time.perf_counter() - start)
+    level.close()
+    return times
+
+def _detailed_tiles(seed, screens):
+    """A generated level with a quarter of the sky scattered with blocks and coins."""
+    rng = random.Random(seed)
+    tiles, spawn = boingys_levels.generate_tiles(seed, screens)
+    for row in tiles[:-6]:
+        for x in range(len(row)):
+            if rng.random() < 0.25:
+                row[x] = boingys_levels.TILE_SOLID if rng.random() < 0.8 else boingys_levels.TILE_COIN
+    return tiles, spawn
+
+def bench_render(frames=600):
+    pygame, screen = _headless_display()
+    inputs = [(abs(vel_x) or 5, jump) for vel_x, jump in _scripted_inputs(5, frames, speed=10)]
+    with tempfile.TemporaryDirectory() as tmp:
+        detailed = os.path.join(tmp, "detailed.blv")
+        boingys_levels.write_level(detailed, *_detailed_tiles(9, 20))
+        levels = [(f"level {n} ({boingys_levels.LEVELS[n][1]} screens)",
+                   boingys_levels.ensure_level(n, tmp)) for n in (1, 3)]
+        levels.append(("detailed (20 screens)", detailed))
+        for name, path in levels:
+            print(f"{name}, {frames} frames:")
+            base = None
+            for mode in ("every object", "culled", "layered"):
+                mean, p99 = _frame_stats(_render_frames(pygame, screen, path, inputs, mode))
+                base = base or mean
+                print(f"  {mode:>12}: render mean {mean:.0f}us / p99 {p99:.0f}us "
+                      f"({mean / base:.0%} of redrawing everything)")
+    pygame.quit()
+
+# -----------------------------------------------------------------------------
+# IDLE CPU ON A MENU
+# -----------------------------------------------------------------------------
+def _legacy_run_menu(game, title, options):
+    """The pre-caching menu loop: re-render and flip at 60 FPS, input or not."""
+    import pygame
+    from M1KOOBOOSADVENTURE import FPS, WHITE, GRAY, STATE_EXIT
+    clock = pygame.time.Clock()
+    selected_option = 0
+    while True:
+        game.play_ost(clock.tick(FPS) / 1000.0)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                game.state = STATE_EXIT
+                return
+        game.screen.fill(SKY_BLUE)
+        title_text = game.menu_font.render(title, True, BLACK)
+        game.screen.blit(title_text, (WIDTH // 2 - title_text.get_width() // 2, HEIGHT // 4))
+        for idx, option in enumerate(options):
+            color = WHITE if idx == selected_option else GRAY
+            menu_item = game.instruct_font.render(option, True, color)
+            game.screen.blit(menu_item, (WIDTH // 2 - menu_item.get_width() // 2,
+                                         HEIGHT // 2 + idx * 50))
+        pygame.display.flip()
+
+def bench_menu(seconds=3):
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import pygame
+    from M1KOOBOOSADVENTURE import Game, STATE_MAIN_MENU
+    with tempfile.TemporaryDirectory() as tmp:
+        game = Game(save_dir=tmp)  # default config, not the player's saved one
+    options = ["Start Game", "File Select", "Config", "Exit"]
+
+    def idle_aware():
+        game.state = STATE_MAIN_MENU
+        game.scheduler.run(game)
+
+    runs = (("60 FPS redraw", lambda: _legacy_run_menu(game, "BOINGYS Adventure", options)),
+            ("idle-aware", idle_aware))
+    flip = pygame.display.flip
+    flips = [0]
+
+    def counting_flip():
+        flips[0] += 1
+        flip()
+
+    pygame.display.flip = counting_flip
+    baseline = time.process_time()
+    time.sleep(seconds)
+    # The mixer's thread keeps running whatever the menu does
+    baseline = (time.process_time() - baseline) / seconds
+    print(f"main menu left idle for {seconds}s (process at rest: {baseline:.1%} of a core):")
+    for name, run in runs:
+        notes = game.current_note
+        flips[0] = 0
+        pygame.time.set_timer(pygame.QUIT, int(seconds * 1000), 1)
+        wall, cpu = time.perf_counter(), time.process_time()
+        run()
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        played = (game.current_note - notes) % len(game.ost_sounds)
+        print(f"  {name:>13}: {cpu / wall:.1%} of a core, {flips[0]} frames drawn, "
+              f"OST advanced {played} notes (mod {len(game.ost_sounds)}; "
+              f"expected {round(wall / game.note_duration) % len(game.ost_sounds)})")
+    pygame.display.flip = flip
+    pygame.quit()
+
+# -----------------------------------------------------------------------------
+# FRAME SCHEDULER PACING
+# -----------------------------------------------------------------------------
+def bench_frames(seconds=5):
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import pygame
+    from M1KOOBOOSADVENTURE import Game, STATE_GAMEPLAY
+    with tempfile.TemporaryDirectory() as tmp:
+        game = Game(save_dir=tmp)
+        game.load_level(boingys_levels.ensure_level(3, tmp))
+        game.state = STATE_GAMEPLAY
+        pygame.time.set_timer(pygame.QUIT, int(seconds * 1000), 1)
+        start = time.perf_counter()
+        game.scheduler.run(game)
+        elapsed = time.perf_counter() - start
+    stats = game.scheduler.stats()
+    work, interval = stats["work"], stats["interval"]
+    print(f"gameplay on level 3 for {elapsed:.1f}s: {stats['frames']} frames "
+          f"({stats['frames'] / elapsed:.1f}/s, budget {stats['budget']:.2f}ms, "
+          f"{stats['over_budget']} over budget)")
+    print(f"  work per frame:   p50 {work['p50']:.2f}ms / p95 {work['p95']:.2f}ms / "
+          f"p99 {work['p99']:.2f}ms / max {work['max']:.2f}ms")
+    print(f"  frame intervals:  p50 {interval['p50']:.2f}ms / p95 {interval['p95']:.2f}ms / "
+          f"p99 {interval['p99']:.2f}ms / max {interval['max']:.2f}ms")
+    pygame.quit()
+
+# -----------------------------------------------------------------------------
+# FRAME TIMES WHILE AUTOSAVING EVERY FRAME
+# -----------------------------------------------------------------------------
+def bench_autosave(seconds=4):
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import pygame
+    from M1KOOBOOSADVENTURE import Game, FrameScheduler, STATE_GAMEPLAY
+    with tempfile.TemporaryDirectory() as tmp:
+        game = Game(save_dir=tmp)
+        game.level_dir = tmp
+        print(f"gameplay on level 3 for {seconds}s per run, 10000 coins in the save:")
+        for name, every in (("no autosave", float("inf")), ("every frame", 0.0)):
+            game.start_slot(3)
+            keys = [(chunk, 0) for chunk in range(10000)]
+            game.level.collected = set(keys)
+            game.level.collected_log[:] = b"".join(boingys_save.COIN.pack(*key) for key in keys)
+            game.autosave_seconds = every
+            game.scheduler = FrameScheduler()
+            game.state = STATE_GAMEPLAY
+            written = game.saves.written
+            pygame.time.set_timer(pygame.QUIT, int(seconds * 1000), 1)
+            game.scheduler.run(game)
+            game.saves.flush()
+            stats = game.scheduler.stats()
+            work, interval = stats["work"], stats["interval"]
+            print(f"  {name:>11}: {game.saves.written - written} saves written for "
+                  f"{stats['frames']} frames; work p50 {work['p50']:.2f}ms / "
+                  f"p99 {work['p99']:.2f}ms / max {work['max']:.2f}ms, "
+                  f"interval p99 {interval['p99']:.2f}ms, {stats['over_budget']} over budget")
+        saved = boingys_save.read_save(game.slot_path(3))
+        assert boingys_save.coin_keys(saved.collected) == game.level.collected
+        assert saved.score == game.player.score
+        header = boingys_save.read_header(game.slot_path(3))
+        print(f"  slot 3 on disk: {os.path.getsize(game.slot_path(3))} bytes, "
+              f"header preview {header.coins} coins at {header.progress:.0%}; full load matches")
+    game.saves.close()
+    pygame.quit()
+
+# -----------------------------------------------------------------------------
+# FIXED-STEP SWEPT PHYSICS
+# -----------------------------------------------------------------------------
+def _legacy_move(player, platforms, bounds, dt):
+    """The pre-sweep move, scaled to dt: step, then test what it overlaps."""
+    player.vel_y = min(player.vel_y + GRAVITY * dt, MAX_FALL_SPEED)
+    player.x += player.vel_x * dt
+    player.y += player.vel_y * dt
+    r = player.radius
+    if player.y + r > bounds[1]:
+        player.y = bounds[1] - r
+        player.vel_y = 0
+    player.on_ground = False
+    for platform in platforms:
+        if (player.x + r > platform.x and player.x - r < platform.x + platform.width and
+                player.y + r > platform.y and player.y - r < platform.y + platform.height):
+            if player.vel_y > 0 and player.y - r < platform.y:
+                player.y = platform.y - r
+                player.vel_y = 0
+                player.on_ground = True
+
+def _drops(move, hz, thickness, trials=200):
+    """How many of `trials` falls from random heights land on a thin platform."""
+    rng = random.Random(hz * 1000 + thickness)
+    bounds = (WIDTH, HEIGHT * 4)
+    platform = Platform(0, HEIGHT * 3, WIDTH, thickness)
+    landed = 0
+    for _ in range(trials):
+        player = Player(WIDTH // 2, rng.uniform(HEIGHT, HEIGHT * 3 - 200))
+        player.vel_y = MAX_FALL_SPEED * rng.random()
+        for _ in range(hz * 3):
+            move(player, [platform], bounds, 1.0 / hz)
+            if player.on_ground or player.y > platform.y:
+                break
+        landed += player.on_ground and player.y < platform.y
+    return landed, trials
+
+def _dash(hz, discrete, trials=200):
+    """Coins picked up running past them at top speed (10), simulated at hz."""
+    rng = random.Random(hz)
+    player = Player(20, HEIGHT // 2, speed=10)
+    coins = [Collectible(rng.uniform(100, WIDTH * 50), HEIGHT // 2 + rng.uniform(-28, 28))
+             for _ in range(trials)]
+    player.vel_x = player.speed * SPEED_SCALE
+    while player.x < WIDTH * 50:
+        player.prev_x, player.prev_y = player.x, player.y
+        player.x += player.vel_x / hz
+        if discrete:
+            # The pre-sweep check: distance at the end of the tick only
+            player.prev_x = player.x
+        for c in coins:
+            c.check_collision(player)
+    return sum(c.collected for c in coins), trials
+
+def _jump_apex(hz):
+    """Highest point of a standing jump off the floor, simulated at hz."""
+    player = Player(WIDTH // 2, HEIGHT - 20)
+    player.on_ground = True
+    player.jump()
+    top = player.y
+    for _ in range(hz * 3):
+        player.move([], (WIDTH, HEIGHT), 1.0 / hz)
+        top = min(top, player.y)
+        if player.on_ground:
+            break
+    return HEIGHT - 20 - top
+
+def _simulate(path, hz, inputs):
+    """Run 60 FPS frames of inputs with physics at hz; (seconds, level, player)."""
+    level = LevelStream(path)
+    player = Player(*level.spawn)
+    camera = Camera()
+    camera.follow(player.x, player.y, level.bounds)
+    tick = 1.0 / hz
+    accumulator = 0.0
+    start = time.perf_counter()
+    for vel_x, jump in inputs:
+        accumulator += 1.0 / FPS
+        while accumulator >= tick:
+            accumulator -= tick
+            _apply_input(player, vel_x, jump)
+            level.update_view(camera.view())
+            level.collect(move_and_collect(player, level.platform_index,
+                                           level.collectible_index, level.bounds, tick))
+            camera.follow(player.x, player.y, level.bounds)
+    elapsed = time.perf_counter() - start
+    level.close()
+    return elapsed, level, player
+
+def bench_physics(frames=6000):
+    legacy = lambda player, platforms, bounds, dt: _legacy_move(player, platforms, bounds, dt)
+    swept = lambda player, platforms, bounds, dt: player.move(platforms, bounds, dt)
+    print("falls onto a thin platform that land on it (rest fell through):")
+    for thickness in (4, 20):
+        for hz in (60, 30, 15, 10):
+            old, trials = _drops(legacy, hz, thickness)
+            new, _ = _drops(swept, hz, thickness)
+            print(f"  {thickness:>2}px platform at {hz:>3} Hz: discrete {old}/{trials}, swept {new}/{trials}")
+            assert new == trials, "swept physics tunneled"
+    print("coins in the way of a full-speed run that get picked up:")
+    for hz in (60, 30, 15, 10):
+        old, trials = _dash(hz, discrete=True)
+        new, _ = _dash(hz, discrete=False)
+        print(f"  at {hz:>3} Hz: discrete {old}/{trials}, swept {new}/{trials}")
+        assert new == trials, "swept pickup missed a coin"
+
+    # The apex falls between ticks, so sampled heights can be short by g*dt^2/8
+    exact = (15 * SPEED_SCALE) ** 2 / (2 * GRAVITY)
+    apexes = {hz: _jump_apex(hz) for hz in (15, 30, 60, 120, 240)}
+    print(f"jump height by tick rate (exact {exact:.1f}px): " +
+          ", ".join(f"{hz} Hz {apex:.1f}px" for hz, apex in apexes.items()))
+    assert all(0 <= exact - apex <= GRAVITY / hz / hz / 8 + 0.01 for hz, apex in apexes.items()), \
+        "jump height depends on tick rate"
+
+    inputs = [(abs(vel_x) or 5, jump) for vel_x, jump in _scripted_inputs(11, frames, speed=10)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = boingys_levels.ensure_level(3, tmp)
+        print(f"level 3, {frames} frames at {FPS} FPS:")
+        for hz in (120, 60, 30):
+            elapsed, level, player = _simulate(path, hz, inputs)
+            print(f"  physics at {hz:>3} Hz: {elapsed / frames * 1e6:.1f}us per frame, "
+                  f"reached x={player.x:.0f} with {player.score} coins, "
+                  f"{level.chunk_loads} chunk loads")
+
+# -----------------------------------------------------------------------------
+# PARTICLE POOL AT SCALE
+# -----------------------------------------------------------------------------
+def _particle_frames(pygame, screen, live, frames):
+    """Frame times of a pool held at about `live` particles: (update, draw) seconds."""
+    pool = boingys_particles.ParticlePool(seed=live)
+    rng = random.Random(live)
+    burst = 50
+    # Lifetimes average 1s, so emitting live/60 a frame holds about `live` alive
+    per_frame = live / 60.0 / burst
+    owed = 0.0
+    updates, draws = [], []
+    for frame in range(frames * 2):
+        owed += per_frame
+        while owed >= 1:
+            owed -= 1
+            pool.emit(rng.uniform(0, WIDTH), rng.uniform(0, HEIGHT), burst, 200.0, math.pi, 1.0,
+                      (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+        screen.fill(SKY_BLUE)
+        start = time.perf_counter()
+        pool.update(1.0 / FPS)
+        middle = time.perf_counter()
+        pool.draw(screen, (0, 0))
+        end = time.perf_counter()
+        pygame.display.flip()
+        if frame >= frames:  # after the pool has filled up
+            updates.append(middle - start)
+            draws.append(end - middle)
+    return pool, updates, draws
+
+def bench_particles(frames=300):
+    pygame, screen = _headless_display()
+
+    # A particle lands on the pixels its position says, in its colour
+    pool = boingys_particles.ParticlePool(seed=1)
+    pool.emit(100, 200, 1, 0.0, 0.0, 1.0, (10, 20, 30))
+    pool.emit(100, 200, 1, 0.0, 0.0, 0.0, (40, 50, 60))
+    pool.update(0.01)
+    screen.fill(BLACK)
+    pool.draw(screen, (50, 50))
+    assert pool.count == 1, "dead particle not removed"
+    x, y = int(pool.pos[0, 0]) - 50, int(pool.pos[1, 0]) - 50
+    assert tuple(screen.get_at((x + 1, y + 1)))[:3] == (10, 20, 30), "particle drawn in the wrong place"
+
+    print(f"particle pool ({boingys_particles.PARTICLE_CAPACITY} capacity), {frames} frames at 800x600:")
+    budget = 1000.0 / FPS
+    for live in (1000, 10000, 30000, 60000):
+        pool, updates, draws = _particle_frames(pygame, screen, live, frames)
+        update_mean, update_p99 = _frame_stats(updates)
+        draw_mean, draw_p99 = _frame_stats(draws)
+        total = (update_mean + draw_mean) / 1000
+        print(f"  ~{live:>5} live ({pool.count} at the end, {pool.dropped} dropped): "
+              f"update {update_mean:.0f}us / p99 {update_p99:.0f}us, "
+              f"draw {draw_mean:.0f}us / p99 {draw_p99:.0f}us "
+              f"({total / budget:.1%} of a {budget:.2f}ms frame)")
+    pygame.quit()
+
+BENCHMARKS = {
+    "collide": bench_collide,
+    "stream": bench_stream,
+    "render": bench_render,
+    "menu": bench_menu,
+    "frames": bench_frames,
+    "autosave": bench_autosave,
+    "physics": bench_physics,
+    "particles": bench_particles,
+}
+
+def main(argv):
+    if not argv or argv[0] not in BENCHMARKS:
+        print("usage: python boingys_bench.py {%s} [args...]" % ",".join(BENCHMARKS))
+        return 1
+    BENCHMARKS[argv[0]](*(int(a) for a in argv[1:]))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
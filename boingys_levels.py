@@ -0,0 +1,243 @@
+"""
+Chunked tile levels for BOINGYS Adventure.
+
+A level is a grid of 20-pixel tiles (empty, solid, coin) cut into square
+chunks of 16x16 tiles. Each chunk is stored zlib-compressed on its own,
+behind a table of offsets, so a loader can read just the chunks around
+the camera:
+
+    header  magic "BLVL", version u8, tile size u8, chunk tiles u8,
+            width u32, height u32 (in tiles), spawn x u32, spawn y u32 (pixels)
+    table   per chunk, row-major: offset u32, length u32 (0 = all empty)
+    chunks  zlib(chunk_tiles * chunk_tiles tile bytes)
+
+LevelReader opens a level by reading only the header and table, so it is
+instant whatever the level's size; chunk_objects() turns one chunk into
+platform rects (solid runs merged into rectangles) and coin centres.
+LevelStream in M1KOOBOOSADVENTURE.py streams chunks around the camera.
+
+    python boingys_levels.py build [DIR]    # (re)generate levels 1-3
+    python boingys_levels.py info FILE
+"""
+import io
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+
+MAGIC = b"BLVL"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBxIIII")
+CHUNK_ENTRY = struct.Struct("<II")
+
+TILE_SIZE = 20
+CHUNK_TILES = 16
+TILE_EMPTY = 0
+TILE_SOLID = 1
+TILE_COIN = 2
+
+SCREEN_TILES = (40, 30)  # 800 x 600 pixels
+TIER_RISE = 5            # tiles between platform tiers (a jump clears about 7)
+
+LEVEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "levels")
+# File Select entries: (seed, screens wide, screens tall)
+LEVELS = {
+    1: (1, 10, 1),
+    2: (2, 50, 1),
+    3: (3, 200, 2),
+}
+
+# -----------------------------------------------------------------------------
+# WRITING
+# -----------------------------------------------------------------------------
+def encode_level(tiles, spawn, tile_size=TILE_SIZE, chunk_tiles=CHUNK_TILES):
+    """Level file bytes for tiles (a list of equal-length bytearray rows)."""
+    height = len(tiles)
+    width = len(tiles[0])
+    chunks_x = -(-width // chunk_tiles)
+    chunks_y = -(-height // chunk_tiles)
+    table = []
+    payload = io.BytesIO()
+    data_start = HEADER.size + chunks_x * chunks_y * CHUNK_ENTRY.size
+    for cy in range(chunks_y):
+        for cx in range(chunks_x):
+            chunk = bytearray(chunk_tiles * chunk_tiles)
+            for row in range(chunk_tiles):
+                y = cy * chunk_tiles + row
+                if y >= height:
+                    break
+                x = cx * chunk_tiles
+                part = tiles[y][x:x + chunk_tiles]
+                chunk[row * chunk_tiles:row * chunk_tiles + len(part)] = part
+            if any(chunk):
+                data = zlib.compress(bytes(chunk), 9)
+                table.append((data_start + payload.tell(), len(data)))
+                payload.write(data)
+            else:
+                table.append((0, 0))
+    out = io.BytesIO()
+    out.write(HEADER.pack(MAGIC, VERSION, tile_size, chunk_tiles, width, height,
+                          int(spawn[0]), int(spawn[1])))
+    for entry in table:
+        out.write(CHUNK_ENTRY.pack(*entry))
+    out.write(payload.getvalue())
+    return out.getvalue()
+
+def write_level(path, tiles, spawn, **kwargs):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(encode_level(tiles, spawn, **kwargs))
+    os.replace(tmp, path)
+
+# -----------------------------------------------------------------------------
+# GENERATION
+# -----------------------------------------------------------------------------
+def room_tiles():
+    """The original single-screen room, snapped to the tile grid."""
+    width, height = SCREEN_TILES
+    tiles = [bytearray(width) for _ in range(height)]
+    for y in (28, 29):
+        tiles[y][:] = bytes([TILE_SOLID]) * width
+    for x, y in ((10, 22), (25, 17), (15, 12)):
+        tiles[y][x:x + 10] = bytes([TILE_SOLID]) * 10
+    for x, y in ((12, 21), (27, 16), (17, 11)):
+        tiles[y][x] = TILE_COIN
+    return tiles, (100, 500)
+
+def generate_tiles(seed, screens_wide, screens_tall=1):
+    """
+    A seeded level: a ground with gaps, and platforms in tiers TIER_RISE
+    tiles apart that step up or down at most one tier at a time, so each
+    one is reachable from the last. Every platform carries a coin.
+    """
+    rng = random.Random(seed)
+    width = SCREEN_TILES[0] * screens_wide
+    height = SCREEN_TILES[1] * screens_tall
+    tiles = [bytearray(width) for _ in range(height)]
+    ground = height - 2
+    for y in (ground, ground + 1):
+        tiles[y][:] = bytes([TILE_SOLID]) * width
+    x = SCREEN_TILES[0]
+    while x < width - 8:
+        if rng.random() < 0.3:
+            gap = rng.randint(2, 4)
+            for y in (ground, ground + 1):
+                tiles[y][x:x + gap] = bytes(gap)
+        x += rng.randint(12, 30)
+
+    max_tier = (ground - 4) // TIER_RISE
+    tier = 0
+    x = 8
+    while x < width - 12:
+        tier = max(0, min(max_tier, tier + rng.choice((-1, 0, 1, 1))))
+        length = rng.randint(4, 10)
+        if tier == 0:
+            tiles[ground - 1][x + length // 2] = TILE_COIN
+        else:
+            y = ground - tier * TIER_RISE
+            tiles[y][x:x + length] = bytes([TILE_SOLID]) * length
+            tiles[y - 1][x + rng.randrange(length)] = TILE_COIN
+        x += length + rng.randint(2, 6)
+    return tiles, (100, (ground - 3) * TILE_SIZE)
+
+def level_path(number, directory=LEVEL_DIR):
+    return os.path.join(directory, f"level{number}.blv")
+
+def ensure_level(number, directory=LEVEL_DIR, rebuild=False):
+    """Path to File Select level `number`, generating the file the first time."""
+    path = level_path(number, directory)
+    if rebuild or not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        seed, wide, tall = LEVELS[number]
+        tiles, spawn = generate_tiles(seed, wide, tall)
+        write_level(path, tiles, spawn)
+    return path
+
+# -----------------------------------------------------------------------------
+# READING
+# -----------------------------------------------------------------------------
+class LevelReader:
+    """Reads chunks on demand from a level file path or level bytes."""
+    def __init__(self, source):
+        self.file = open(source, "rb") if isinstance(source, str) else io.BytesIO(source)
+        header = self.file.read(HEADER.size)
+        (magic, version, self.tile_size, self.chunk_tiles,
+         self.width, self.height, spawn_x, spawn_y) = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{source!r:.40} is not a BOINGYS level")
+        if version != VERSION:
+            raise ValueError(f"unsupported level version {version}")
+        self.spawn = (spawn_x, spawn_y)
+        self.chunks_x = -(-self.width // self.chunk_tiles)
+        self.chunks_y = -(-self.height // self.chunk_tiles)
+        self.chunk_pixels = self.tile_size * self.chunk_tiles
+        self.pixel_size = (self.width * self.tile_size, self.height * self.tile_size)
+        count = self.chunks_x * self.chunks_y
+        self.table = list(CHUNK_ENTRY.iter_unpack(self.file.read(count * CHUNK_ENTRY.size)))
+
+    def close(self):
+        self.file.close()
+
+    def chunk_tiles_at(self, cx, cy):
+        """The chunk's tile bytes (row-major), or None if it is all empty."""
+        offset, length = self.table[cy * self.chunks_x + cx]
+        if not length:
+            return None
+        self.file.seek(offset)
+        return zlib.decompress(self.file.read(length))
+
+    def chunk_objects(self, cx, cy):
+        """([(x, y, w, h)] platform rects, [(x, y)] coin centres) in pixels."""
+        tiles = self.chunk_tiles_at(cx, cy)
+        if tiles is None:
+            return [], []
+        n = self.chunk_tiles
+        size = self.tile_size
+        left = cx * self.chunk_pixels
+        top = cy * self.chunk_pixels
+        rects = []
+        coins = []
+        open_runs = {}  # (start, end) -> rect index, for runs continuing down from the row above
+        for row in range(n):
+            runs = {}
+            col = 0
+            while col < n:
+                tile = tiles[row * n + col]
+                if tile == TILE_COIN:
+                    coins.append((left + col * size + size // 2, top + row * size + size // 2))
+                if tile != TILE_SOLID:
+                    col += 1
+                    continue
+                start = col
+                while col < n and tiles[row * n + col] == TILE_SOLID:
+                    col += 1
+                run = (start, col)
+                if run in open_runs:
+                    x, y, w, h = rects[open_runs[run]]
+                    rects[open_runs[run]] = (x, y, w, h + size)
+                    runs[run] = open_runs[run]
+                else:
+                    rects.append((left + start * size, top + row * size, (col - start) * size, size))
+                    runs[run] = len(rects) - 1
+            open_runs = runs
+        return rects, coins
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args and args[0] == "build":
+        directory = args[1] if len(args) > 1 else LEVEL_DIR
+        for number in LEVELS:
+            start = time.perf_counter()
+            path = ensure_level(number, directory, rebuild=True)
+            print(f"{path}: {os.path.getsize(path) / 1024:.1f} KB "
+                  f"in {time.perf_counter() - start:.2f}s")
+    elif len(args) >= 2 and args[0] == "info":
+        reader = LevelReader(args[1])
+        filled = sum(1 for _, length in reader.table if length)
+        print(f"{reader.width}x{reader.height} tiles ({reader.pixel_size[0]}x{reader.pixel_size[1]} px), "
+              f"{reader.chunks_x}x{reader.chunks_y} chunks ({filled} non-empty), spawn {reader.spawn}")
+        reader.close()
+    else:
+        print(__doc__)
@@ -0,0 +1,195 @@
+"""
+Particle effects for BOINGYS Adventure.
+
+ParticlePool keeps every particle in fixed-capacity NumPy arrays: position
+and velocity (float32 x and y rows, in world pixels and pixels per
+second), remaining lifetime (seconds) and colour (R, G and B byte rows).
+Live particles are packed at the front of each row, so an update is a
+handful of contiguous vectorized operations over [:count], and particles
+that run out of life are squeezed out with np.compress. There are no
+per-particle Python objects, and every step writes into buffers
+preallocated with the pool (`out=`) rather than building new arrays each
+frame; when the pool is full, new particles are dropped (and counted)
+rather than growing it.
+
+draw() writes every on-screen particle straight into the target surface's
+pixel buffer, as a size x size square per particle, so drawing costs a
+few array operations however many particles there are.
+
+The effects (collect, land, jump) are emit() calls with their own spread,
+speed, lifetime and colour.
+"""
+import math
+
+import numpy as np
+
+PARTICLE_CAPACITY = 65536
+PARTICLE_GRAVITY = 900.0  # px/s^2
+PARTICLE_SIZE = 2         # px
+
+# Effects: (count, speed px/s, spread radians around straight up, lifetime s, colour)
+EFFECT_COLLECT = (24, 220.0, math.pi, 0.6, (255, 215, 0))
+EFFECT_LAND = (12, 120.0, math.pi / 2.5, 0.35, (120, 100, 80))
+EFFECT_JUMP = (8, 90.0, math.pi / 4, 0.25, (235, 235, 235))
+
+class ParticlePool:
+    def __init__(self, capacity=PARTICLE_CAPACITY, gravity=PARTICLE_GRAVITY,
+                 size=PARTICLE_SIZE, seed=None):
+        self.capacity = capacity
+        self.gravity = gravity
+        self.size = size
+        self.count = 0
+        self.dropped = 0
+        self.rng = np.random.default_rng(seed)
+
+        self.pos = np.zeros((2, capacity), np.float32)
+        self.vel = np.zeros((2, capacity), np.float32)
+        self.life = np.zeros(capacity, np.float32)
+        self.color = np.zeros((3, capacity), np.uint8)
+
+        # Scratch space, so the per-frame work allocates nothing
+        self._step = np.zeros(capacity, np.float32)
+        self._speed = np.zeros(capacity, np.float32)
+        self._alive = np.zeros(capacity, bool)
+        self._edge = np.zeros(capacity, bool)
+        self._keep2 = np.zeros((2, capacity), np.float32)
+        self._keep1 = np.zeros(capacity, np.float32)
+        self._keep3 = np.zeros((3, capacity), np.uint8)
+        self._xy = np.zeros((2, capacity), np.int32)
+        self._index = np.zeros(capacity, np.intp)
+        self._drawn_index = np.zeros(capacity, np.intp)
+        self._mapped = np.zeros(capacity, np.uint32)
+        self._channel = np.zeros(capacity, np.uint32)
+        self._drawn = np.zeros(capacity, np.uint32)
+
+    def clear(self):
+        self.count = 0
+
+    # -------------------------------------------------------------------------
+    # EMITTING
+    # -------------------------------------------------------------------------
+    def emit(self, x, y, count, speed, spread, life, color):
+        """
+        count particles from (x, y), heading up within +-spread radians at
+        up to `speed`, living `life` seconds give or take a half.
+        """
+        start = self.count
+        fits = min(count, self.capacity - start)
+        self.dropped += count - fits
+        count = fits
+        if count <= 0:
+            return
+        end = start + count
+        rng = self.rng
+        angle = self._step[:count]
+        rng.random(out=angle, dtype=np.float32)
+        angle *= 2 * spread
+        angle -= math.pi / 2 + spread
+        speed_ = self._speed[:count]
+        rng.random(out=speed_, dtype=np.float32)
+        speed_ *= 0.5 * speed
+        speed_ += 0.5 * speed
+        vel_x, vel_y = self.vel[0, start:end], self.vel[1, start:end]
+        np.cos(angle, out=vel_x)
+        np.sin(angle, out=vel_y)
+        vel_x *= speed_
+        vel_y *= speed_
+        self.pos[0, start:end] = x
+        self.pos[1, start:end] = y
+        life_ = self.life[start:end]
+        rng.random(out=life_, dtype=np.float32)
+        life_ += 0.5
+        life_ *= life
+        for channel, value in zip(self.color, color):
+            channel[start:end] = value
+        self.count = end
+
+    def effect(self, effect, x, y):
+        """Emit one of the EFFECT_* bursts at (x, y)."""
+        count, speed, spread, life, color = effect
+        self.emit(x, y, count, speed, spread, life, color)
+
+    # -------------------------------------------------------------------------
+    # UPDATING
+    # -------------------------------------------------------------------------
+    def update(self, dt):
+        n = self.count
+        if not n:
+            return
+        vel_y = self.vel[1, :n]
+        vel_y += self.gravity * dt
+        step = self._step[:n]
+        for pos, vel in zip(self.pos, self.vel):
+            np.multiply(vel[:n], dt, out=step)
+            pos[:n] += step
+        life = self.life[:n]
+        life -= dt
+
+        # Squeeze out the dead, keeping the live ones in order
+        alive = self._alive[:n]
+        np.greater(life, 0, out=alive)
+        k = int(np.count_nonzero(alive))
+        if k < n:
+            for array, keep in ((self.pos, self._keep2), (self.vel, self._keep2),
+                                (self.life, self._keep1), (self.color, self._keep3)):
+                np.compress(alive, array[..., :n], axis=-1, out=keep[..., :k])
+                array[..., :k] = keep[..., :k]
+            self.count = k
+
+    # -------------------------------------------------------------------------
+    # DRAWING
+    # -------------------------------------------------------------------------
+    def draw(self, surface, offset=(0, 0)):
+        """Draw every live particle onto a 32-bit surface (others are skipped), offset by the camera."""
+        n = self.count
+        if not n or surface.get_bytesize() != 4:
+            return
+        size = self.size
+        width, height = surface.get_size()
+        pitch = surface.get_pitch() // 4
+
+        # Screen positions, and which squares fit on the screen
+        step = self._step[:n]
+        x, y = self._xy[0, :n], self._xy[1, :n]
+        for pos, screen, shift in ((self.pos[0, :n], x, offset[0]), (self.pos[1, :n], y, offset[1])):
+            np.subtract(pos, np.float32(shift), out=step)
+            np.floor(step, out=step)
+            screen[:] = step
+        visible = self._alive[:n]
+        edge = self._edge[:n]
+        np.greater_equal(x, 0, out=visible)
+        np.less(x, width - size + 1, out=edge)
+        visible &= edge
+        np.greater_equal(y, 0, out=edge)
+        visible &= edge
+        np.less(y, height - size + 1, out=edge)
+        visible &= edge
+        k = int(np.count_nonzero(visible))
+        if not k:
+            return
+
+        # Each particle's top-left pixel as an index into the surface's pixels
+        index = self._index[:n]
+        np.multiply(y, pitch, out=index)
+        index += x
+
+        # Colours in the surface's pixel format
+        mapped = self._mapped[:n]
+        channel = self._channel[:n]
+        mapped[:] = surface.get_masks()[3]
+        for color, shift in zip(self.color, surface.get_shifts()):
+            np.left_shift(color[:n], shift, out=channel, dtype=np.uint32)
+            mapped |= channel
+
+        drawn_index, drawn = self._drawn_index[:k], self._drawn[:k]
+        np.compress(visible, index, out=drawn_index)
+        np.compress(visible, mapped, out=drawn)
+        pixels = np.frombuffer(surface.get_buffer(), np.uint32)
+        try:
+            for dy in range(size):
+                for dx in range(size):
+                    pixels[drawn_index] = drawn
+                    drawn_index += 1
+                drawn_index += pitch - size
+        finally:
+            del pixels
@@ -0,0 +1,682 @@
+"""
+Headless playtests for BOINGYS Adventure.
+
+explore() works out which coins a level's player can reach without
+playing it: it tries every move (below) from standing spots all along
+every surface the player has newly reached, all at once as NumPy
+arrays, and follows where they land until nothing new turns up.
+RouteBot then plays the level through the real gameplay loop with a
+headless Game (SDL dummy drivers, one GameplayState tick per step, no
+frame pacing): it heads for the coins explore() found, planning again
+whenever it lands, and play() reports how long it took to get them all.
+
+A move is what the player can do from standing: jump, or walk off an
+edge, holding left, right or nothing and maybe letting go part way.
+Each move's arc comes from Player.move itself (one per starting height,
+cached), so explore() lands, bonks on the ceiling and collects the way
+the game does; it only adds the platforms and coins, from the level's
+tile grids. Standing spots are START_SPACING pixels apart, so
+"reachable" means reachable with these moves from those spots, and
+play() checks it against the game.
+
+    python boingys_playtest.py [LEVEL|FILE ...]          # explore, then play (default: levels 1-3)
+    python boingys_playtest.py generate COUNT [SCREENS]  # explore COUNT seeded levels, play the first
+"""
+import heapq
+import sys
+import time
+
+import numpy as np
+
+import boingys_levels
+from M1KOOBOOSADVENTURE import (
+    Game, Player, PHYSICS_HZ, SPEED_SCALE, STATE_GAMEPLAY,
+    ACTION_NONE, ACTION_LEFT, ACTION_RIGHT, ACTION_JUMP,
+)
+
+# Moves: (jump, direction, ticks the direction is held; None = until landing)
+MOVES = (
+    [(True, d, None) for d in (-1, 0, 1)] +
+    [(True, d, hold) for d in (-1, 1) for hold in (8, 16)] +
+    [(False, d, None) for d in (-1, 1)] +
+    [(False, d, hold) for d in (-1, 1) for hold in (1, 8)]
+)
+START_SPACING = 10    # px between standing spots tried on a surface
+MAX_AIR_SECONDS = 5   # longest fall followed
+BATCH = 4096          # standing spots simulated at once
+PLAY_SECONDS = 60     # game time play() allows per coin before giving up
+
+# -----------------------------------------------------------------------------
+# LEVEL MAP
+# -----------------------------------------------------------------------------
+class LevelMap:
+    """
+    A whole level as grids: where platform tops are (per tile), the
+    surfaces they form (runs of tops in a row, plus the level's floor,
+    which is the last surface), and the coins with their LevelStream keys.
+    """
+    def __init__(self, source, player_radius=20, coin_radius=10):
+        reader = boingys_levels.LevelReader(source)
+        t = self.tile = reader.tile_size
+        self.cols, self.rows = reader.width, reader.height
+        self.width, self.height = reader.pixel_size
+        self.spawn = reader.spawn
+        self.radius = r = player_radius
+        self.reach = player_radius + coin_radius
+
+        # Platform tops and coins, from the same rects and coins the game loads
+        tops = np.zeros((self.rows, self.cols), bool)
+        coin_x, coin_y, self.coin_keys = [], [], []
+        for cy in range(reader.chunks_y):
+            for cx in range(reader.chunks_x):
+                rects, coins = reader.chunk_objects(cx, cy)
+                for x, y, w, h in rects:
+                    tops[y // t, x // t:(x + w) // t] = True
+                index = cy * reader.chunks_x + cx
+                for i, (x, y) in enumerate(coins):
+                    coin_x.append(x)
+                    coin_y.append(y)
+                    self.coin_keys.append((index, i))
+        reader.close()
+        self.tops = np.zeros((self.rows, self.cols + 1), np.int32)  # running count along each row
+        np.cumsum(tops, axis=1, out=self.tops[:, 1:])
+
+        # Surfaces, and the range of x the player's centre stands on each
+        edges = np.diff(np.pad(tops.astype(np.int8), ((0, 0), (1, 1))), axis=1)
+        rows, first = np.nonzero(edges == 1)
+        _, last = np.nonzero(edges == -1)
+        self.surface_at = np.full((self.rows, self.cols), -1, np.int32)
+        for s, (row, c0, c1) in enumerate(zip(rows, first, last)):
+            self.surface_at[row, c0:c1] = s
+        self.floor = len(rows)
+        self.surface_y = np.append(rows * t - r, self.height - r).astype(np.float64)
+        self.surface_lo = np.maximum(np.append(first * t - r, 0), r).astype(np.float64)
+        self.surface_hi = np.minimum(np.append(last * t + r, self.width), self.width - r).astype(np.float64)
+
+        # Coins, and the tiles within reach of one (to test only those points)
+        self.coin_x = np.array(coin_x, np.float64)
+        self.coin_y = np.array(coin_y, np.float64)
+        self.coin_at = np.full((self.rows + 4, self.cols + 4), -1, np.int32)  # 2-tile border
+        self.coin_at[self.coin_y.astype(int) // t + 2, self.coin_x.astype(int) // t + 2] = np.arange(len(coin_x))
+        has_coin = self.coin_at >= 0
+        self.near_coin = np.zeros_like(has_coin)
+        for dy in range(-2, 3):
+            for dx in range(-2, 3):
+                self.near_coin[2:-2, 2:-2] |= has_coin[2 + dy:self.rows + 2 + dy, 2 + dx:self.cols + 2 + dx]
+
+    @property
+    def coins(self):
+        return len(self.coin_keys)
+
+    def surface_under(self, x, y):
+        """The surface a player standing at (x, y) is on, or -1."""
+        if y >= self.height - self.radius - 0.01:
+            return self.floor
+        return int(self._landing_surface(np.array([round((y + self.radius) / self.tile)]),
+                                         np.array([x], np.float64))[0])
+
+    def _landing_surface(self, rows, x):
+        """Surfaces under x (any shape) for rows of tops; -1 where there is none."""
+        t, r = self.tile, self.radius
+        rows = np.clip(rows, 0, self.rows - 1)
+        c_min = np.clip(np.floor((x - r) / t).astype(np.int64), 0, self.cols - 1)
+        c_max = np.clip(np.ceil((x + r) / t).astype(np.int64) - 1, 0, self.cols - 1)
+        middle = np.clip(np.floor(x / t).astype(np.int64), 0, self.cols - 1)
+        surface = self.surface_at[rows, middle]
+        return np.where(surface >= 0, surface,
+                        np.maximum(self.surface_at[rows, c_min], self.surface_at[rows, c_max]))
+
+# -----------------------------------------------------------------------------
+# MOVE ARCS (FROM PLAYER.MOVE)
+# -----------------------------------------------------------------------------
+_arcs = {}
+
+def move_actions(move, tick):
+    """The ACTION_* bits for tick `tick` of a move."""
+    jump, direction, hold = move
+    actions = ACTION_NONE
+    if hold is None or tick < hold:
+        actions = ACTION_LEFT if direction < 0 else ACTION_RIGHT if direction > 0 else ACTION_NONE
+    if jump and tick == 0:
+        actions |= ACTION_JUMP
+    return actions
+
+def move_arc(move, start_y, height, speed=5, jump_speed=15, hz=PHYSICS_HZ):
+    """
+    (x offset, y) per tick of a move from standing at start_y, in a level
+    `height` pixels tall with nothing to land on but its floor, up to and
+    including landing there.
+    """
+    key = (move, start_y, height, speed, jump_speed, hz)
+    arc = _arcs.get(key)
+    if arc is None:
+        x0 = 1e6
+        player = Player(x0, start_y, speed=speed, jump_speed=jump_speed)
+        player.on_ground = True
+        xs, ys = [], []
+        for tick in range(int(MAX_AIR_SECONDS * hz)):
+            player.apply_actions(move_actions(move, tick))
+            player.move((), (2 * x0, height), 1.0 / hz)
+            xs.append(player.x - x0)
+            ys.append(player.y)
+            if player.on_ground:
+                break
+        arc = _arcs[key] = (np.array(xs), np.array(ys))
+    return arc
+
+# -----------------------------------------------------------------------------
+# REACHABILITY
+# -----------------------------------------------------------------------------
+class Exploration:
+    """
+    What explore() found. Transitions are parallel arrays, one entry per
+    (standing spot, move): from surface, start x, move index, landing
+    surface, landing x and ticks in the air. Pickups are the same per
+    coin hit on the way, with the tick it was hit; walking pickups (coins
+    touched walking along a surface) have move -1.
+    """
+    def __init__(self, level_map):
+        self.map = level_map
+        self.reached = np.zeros(level_map.floor + 1, bool)
+        self.coins = np.zeros(level_map.coins, bool)
+        self.spawn_surface = -1
+        self.spawn_x = 0.0
+        self.spawn_ticks = 0
+        self.transitions = []
+        self.pickups = []
+
+    @property
+    def complete(self):
+        return bool(self.coins.all())
+
+    def unreachable(self):
+        """LevelStream keys of the coins explore() could not reach."""
+        return [self.map.coin_keys[i] for i in np.flatnonzero(~self.coins)]
+
+def _fly(level_map, x0, start_y, dx, ys, length):
+    """
+    Follow arcs (dx, ys: x offset and y per tick, one row per start, of
+    `length` ticks; padded past that) from every x in x0, standing at
+    start_y, to where they land: (landing tick, landing surface, landing
+    x), plus (start index, coin, tick) for every coin touched on the way.
+    """
+    t, r = level_map.tile, level_map.radius
+    width, height = level_map.width, level_map.height
+    n, ticks = ys.shape
+    index = np.arange(n)
+    step_x = np.diff(dx, axis=1, prepend=0.0)
+    xs = np.minimum(np.maximum(x0[:, None] + dx, r), width - r)
+    xs_prev = np.empty_like(xs)
+    xs_prev[:, 0] = x0
+    xs_prev[:, 1:] = xs[:, :-1]
+    ys_prev = np.empty_like(ys)
+    ys_prev[:, 0] = start_y
+    ys_prev[:, 1:] = ys[:, :-1]
+
+    # Landing: while falling, the top edge the player's bottom crosses this
+    # tick (a tick's fall is less than a tile), if the player is over it then
+    bottom0, bottom1 = ys_prev + r, ys + r
+    fall = bottom1 - bottom0
+    top = np.ceil((bottom0 - 0.01) / t) * t
+    crossing = (fall > 0) & (top <= bottom1) & (top < height)
+    rows = np.minimum(np.maximum(top // t, 0), level_map.rows - 1).astype(np.int64)
+    when = np.maximum(np.divide(top - bottom0, fall, out=np.zeros_like(fall), where=crossing), 0)
+    x_at = xs_prev + step_x * when
+    c_min = np.minimum(np.maximum(np.floor((x_at - r) / t), 0), level_map.cols - 1).astype(np.int64)
+    c_max = np.minimum(np.maximum(np.ceil((x_at + r) / t), 0), level_map.cols).astype(np.int64)
+    landed = crossing & (level_map.tops[rows, c_max] > level_map.tops[rows, c_min])
+    on_platform = landed.any(axis=1)
+    land_tick = np.where(on_platform, landed.argmax(axis=1), length - 1)
+    land_x = xs[index, land_tick]
+    land_surface = np.where(on_platform,
+                            level_map._landing_surface(rows[index, land_tick], x_at[index, land_tick]),
+                            level_map.floor)
+    # Still in the air after MAX_AIR_SECONDS
+    land_surface[~on_platform & (ys[index, length - 1] < height - r - 0.01)] = -1
+    # Landing on an edge but ending the tick past it falls off straight
+    # away; those spots are left to their neighbours rather than followed
+    over = (land_x > level_map.surface_lo[land_surface]) & (land_x < level_map.surface_hi[land_surface])
+    land_surface[~over] = -1
+
+    # Coins: segments (previous -> this tick) ending near one, until landing
+    in_air = np.arange(ticks) <= land_tick[:, None]
+    row_tiles = np.minimum(np.maximum(ys // t, 0), level_map.rows - 1).astype(np.int64)
+    col_tiles = np.minimum(np.maximum(xs // t, 0), level_map.cols - 1).astype(np.int64)
+    start, tick = np.nonzero(in_air & level_map.near_coin[row_tiles + 2, col_tiles + 2])
+    hits = (np.empty(0, np.int64),) * 3
+    if len(start):
+        px, py = xs_prev[start, tick], ys_prev[start, tick]
+        qx, qy = xs[start, tick], ys[start, tick]
+        offsets = np.arange(-2, 3)
+        candidates = level_map.coin_at[row_tiles[start, tick][:, None, None] + 2 + offsets[None, :, None],
+                                       col_tiles[start, tick][:, None, None] + 2 + offsets[None, None, :]]
+        candidates = candidates.reshape(len(start), 25)
+        cx = level_map.coin_x[candidates]
+        cy = level_map.coin_y[candidates]
+        sx, sy = (qx - px)[:, None], (qy - py)[:, None]
+        span = sx * sx + sy * sy
+        along = np.divide((cx - px[:, None]) * sx + (cy - py[:, None]) * sy, span,
+                          out=np.zeros_like(cx), where=span > 0).clip(0, 1)
+        gap = np.hypot(cx - (px[:, None] + sx * along), cy - (py[:, None] + sy * along))
+        hit_row, hit_col = np.nonzero((candidates >= 0) & (gap < level_map.reach))
+        hits = (start[hit_row], candidates[hit_row, hit_col], tick[hit_row])
+    return land_tick, land_surface, land_x, hits
+
+def _walk_pickups(level_map, surfaces):
+    """(surface, coin) pairs for coins touched walking along each surface."""
+    reach = level_map.reach
+    gap = np.abs(level_map.coin_y[None, :] - level_map.surface_y[surfaces][:, None])
+    slack = np.sqrt(np.maximum(reach * reach - gap * gap, 0))
+    hit = ((gap < reach) &
+           (level_map.coin_x[None, :] > level_map.surface_lo[surfaces][:, None] - slack) &
+           (level_map.coin_x[None, :] < level_map.surface_hi[surfaces][:, None] + slack))
+    which, coin = np.nonzero(hit)
+    return surfaces[which], coin
+
+def explore(level_map, speed=5, jump_speed=15, hz=PHYSICS_HZ):
+    """An Exploration of everything reachable from the level's spawn."""
+    found = Exploration(level_map)
+    spawn_x, spawn_y = level_map.spawn
+    dx, ys = move_arc((False, 0, None), float(spawn_y), level_map.height, speed, jump_speed, hz)
+    land_tick, land_surface, land_x, (_, coins, _) = _fly(
+        level_map, np.array([float(spawn_x)]), np.array([float(spawn_y)]),
+        dx[None], ys[None], np.array([len(ys)]))
+    found.coins[coins] = True
+    found.spawn_surface, found.spawn_x = int(land_surface[0]), float(land_x[0])
+    found.spawn_ticks = int(land_tick[0]) + 1
+    if found.spawn_surface < 0:
+        return found
+
+    frontier = np.array([found.spawn_surface])
+    found.reached[frontier] = True
+    while len(frontier):
+        surface, coin = _walk_pickups(level_map, frontier)
+        found.coins[coin] = True
+        found.pickups.append((coin, surface, level_map.coin_x[coin], np.full(len(coin), -1),
+                              np.zeros(len(coin), np.int64), surface, level_map.coin_x[coin],
+                              np.zeros(len(coin), np.int64)))
+
+        # Every move from standing spots along the new surfaces (falls only
+        # from their ends), each with the arc for its height
+        sources, starts, moves, arc = [], [], [], []
+        arcs = {}  # (move index, start y) -> row in this wave's arc tables
+        arc_dx, arc_ys = [], []
+        for s in frontier:
+            lo, hi = level_map.surface_lo[s], level_map.surface_hi[s]
+            xs = np.append(np.arange(lo + 0.01, hi, START_SPACING), hi - 0.01)
+            y = level_map.surface_y[s]
+            for m, move in enumerate(MOVES):
+                if move[0]:
+                    x0 = xs
+                elif s != level_map.floor:
+                    x0 = xs[:1] if move[1] < 0 else xs[-1:]
+                else:
+                    continue
+                key = (m, y)
+                if key not in arcs:
+                    arcs[key] = len(arc_dx)
+                    dx, ys = move_arc(move, y, level_map.height, speed, jump_speed, hz)
+                    arc_dx.append(dx)
+                    arc_ys.append(ys)
+                sources.append(np.full(len(x0), s))
+                starts.append(x0)
+                moves.append(np.full(len(x0), m))
+                arc.append(np.full(len(x0), arcs[key]))
+        sources, starts, moves, arc = map(np.concatenate, (sources, starts, moves, arc))
+
+        # The arcs as tables, padded (standing still) past their landings
+        lengths = np.array([len(ys) for ys in arc_ys])
+        dx_table = np.empty((len(arc_dx), lengths.max()))
+        ys_table = np.empty_like(dx_table)
+        for table, rows in ((dx_table, arc_dx), (ys_table, arc_ys)):
+            for row, values in zip(table, rows):
+                row[:len(values)] = values
+                row[len(values):] = values[-1]
+        start_y = level_map.surface_y[sources]
+
+        landed = []
+        for i in range(0, len(starts), BATCH):
+            batch = slice(i, i + BATCH)
+            source, x0, move, a = sources[batch], starts[batch], moves[batch], arc[batch]
+            land_tick, land_surface, land_x, (hit, coin, tick) = _fly(
+                level_map, x0, start_y[batch], dx_table[a], ys_table[a], lengths[a])
+            ok = land_surface >= 0
+            # Stepping off a wall-side edge goes nowhere
+            ok &= np.array([MOVES[m][0] for m in range(len(MOVES))])[move] | (land_surface != source)
+            coin, hit, tick = coin[ok[hit]], hit[ok[hit]], tick[ok[hit]]
+            found.transitions.append((source[ok], x0[ok], move[ok], land_surface[ok],
+                                      land_x[ok], land_tick[ok] + 1))
+            found.coins[coin] = True
+            found.pickups.append((coin, source[hit], x0[hit], move[hit], tick + 1,
+                                  land_surface[hit], land_x[hit], land_tick[hit] + 1))
+            landed.append(land_surface[ok])
+        new = np.unique(np.concatenate(landed))
+        frontier = new[~found.reached[new]]
+        found.reached[frontier] = True
+    return found
+
+# -----------------------------------------------------------------------------
+# ROUTE BOT
+# -----------------------------------------------------------------------------
+def _by_source(rows, field):
+    """Concatenated (Exploration) columns, split up by the surface in column `field`."""
+    if not rows:
+        return {}
+    columns = [np.concatenate(column) for column in zip(*rows)]
+    order = np.argsort(columns[field], kind="stable")
+    columns = [column[order] for column in columns]
+    sources, first = np.unique(columns[field], return_index=True)
+    ends = np.append(first[1:], len(order))
+    return {int(s): [column[a:b] for column in columns] for s, a, b in zip(sources, first, ends)}
+
+class RouteBot:
+    """
+    A Game.policy that collects the coins explore() found. Standing on a
+    surface, it searches (Dijkstra, in ticks) for the chain of moves to an
+    uncollected coin that is quickest there and back: the way back is
+    the quickest return to the surface the coin is taken from (up to
+    RETURN_SECONDS), so it does not drop off the high platforms for one
+    coin and leave a long climb to fetch the rest. It walks to the first
+    move's start, does it, and carries on with the plan if it landed
+    where planned, or searches again if not (it starts moves up to a
+    walking step off). A move that lands elsewhere or misses its coin
+    MAX_MISSES times is not used again, and moves landing within a
+    walking step of an edge (where starting a little off can mean falling
+    off) cost an extra RETURN_SECONDS.
+    """
+    MAX_MISSES = 3
+    RETURN_SECONDS = 20
+
+    def __init__(self, found, speed=5, hz=PHYSICS_HZ):
+        self.map = found.map
+        self.step = speed * SPEED_SCALE / hz  # px per walking tick
+        self.horizon = self.RETURN_SECONDS * hz
+        self.transitions = self._with_edges(_by_source(found.transitions, 0), 3, 4)
+        self.arrivals = self._with_edges(_by_source(found.transitions, 3), 3, 4)
+        self.pickups = self._with_edges(_by_source(found.pickups, 1), 5, 6)
+        self.returns = {}  # surface -> _returns(surface)
+        self.misses = {}  # (surface, x, move) -> times it landed somewhere else
+        self.plan = []    # [(surface, x, move, coin, landing surface)], move -1 = walk to the coin
+        self.doing = None  # the step being done, and how many of its ticks have run
+        self.tick = 0
+        self.done = False
+
+    def _with_edges(self, columns, land, land_x):
+        """columns, each with the extra ticks its landings cost for being near an edge."""
+        lo, hi = self.map.surface_lo, self.map.surface_hi
+        for rows in columns.values():
+            margin = np.minimum(rows[land_x] - lo[rows[land]], hi[rows[land]] - rows[land_x])
+            rows.append(np.where(margin < self.step, float(self.horizon), 0.0))
+        return columns
+
+    def __call__(self, game):
+        player = game.player
+        if self.doing is not None:
+            actions = self._doing(game)
+            if actions is not None:
+                return actions
+        if self.done or not player.on_ground:
+            return ACTION_NONE
+        here = self.map.surface_under(player.x, player.y)
+        if here < 0:
+            return ACTION_NONE  # landed over an edge; about to fall off
+        if not self.plan:
+            self.plan = self._search(game, here)
+            if not self.plan:
+                self.done = True
+                return ACTION_NONE
+
+        source, x, move, coin, _ = self.plan[0]
+        if here != source:
+            self._miss(source, x, move)  # fell off on the way there
+            return ACTION_NONE
+        if abs(x - player.x) > self.step / 2:
+            # Walk there, stopping short of stepping off the surface's edge
+            step = -self.step if x < player.x else self.step
+            if self.map.surface_lo[here] < player.x + step < self.map.surface_hi[here]:
+                return ACTION_LEFT if step < 0 else ACTION_RIGHT
+        if move < 0:
+            # At the coin; it was collected on the way here unless it is out of reach
+            self._miss(here, x, move)
+            return ACTION_NONE
+        self.doing = self.plan.pop(0)
+        self.tick = 0
+        return self._doing(game)
+
+    def _doing(self, game):
+        """The next tick's actions for the move under way, or None once it has landed."""
+        player = game.player
+        here, x, move, coin, expect = self.doing
+        jump, direction, hold = MOVES[move]
+        if self.tick == 0 and not jump and player.on_ground and abs(player.x - x) < 2 * self.step:
+            return move_actions(MOVES[move], 0)  # still stepping off the edge
+        if self.tick > 0 and player.on_ground:
+            self.doing = None
+            if self.map.surface_under(player.x, player.y) != expect:
+                self._miss(here, x, move)
+            elif coin >= 0:
+                if self.map.coin_keys[coin] not in game.level.collected:
+                    self._miss(here, x, move)
+                self.plan = []  # on to the next coin
+            return None
+        if self.tick == 0 and not jump:
+            self.tick = 1  # the step off was tick 0
+        actions = move_actions(MOVES[move], self.tick)
+        self.tick += 1
+        return actions
+
+    def _miss(self, here, x, move):
+        key = (here, float(x), int(move))
+        self.misses[key] = self.misses.get(key, 0) + 1
+        self.plan = []
+
+    def _usable(self, here, x, move):
+        return self.misses.get((here, float(x), int(move)), 0) < self.MAX_MISSES
+
+    def _returns(self, home):
+        """
+        Ticks from each surface back to surface `home` (capped at the
+        horizon), and the x each one's way back starts from.
+        """
+        if home in self.returns:
+            return self.returns[home]
+        back = np.full(self.map.floor + 1, float(self.horizon))
+        depart = np.full(self.map.floor + 1, np.nan)
+        heap = [(0.0, home, np.nan)]
+        settled = set()
+        while heap:
+            cost, here, x = heapq.heappop(heap)
+            if cost >= self.horizon:
+                break
+            if here in settled:
+                continue
+            settled.add(here)
+            back[here], depart[here] = cost, x
+            arrivals = self.arrivals.get(here)
+            if arrivals is None:
+                continue
+            source, x0, _, _, land_x, ticks, edge = arrivals
+            walk = 0.0 if here == home else np.abs(land_x - x) / self.step
+            total = cost + walk + ticks + edge
+            for i in np.argsort(total, kind="stable"):
+                if total[i] >= self.horizon:
+                    break
+                if int(source[i]) not in settled:
+                    heapq.heappush(heap, (total[i], int(source[i]), x0[i]))
+        self.returns[home] = back, depart
+        return back, depart
+
+    def _search(self, game, start):
+        """The plan to the best uncollected coin from surface `start`, or []."""
+        collected = game.level.collected
+        keys = self.map.coin_keys
+        heap = [(0.0, 0, 0, start, game.player.x, None)]  # (ticks, is a coin, tie, surface, x, path)
+        pushed = 1
+        settled = set()
+        while heap:
+            cost, is_coin, _, here, x, path = heapq.heappop(heap)
+            if is_coin:
+                plan = []
+                while path is not None:
+                    step, path = path
+                    plan.append(step)
+                return plan[::-1]
+            if here in settled:
+                continue
+            settled.add(here)
+
+            # The best uncollected coin from here, counting the way back
+            pickups = self.pickups.get(here)
+            if pickups is not None:
+                coin, _, x0, move, _, land, land_x, ticks, edge = pickups
+                back, depart = self._returns(here)
+                walk_back = np.where(land == here, 0.0, np.abs(land_x - depart[land]) / self.step)
+                ticks = (np.abs(x0 - x) / self.step + ticks + edge +
+                         np.fmin(back[land] + walk_back, self.horizon))  # NaN: no way back
+                for i in np.argsort(ticks, kind="stable"):
+                    if keys[coin[i]] not in collected and self._usable(here, x0[i], move[i]):
+                        step = (here, x0[i], int(move[i]), int(coin[i]), int(land[i]))
+                        heapq.heappush(heap, (cost + ticks[i], 1, pushed, -1, 0.0, (step, path)))
+                        pushed += 1
+                        break
+
+            # The quickest way to each surface reachable from here
+            transitions = self.transitions.get(here)
+            if transitions is not None:
+                _, x0, move, land, land_x, ticks, edge = transitions
+                total = cost + np.abs(x0 - x) / self.step + ticks + edge
+                order = np.lexsort((total, land))
+                best = {}
+                for i in order:
+                    target = int(land[i])
+                    if target in best or target in settled or not self._usable(here, x0[i], move[i]):
+                        continue
+                    best[target] = i
+                    step = (here, x0[i], int(move[i]), -1, target)
+                    heapq.heappush(heap, (total[i], 0, pushed, target, land_x[i], (step, path)))
+                    pushed += 1
+        return []
+
+# -----------------------------------------------------------------------------
+# PLAYING
+# -----------------------------------------------------------------------------
+class Script:
+    """A Game.policy that plays back a list of ACTION_* bits, one per tick."""
+    def __init__(self, actions):
+        self.actions = list(actions)
+        self.tick = 0
+        self.done = False
+
+    def __call__(self, game):
+        if self.tick >= len(self.actions):
+            self.done = True
+            return ACTION_NONE
+        actions = self.actions[self.tick]
+        self.tick += 1
+        return actions
+
+def play(game, source, policy, coins, max_seconds=None, speed=5, jump_speed=15):
+    """
+    Play the level at source in a (headless) game with policy as fast as
+    it goes, until `coins` coins are collected, the policy is done or
+    max_seconds of game time pass (default: PLAY_SECONDS per coin).
+    The player moves at speed and jump_speed whatever the game's config
+    says; pass the ones explore() used. Returns a summary dict.
+    """
+    if max_seconds is None:
+        max_seconds = PLAY_SECONDS * max(coins, 1)
+    game.load_level(source)
+    game.player.speed = speed
+    game.player.jump_speed = jump_speed
+    game.policy = policy
+    game.state = STATE_GAMEPLAY
+    handler = game.handlers[STATE_GAMEPLAY]
+    handler.enter()
+    tick = 1.0 / game.physics_hz
+    level = game.level
+    ticks = 0
+    start = time.perf_counter()
+    while ticks < max_seconds * game.physics_hz and len(level.collected) < coins:
+        if getattr(policy, "done", False):
+            break
+        handler.update(tick)  # exactly one physics tick
+        ticks += 1
+    wall = time.perf_counter() - start
+    game.policy = None
+    return {
+        "coins": coins,
+        "collected": len(level.collected),
+        "complete": len(level.collected) >= coins,
+        "seconds": ticks * tick,
+        "wall": wall,
+    }
+
+def check(source, game=None, speed=5, jump_speed=15):
+    """explore() a level, then play it with a RouteBot; (Exploration, play summary or None)."""
+    level_map = LevelMap(source)
+    found = explore(level_map, speed, jump_speed)
+    if game is None:
+        return found, None
+    return found, play(game, source, RouteBot(found, speed), int(found.coins.sum()),
+                       speed=speed, jump_speed=jump_speed)
+
+# -----------------------------------------------------------------------------
+# COMMAND LINE
+# -----------------------------------------------------------------------------
+def _report(name, found, elapsed):
+    reachable = int(found.coins.sum())
+    line = (f"{name}: {reachable}/{found.map.coins} coins reachable, "
+            f"{int(found.reached.sum())}/{found.map.floor + 1} surfaces "
+            f"(explored in {elapsed * 1e3:.1f}ms)")
+    missing = found.unreachable()
+    if missing:
+        line += f"; unreachable: {missing[:5]}{' ...' if len(missing) > 5 else ''}"
+    print(line)
+
+def _report_play(result):
+    speedup = result["seconds"] / result["wall"] if result["wall"] else float("inf")
+    print(f"  played: {result['collected']}/{result['coins']} reachable coins collected in "
+          f"{result['seconds']:.1f}s of game time ({result['wall']:.2f}s wall, {speedup:.0f}x real time)"
+          + ("" if result["complete"] else " - INCOMPLETE"))
+
+def main(argv):
+    if argv[:1] == ["generate"]:
+        count = int(argv[1]) if len(argv) > 1 else 1000
+        screens = int(argv[2]) if len(argv) > 2 else 1
+        start = time.perf_counter()
+        incomplete = []
+        coins = 0
+        for seed in range(count):
+            found = explore(LevelMap(boingys_levels.encode_level(
+                *boingys_levels.generate_tiles(seed, screens))))
+            coins += found.map.coins
+            if not found.complete:
+                incomplete.append(seed)
+        elapsed = time.perf_counter() - start
+        print(f"{count} generated levels of {screens} screen(s), {coins} coins: "
+              f"{count - len(incomplete)} fully reachable in {elapsed:.2f}s "
+              f"({elapsed / count * 1e3:.2f}ms per level)")
+        if incomplete:
+            print(f"  seeds with unreachable coins: {incomplete[:20]}{' ...' if len(incomplete) > 20 else ''}")
+        game = Game(headless=True)
+        source = boingys_levels.encode_level(*boingys_levels.generate_tiles(0, screens))
+        found, result = check(source, game)
+        print("seed 0:")
+        _report_play(result)
+        return 0 if not incomplete and result["complete"] else 1
+
+    game = Game(headless=True)
+    status = 0
+    for arg in argv or ["1", "2", "3"]:
+        path = boingys_levels.ensure_level(int(arg)) if arg.isdigit() else arg
+        start = time.perf_counter()
+        found = explore(LevelMap(path))
+        _report(arg, found, time.perf_counter() - start)
+        result = play(game, path, RouteBot(found), int(found.coins.sum()))
+        _report_play(result)
+        if not (found.complete and result["complete"]):
+            status = 1
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
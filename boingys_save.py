@@ -0,0 +1,186 @@
+"""
+Save slots for BOINGYS Adventure.
+
+A save is one small binary file: a fixed header with everything the File
+Select preview shows (level, score, progress, config, when it was saved),
+then the collected coins as a zlib-compressed list of (chunk index u32,
+coin index u16) records in the order they were collected:
+
+    header  magic "BSAV", version u8, slot u8, level u8, player speed u8,
+            saved at f64, x, y, vel x, vel y, furthest x f32,
+            level width u32, score u32, sound volume f32,
+            coins collected u32, body size u32, body crc32 u32
+    body    zlib((chunk, coin) records)
+
+read_header() reads only the header, so previews never touch the body.
+SaveWriter encodes and writes saves on a background thread, to a
+temporary file that then atomically replaces the slot, so a slot on disk
+is always either the old save or the new one. The game keeps its coin
+records packed as it goes (LevelStream.collected_log), so taking a save
+is a copy of that buffer and the writer thread's work is mostly zlib and
+file I/O, which run without the GIL. Slot 0 holds only the config
+(level 0, no coins).
+"""
+import os
+import struct
+import threading
+import time
+import zlib
+
+MAGIC = b"BSAV"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBBdfffffIIfIII")
+COIN = struct.Struct("<IH")
+
+SAVE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "saves")
+SETTINGS_SLOT = 0
+SLOTS = (1, 2, 3)
+
+class SaveState:
+    """
+    One slot's contents. `collected` is the packed COIN records, or None
+    when only the header was read.
+    """
+    def __init__(self, slot, level=0, x=0.0, y=0.0, vel_x=0.0, vel_y=0.0, score=0,
+                 furthest_x=0.0, level_width=0, sound_volume=0.5, player_speed=5,
+                 collected=None, saved_at=None, coins=None):
+        self.slot = slot
+        self.level = level
+        self.x = x
+        self.y = y
+        self.vel_x = vel_x
+        self.vel_y = vel_y
+        self.score = score
+        self.furthest_x = furthest_x
+        self.level_width = level_width
+        self.sound_volume = sound_volume
+        self.player_speed = player_speed
+        self.collected = collected
+        self.saved_at = time.time() if saved_at is None else saved_at
+        if coins is None:
+            coins = len(collected) // COIN.size if collected is not None else 0
+        self.coins = coins
+
+    @property
+    def progress(self):
+        """How far through the level the player has been, 0..1."""
+        return min(1.0, self.furthest_x / self.level_width) if self.level_width else 0.0
+
+# -----------------------------------------------------------------------------
+# ENCODING
+# -----------------------------------------------------------------------------
+def encode_save(state):
+    collected = state.collected or b""
+    body = zlib.compress(collected, 1)  # level 1: ~10x faster, about as small for these records
+    header = HEADER.pack(MAGIC, VERSION, state.slot, state.level, state.player_speed,
+                         state.saved_at, state.x, state.y, state.vel_x, state.vel_y,
+                         state.furthest_x, state.level_width, state.score,
+                         state.sound_volume, len(collected) // COIN.size,
+                         len(body), zlib.crc32(body))
+    return header + body
+
+def coin_keys(collected):
+    """The (chunk index, coin index) pairs in packed COIN records."""
+    return set(COIN.iter_unpack(collected))
+
+def _decode_header(data, path):
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path} is not a save file")
+    (magic, version, slot, level, player_speed, saved_at, x, y, vel_x, vel_y,
+     furthest_x, level_width, score, sound_volume, coins, body_size, crc) = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a save file")
+    if version != VERSION:
+        raise ValueError(f"unsupported save version {version}")
+    state = SaveState(slot, level, x, y, vel_x, vel_y, score, furthest_x, level_width,
+                      round(sound_volume, 1), player_speed, saved_at=saved_at, coins=coins)
+    return state, body_size, crc
+
+def read_header(path):
+    """The slot's SaveState without its coins, or None if there is no valid save."""
+    try:
+        with open(path, "rb") as f:
+            return _decode_header(f.read(HEADER.size), path)[0]
+    except (OSError, ValueError):
+        return None
+
+def read_save(path):
+    """The full SaveState stored at path (raises ValueError if it is damaged)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    state, body_size, crc = _decode_header(data, path)
+    body = data[HEADER.size:HEADER.size + body_size]
+    if len(body) != body_size or zlib.crc32(body) != crc:
+        raise ValueError(f"{path} is damaged")
+    state.collected = zlib.decompress(body)
+    return state
+
+def slot_path(slot, directory=SAVE_DIR):
+    return os.path.join(directory, f"slot{slot}.sav")
+
+# -----------------------------------------------------------------------------
+# BACKGROUND WRITER
+# -----------------------------------------------------------------------------
+class SaveWriter:
+    """
+    Writes saves on a daemon thread. save() only queues the state, and a
+    newer save for the same path replaces a queued one that has not been
+    written yet.
+    """
+    def __init__(self, fsync=True):
+        self.fsync = fsync
+        self.pending = {}  # path -> SaveState
+        self.lock = threading.Condition()
+        self.busy = False
+        self.closed = False
+        self.written = 0
+        self.errors = []
+        self.thread = threading.Thread(target=self._run, name="save-writer", daemon=True)
+        self.thread.start()
+
+    def save(self, path, state):
+        with self.lock:
+            self.pending[path] = state
+            self.lock.notify()
+
+    def _run(self):
+        while True:
+            with self.lock:
+                while not self.pending and not self.closed:
+                    self.lock.wait()
+                if not self.pending:
+                    return
+                path, state = self.pending.popitem()
+                self.busy = True
+            try:
+                self._write(path, encode_save(state))
+                self.written += 1
+            except Exception as exc:
+                # Keep the thread alive: a bad state must not wedge flush()
+                self.errors.append(exc)
+            finally:
+                with self.lock:
+                    self.busy = False
+                    self.lock.notify_all()
+
+    def _write(self, path, data):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def flush(self):
+        """Block until everything queued so far is on disk."""
+        with self.lock:
+            while self.pending or self.busy:
+                self.lock.wait()
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.lock.notify_all()
+        self.thread.join()
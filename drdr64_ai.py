@@ -0,0 +1,342 @@
+"""
+Placement-search bot for Dr. Mario.
+
+PlacementBot enumerates every resting spot the current capsule can
+reach with left/right/rotate/down moves from where it is now, scores
+each one (including the chains it would set off), and BotController
+turns the winner into per-frame ACTION_* bits so it can drive any
+DrMarioGame, on either side of a versus match.
+
+Boards are scored on a bitboard encoding: one int per color with a bit
+per cell, laid out row-major with one always-empty guard column so
+horizontal shifts never wrap between rows. Match tests and most
+features are then a handful of shifts, ANDs and popcounts, and scores
+are memoized in a transposition table keyed by those ints.
+"""
+import time
+
+from drdr64_core import (
+    CAPSULE_COLORS, COLOR_MASK, VIRUS_FLAG,
+    ACTION_NONE, ACTION_LEFT, ACTION_RIGHT, ACTION_DOWN, ACTION_ROTATE,
+    Block,
+)
+
+MOVES = (ACTION_LEFT, ACTION_RIGHT, ACTION_ROTATE, ACTION_DOWN)
+
+# --------------------------------------------------------
+# Bitboards
+# --------------------------------------------------------
+class BitboardLayout:
+    """Bit positions for one board size (bit = y * (width + 1) + x)."""
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.stride = width + 1
+        row = (1 << width) - 1
+        self.full = 0
+        for y in range(height):
+            self.full |= row << (y * self.stride)
+        # Rows 0-2 over the spawn columns: anything here means danger
+        spawn = 0b11 << (width // 2 - 1)
+        self.spawn_zone = spawn | spawn << self.stride | spawn << (2 * self.stride)
+
+    def bit(self, x, y):
+        return 1 << (y * self.stride + x)
+
+    def encode(self, cells):
+        """Return (per-color boards tuple indexed by color code, virus board)."""
+        boards = [0, 0, 0, 0, 0]
+        viruses = 0
+        width = self.width
+        stride = self.stride
+        for i, cell in enumerate(cells):
+            if cell:
+                y, x = divmod(i, width)
+                bit = 1 << (y * stride + x)
+                boards[cell & COLOR_MASK] |= bit
+                if cell & VIRUS_FLAG:
+                    viruses |= bit
+        return tuple(boards), viruses
+
+    def runs(self, board):
+        """Mask of every bit in a horizontal or vertical run of 4+."""
+        s = board & (board >> 1) & (board >> 2) & (board >> 3)
+        mask = s | (s << 1) | (s << 2) | (s << 3)
+        st = self.stride
+        s = board & (board >> st) & (board >> 2 * st) & (board >> 3 * st)
+        return mask | s | (s << st) | (s << 2 * st) | (s << 3 * st)
+
+    def covered(self, occupied):
+        """Every cell with at least one piece somewhere above it."""
+        fill = occupied << self.stride
+        shift = self.stride
+        while shift < self.height * self.stride:
+            fill |= fill << shift
+            shift *= 2
+        return fill & self.full
+
+# --------------------------------------------------------
+# Placement Search
+# --------------------------------------------------------
+def capsule_state(capsule):
+    a, b = capsule.blocks
+    return (a.x, a.y, b.x, b.y)
+
+def _next_state(grid, state, action):
+    """Where the capsule ends up after one action, or None if blocked."""
+    ax, ay, bx, by = state
+    if action == ACTION_LEFT:
+        nxt = (ax - 1, ay, bx - 1, by)
+    elif action == ACTION_RIGHT:
+        nxt = (ax + 1, ay, bx + 1, by)
+    elif action == ACTION_DOWN:
+        nxt = (ax, ay + 1, bx, by + 1)
+    else:
+        # Same pivot rotation as Capsule.rotate()
+        nxt = (ax, ay, ax - (by - ay), ay + (bx - ax))
+    if grid.is_free(nxt[0], nxt[1]) and grid.is_free(nxt[2], nxt[3]):
+        return nxt
+    return None
+
+def search_placements(grid, start):
+    """
+    Breadth-first search over capsule states from start.
+    Returns (resting_states, parents) where parents maps each reached
+    state to (previous_state, action). A resting state is one where the
+    next drop would lock the capsule; the search does not slide along
+    resting surfaces since the drop timer would lock it there.
+    """
+    resting = []
+    parents = {start: None}
+    for _ in search_steps(grid, start, resting, parents):
+        pass
+    return resting, parents
+
+def search_steps(grid, start, resting, parents, batch=64):
+    """
+    search_placements() in resumable slices: fills the given resting
+    list and parents dict ({start: None} to begin), yielding after
+    every batch of expanded states so callers can spread it over frames.
+    """
+    frontier = [start]
+    expanded = 0
+    while frontier:
+        next_frontier = []
+        for state in frontier:
+            expanded += 1
+            if expanded % batch == 0:
+                yield
+            if _next_state(grid, state, ACTION_DOWN) is None:
+                resting.append(state)
+                continue
+            for action in MOVES:
+                nxt = _next_state(grid, state, action)
+                if nxt is not None and nxt not in parents:
+                    parents[nxt] = (state, action)
+                    next_frontier.append(nxt)
+        frontier = next_frontier
+
+def path_to(parents, target):
+    """List of (state, action) steps from the search start to target."""
+    steps = []
+    state = target
+    while parents.get(state) is not None:
+        prev, action = parents[state]
+        steps.append((prev, action))
+        state = prev
+    steps.reverse()
+    return steps
+
+class PlacementBot:
+    """
+    Scores resting placements for a capsule and picks the best one.
+    Scores are cached in a transposition table keyed by the bitboards
+    of the board plus the placed cells, so identical positions (e.g.
+    mirrored same-color capsules, or lines reached again by a lookahead)
+    are only scored once.
+    """
+    VIRUS_CLEARED = 1000
+    REMOVED = 30
+    VERTICAL_PAIR = 12
+    HORIZONTAL_PAIR = 6
+    MISMATCH = 80
+    BURIED_VIRUS = 100
+    HOLE = 40
+    HEIGHT = 4
+    SPAWN_DANGER = 100000
+
+    def __init__(self, table_size=200000):
+        self.table = {}
+        self.table_size = table_size
+        self.layouts = {}
+        self.evaluated = 0
+        self.table_hits = 0
+        self.search_time = 0.0
+
+    def layout(self, grid):
+        size = (grid.width, grid.height)
+        layout = self.layouts.get(size)
+        if layout is None:
+            layout = self.layouts[size] = BitboardLayout(*size)
+        return layout
+
+    def choose(self, grid, capsule):
+        """Best resting state (ax, ay, bx, by) for capsule, plus its parents map."""
+        start_time = time.perf_counter()
+        start = capsule_state(capsule)
+        resting, parents = search_placements(grid, start)
+        colors = (capsule.blocks[0].color, capsule.blocks[1].color)
+        key = self.layout(grid).encode(grid.cells)
+        best = start
+        best_score = None
+        for state in resting:
+            score = self.evaluate(grid, key, state, colors)
+            if best_score is None or score > best_score:
+                best, best_score = state, score
+        self.search_time += time.perf_counter() - start_time
+        return best, parents
+
+    def evaluate(self, grid, key, state, colors):
+        """Score of grid after locking a capsule with these colors at state."""
+        layout = self.layout(grid)
+        ax, ay, bx, by = state
+        placed = tuple(sorted(((ay * layout.stride + ax, colors[0]),
+                              (by * layout.stride + bx, colors[1]))))
+        table_key = (key, placed)
+        score = self.table.get(table_key)
+        if score is not None:
+            self.table_hits += 1
+            return score
+        self.evaluated += 1
+
+        boards, viruses = key
+        boards = list(boards)
+        for bit, color in placed:
+            boards[color] |= 1 << bit
+        if any(layout.runs(boards[color]) for color in CAPSULE_COLORS):
+            score = self._score_with_chains(grid, state, colors)
+        else:
+            score = self._score_boards(layout, boards, viruses)
+
+        if len(self.table) >= self.table_size:
+            self.table.clear()
+        self.table[table_key] = score
+        return score
+
+    def _score_with_chains(self, grid, state, colors):
+        ax, ay, bx, by = state
+        sim = grid.copy()
+        sim.add_block(Block(ax, ay, colors[0]))
+        sim.add_block(Block(bx, by, colors[1]))
+        removed = 0
+        while True:
+            count = sim.remove_matches()
+            if not count:
+                break
+            removed += count
+            sim.apply_gravity()
+        layout = self.layout(grid)
+        boards, viruses = layout.encode(sim.cells)
+        return (self.VIRUS_CLEARED * (grid.virus_count - sim.virus_count)
+                + self.REMOVED * removed
+                + self._score_boards(layout, boards, viruses))
+
+    def _score_boards(self, layout, boards, viruses):
+        stride = layout.stride
+        occupied = 0
+        pairs_v = 0
+        pairs_h = 0
+        buried = 0
+        for color in CAPSULE_COLORS:
+            board = boards[color]
+            occupied |= board
+            pairs_v += (board & (board >> stride)).bit_count()
+            pairs_h += (board & (board >> 1)).bit_count()
+        for color in CAPSULE_COLORS:
+            # Other-colored pieces stacked directly on this color's viruses
+            buried += ((viruses & boards[color]) >> stride & occupied & ~boards[color]).bit_count()
+        mismatched = (occupied & (occupied >> stride)).bit_count() - pairs_v
+        holes = (layout.covered(occupied) & ~occupied).bit_count()
+        top_row = ((occupied & -occupied).bit_length() - 1) // stride if occupied else layout.height
+        score = (self.VERTICAL_PAIR * pairs_v + self.HORIZONTAL_PAIR * pairs_h
+                 - self.MISMATCH * mismatched - self.BURIED_VIRUS * buried
+                 - self.HOLE * holes - self.HEIGHT * (layout.height - top_row))
+        if occupied & layout.spawn_zone:
+            score -= self.SPAWN_DANGER
+        return score
+
+    def placements_per_second(self):
+        return self.evaluated / self.search_time if self.search_time else 0.0
+
+# --------------------------------------------------------
+# Controller
+# --------------------------------------------------------
+class PlanBudget:
+    """
+    Caps how many bots may start a full placement search in one tick,
+    so several bots sharing a frame don't all plan on the same one.
+    Call tick() once per simulation tick.
+    """
+    def __init__(self, per_tick=1):
+        self.per_tick = per_tick
+        self.used = 0
+
+    def tick(self):
+        self.used = 0
+
+    def take(self):
+        if self.used >= self.per_tick:
+            return False
+        self.used += 1
+        return True
+
+class BotController:
+    """
+    Feeds one ACTION_* bit per frame to a DrMarioGame, walking the
+    path to the bot's chosen placement. If the capsule is not where the
+    plan expects (the drop timer moved it), it skips ahead to that point
+    of the plan, or searches again from there if it is off the path.
+    With a shared PlanBudget, a new search may wait a few ticks for its
+    turn.
+    """
+    def __init__(self, bot=None, budget=None):
+        self.bot = bot if bot is not None else PlacementBot()
+        self.budget = budget
+        self.capsule = None
+        self.target = None
+        self.plan = []
+
+    def actions(self, game):
+        capsule = game.capsule
+        if not game.running or capsule is None or capsule.locked:
+            return ACTION_NONE
+        state = capsule_state(capsule)
+        if capsule is not self.capsule:
+            if self.budget is not None and not self.budget.take():
+                return ACTION_NONE
+            self.capsule = capsule
+            self.target, parents = self.bot.choose(game.grid, capsule)
+            self.plan = path_to(parents, self.target)
+        elif state != (self.plan[0][0] if self.plan else self.target):
+            # A gravity drop usually just skips ahead along the plan
+            ahead = [i for i, (step_state, _) in enumerate(self.plan) if step_state == state]
+            if ahead:
+                del self.plan[:ahead[0]]
+            elif not self._replan(game, capsule, state):
+                return ACTION_NONE
+
+        if not self.plan:
+            # At the target: one more drop locks it
+            return ACTION_DOWN
+        _, action = self.plan.pop(0)
+        return action
+
+    def _replan(self, game, capsule, state):
+        """Path to the target from state, choosing a new target if it is out of reach."""
+        _, parents = search_placements(game.grid, state)
+        if self.target not in parents:
+            if self.budget is not None and not self.budget.take():
+                return False
+            self.target, parents = self.bot.choose(game.grid, capsule)
+        self.plan = path_to(parents, self.target)
+        return True
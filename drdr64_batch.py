@@ -0,0 +1,207 @@
+"""
+Batched Dr. Mario boards on NumPy.
+
+N boards live in one (N, H, W) uint8 array using the drdr64_core cell
+encoding (COLOR_* code | VIRUS_FLAG / PILL_FLAG, 0 = empty). Match
+finding, virus counting, gravity and chain counting run for every board
+at once, and VecDrMarioEnv wraps that in a reset()/step() interface for
+self-play and training loops.
+"""
+import numpy as np
+
+from drdr64_core import (
+    GRID_WIDTH, GRID_HEIGHT, LEVEL_VIRUS_COUNTS,
+    CAPSULE_COLORS, COLOR_MASK, VIRUS_FLAG, PILL_FLAG,
+)
+
+# Placement actions: action = column * 4 + orientation
+ORIENT_HORIZONTAL      = 0  # first color left, second right (x, x + 1)
+ORIENT_HORIZONTAL_FLIP = 1  # second color left, first right
+ORIENT_VERTICAL        = 2  # first color on the bottom, second on top
+ORIENT_VERTICAL_FLIP   = 3  # second color on the bottom, first on top
+NUM_ORIENTATIONS = 4
+
+# --------------------------------------------------------
+# Kernels
+# --------------------------------------------------------
+def find_matches(boards):
+    """
+    Boolean (N, H, W) mask of every cell in a horizontal or vertical run
+    of 4+ same-colored pieces, same rule as Grid.remove_matches().
+    """
+    colors = boards & COLOR_MASK
+    mask = np.zeros(boards.shape, dtype=bool)
+
+    first = colors[:, :, :-3]
+    run = ((first != 0) & (first == colors[:, :, 1:-2])
+           & (first == colors[:, :, 2:-1]) & (first == colors[:, :, 3:]))
+    width = boards.shape[2]
+    for k in range(4):
+        mask[:, :, k:width - 3 + k] |= run
+
+    first = colors[:, :-3, :]
+    run = ((first != 0) & (first == colors[:, 1:-2, :])
+           & (first == colors[:, 2:-1, :]) & (first == colors[:, 3:, :]))
+    height = boards.shape[1]
+    for k in range(4):
+        mask[:, k:height - 3 + k, :] |= run
+    return mask
+
+def apply_gravity(boards):
+    """
+    Drop every piece to the bottom of its column, keeping column order
+    (same result as Grid.apply_gravity()). Returns a new array.
+    """
+    # A stable sort on "is occupied" moves the empties to the top of each
+    # column and leaves the pieces in their original order underneath.
+    order = np.argsort(boards != 0, axis=1, kind="stable")
+    return np.take_along_axis(boards, order, axis=1)
+
+def resolve(boards):
+    """
+    Run match -> remove -> gravity until no board changes, in place.
+    Returns (chains, removed, viruses_cleared), each an (N,) int array.
+    Boards that settle early drop out of later passes.
+    """
+    n = boards.shape[0]
+    chains = np.zeros(n, dtype=np.int32)
+    removed = np.zeros(n, dtype=np.int32)
+    viruses = np.zeros(n, dtype=np.int32)
+
+    idx = np.arange(n)
+    sub = boards
+    while idx.size:
+        mask = find_matches(sub)
+        counts = mask.sum(axis=(1, 2))
+        hit = counts > 0
+        if not hit.any():
+            break
+        idx = idx[hit]
+        sub = sub[hit]
+        mask = mask[hit]
+        chains[idx] += 1
+        removed[idx] += counts[hit]
+        viruses[idx] += (mask & ((sub & VIRUS_FLAG) != 0)).sum(axis=(1, 2))
+        sub[mask] = 0
+        sub = apply_gravity(sub)
+        boards[idx] = sub
+    return chains, removed, viruses
+
+# --------------------------------------------------------
+# Vector Environment
+# --------------------------------------------------------
+class VecDrMarioEnv:
+    """
+    num_envs independent single-player boards, stepped together.
+
+    Each step takes one placement action per board: the current capsule
+    is dropped straight down at that column/orientation (the path from
+    the spawn point is not checked), then matches and chains resolve.
+    Boards that clear all viruses or top out are reset automatically.
+    """
+    def __init__(self, num_envs, width=GRID_WIDTH, height=GRID_HEIGHT,
+                 level=1, seed=None):
+        self.num_envs = num_envs
+        self.width = width
+        self.height = height
+        self.level = level
+        self.num_actions = width * NUM_ORIENTATIONS
+        self.rng = np.random.default_rng(seed)
+        self.boards = np.zeros((num_envs, height, width), dtype=np.uint8)
+        self.virus_count = np.zeros(num_envs, dtype=np.int32)
+        self.score = np.zeros(num_envs, dtype=np.int64)
+        self.capsules = np.zeros((num_envs, 2), dtype=np.uint8)
+        self._colors = np.array(CAPSULE_COLORS, dtype=np.uint8)
+        self._rows = np.arange(num_envs)
+
+    def reset(self):
+        self._reset_boards(self._rows)
+        return self.boards
+
+    def _reset_boards(self, which):
+        n = len(which)
+        if not n:
+            return
+        width, height = self.width, self.height
+        virus_count = min(LEVEL_VIRUS_COUNTS.get(self.level, 10),
+                          (height - 3) * width)
+        boards = np.zeros((n, height * width), dtype=np.uint8)
+
+        # Pick virus_count distinct cells from rows 3+ for every board
+        keys = self.rng.random((n, (height - 3) * width))
+        picks = np.argpartition(keys, virus_count - 1, axis=1)[:, :virus_count]
+        picks += 3 * width
+        colors = self.rng.choice(self._colors, size=(n, virus_count))
+        np.put_along_axis(boards, picks, colors | VIRUS_FLAG, axis=1)
+
+        self.boards[which] = boards.reshape(n, height, width)
+        self.virus_count[which] = virus_count
+        self.score[which] = 0
+        self.capsules[which] = self.rng.choice(self._colors, size=(n, 2))
+
+    def legal_actions(self):
+        """(N, num_actions) bool mask of placements that fit on each board."""
+        top = self._column_tops()
+        x = np.arange(self.width)
+        horizontal = np.minimum(top[:, :-1], top[:, 1:]) >= 1
+        vertical = top >= 2
+        legal = np.zeros((self.num_envs, self.width, NUM_ORIENTATIONS), dtype=bool)
+        legal[:, :-1, ORIENT_HORIZONTAL] = horizontal
+        legal[:, :-1, ORIENT_HORIZONTAL_FLIP] = horizontal
+        legal[:, x, ORIENT_VERTICAL] = vertical
+        legal[:, x, ORIENT_VERTICAL_FLIP] = vertical
+        return legal.reshape(self.num_envs, self.num_actions)
+
+    def _column_tops(self):
+        """Row index of the highest piece in each column (height if empty)."""
+        occupied = self.boards != 0
+        top = occupied.argmax(axis=1)
+        top[~occupied.any(axis=1)] = self.height
+        return top
+
+    def step(self, actions):
+        """
+        actions: (N,) ints in [0, num_actions).
+        Returns (boards, rewards, dones, info) where rewards is viruses
+        cleared this step and info holds per-board chains, removed,
+        score, topped_out and cleared arrays.
+        """
+        actions = np.asarray(actions)
+        rows = self._rows
+        columns = actions // NUM_ORIENTATIONS
+        orient = actions % NUM_ORIENTATIONS
+        horizontal = orient < ORIENT_VERTICAL
+        flip = (orient % 2) == 1
+        # A horizontal pair needs two columns
+        columns = np.where(horizontal, np.minimum(columns, self.width - 2), columns)
+
+        top = self._column_tops()
+        second_column = np.where(horizontal, columns + 1, columns)
+        top_a = top[rows, columns]
+        top_b = top[rows, second_column]
+        row_a = np.where(horizontal, np.minimum(top_a, top_b) - 1, top_a - 1)
+        row_b = np.where(horizontal, row_a, row_a - 1)
+        topped_out = row_b < 0
+
+        first = np.where(flip, self.capsules[:, 1], self.capsules[:, 0]) | PILL_FLAG
+        second = np.where(flip, self.capsules[:, 0], self.capsules[:, 1]) | PILL_FLAG
+        ok = ~topped_out
+        self.boards[rows[ok], row_a[ok], columns[ok]] = first[ok]
+        self.boards[rows[ok], row_b[ok], second_column[ok]] = second[ok]
+
+        chains, removed, viruses = resolve(self.boards)
+        self.score += 100 * chains
+        self.virus_count -= viruses
+        cleared = self.virus_count <= 0
+        dones = cleared | topped_out
+        info = {
+            "chains": chains,
+            "removed": removed,
+            "score": self.score.copy(),
+            "topped_out": topped_out,
+            "cleared": cleared,
+        }
+
+        self._reset_boards(np.flatnonzero(dones))
+        self.capsules[~dones] = self.rng.choice(self._colors, size=(int((~dones).sum()), 2))
+        return self.boards, viruses, dones, info
@@ -0,0 +1,796 @@
+"""
+Benchmarks and self-checks for the Dr. Mario engine.
+
+    python drdr64_bench.py games [N]
+    python drdr64_bench.py grid [WIDTH HEIGHT]
+    python drdr64_bench.py batch [NUM_ENVS STEPS]
+    python drdr64_bench.py incremental [TRIALS]
+    python drdr64_bench.py render [FRAMES]
+    python drdr64_bench.py ai [GAMES]
+    python drdr64_bench.py tournament [MATCHES]
+    python drdr64_bench.py replay [SEED]
+    python drdr64_bench.py net [MATCHES FRAMES]
+    python drdr64_bench.py timing [SEEDS]
+    python drdr64_bench.py versus [FRAMES]
+    python drdr64_bench.py rewind [SEED]
+    python drdr64_bench.py levels [PER_LEVEL]
+    python drdr64_bench.py hints [FRAMES]
+    python drdr64_bench.py telemetry [GAMES]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+import drdr64_core
+
+# --------------------------------------------------------
+# Headless full-game throughput
+# --------------------------------------------------------
+def bench_games(n_games=1000):
+    start = time.perf_counter()
+    results = drdr64_core.run_batch(n_games)
+    elapsed = time.perf_counter() - start
+    frames = sum(r["frames"] for r in results)
+    print(f"{n_games} games, {frames} frames in {elapsed:.3f}s: "
+          f"{n_games / elapsed:.0f} games/s, {frames / elapsed:.0f} frames/s")
+
+# --------------------------------------------------------
+# Compact Grid vs the original list-of-objects Grid
+# --------------------------------------------------------
+class _LegacyBlock:
+    def __init__(self, x, y, color):
+        self.x = x
+        self.y = y
+        self.color = color
+
+class _LegacyVirus(_LegacyBlock):
+    pass
+
+class _LegacyGrid:
+    """The pre-bytearray Grid (one object per occupied cell), kept for comparison."""
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.grid = [[None for _ in range(self.width)] for _ in range(self.height)]
+        self.virus_count = 0
+
+    def add_block(self, block):
+        if 0 <= block.y < self.height and 0 <= block.x < self.width:
+            self.grid[block.y][block.x] = block
+
+    def remove_matches(self):
+        blocks_to_remove = set()
+        for y in range(self.height):
+            for x in range(self.width):
+                if self.grid[y][x] is not None:
+                    color = self.grid[y][x].color
+                    if x <= self.width - 4:
+                        run_length = 1
+                        for i in range(1, 4):
+                            if self.grid[y][x + i] and self.grid[y][x + i].color == color:
+                                run_length += 1
+                            else:
+                                break
+                        if run_length == 4:
+                            for i in range(4):
+                                blocks_to_remove.add((x + i, y))
+                    if y <= self.height - 4:
+                        run_length = 1
+                        for i in range(1, 4):
+                            if self.grid[y + i][x] and self.grid[y + i][x].color == color:
+                                run_length += 1
+                            else:
+                                break
+                        if run_length == 4:
+                            for i in range(4):
+                                blocks_to_remove.add((x, y + i))
+        for (rx, ry) in blocks_to_remove:
+            if isinstance(self.grid[ry][rx], _LegacyVirus):
+                self.virus_count -= 1
+            self.grid[ry][rx] = None
+        return len(blocks_to_remove)
+
+    def apply_gravity(self):
+        for y in range(self.height - 1, -1, -1):
+            for x in range(self.width):
+                if self.grid[y][x] is None:
+                    temp_y = y - 1
+                    while temp_y >= 0 and self.grid[y][x] is None:
+                        if self.grid[temp_y][x] is not None:
+                            self.grid[y][x] = self.grid[temp_y][x]
+                            self.grid[temp_y][x] = None
+                        temp_y -= 1
+
+    def is_free(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height and self.grid[y][x] is None
+
+def _random_fill(width, height, seed, density=0.6):
+    """Return [(x, y, color, is_virus)] for a randomly populated board."""
+    rng = random.Random(seed)
+    colors = drdr64_core.CAPSULE_COLORS
+    return [(x, y, rng.choice(colors), rng.random() < 0.3)
+            for y in range(height) for x in range(width)
+            if rng.random() < density]
+
+def _build(grid_cls, block_cls, virus_cls, width, height, fill):
+    grid = grid_cls(width, height)
+    for x, y, color, is_virus in fill:
+        grid.add_block((virus_cls if is_virus else block_cls)(x, y, color))
+    return grid
+
+def _measure_bytes(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    grid = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return grid, after - before
+
+def _resolve_rate(build, seconds=1.0):
+    """Boards per second through build + full match/gravity resolution."""
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        grid = build()
+        while grid.remove_matches():
+            grid.apply_gravity()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+def _probe_rate(grid, n=200000):
+    """is_free() occupancy checks per second at random coordinates."""
+    rng = random.Random(1)
+    coords = [(rng.randrange(grid.width), rng.randrange(grid.height)) for _ in range(1000)]
+    start = time.perf_counter()
+    for _ in range(n // 1000):
+        for x, y in coords:
+            grid.is_free(x, y)
+    return n / (time.perf_counter() - start)
+
+def bench_grid(width=None, height=None):
+    sizes = [(width, height)] if width else [(10, 20), (200, 400)]
+    core = drdr64_core
+    for w, h in sizes:
+        fill = _random_fill(w, h, seed=w * h)
+        builders = {
+            "legacy": lambda: _build(_LegacyGrid, _LegacyBlock, _LegacyVirus, w, h, fill),
+            "compact": lambda: _build(core.Grid, core.Block, core.Virus, w, h, fill),
+        }
+        print(f"{w}x{h} board, {len(fill)} pieces")
+        for name, build in builders.items():
+            grid, size = _measure_bytes(build)
+            seconds = 1.0 if w * h <= 1000 else 3.0
+            print(f"  {name:8s} {size:>10d} bytes  "
+                  f"{_resolve_rate(build, seconds):>10.1f} boards/s resolved  "
+                  f"{_probe_rate(grid):>12.0f} is_free/s")
+
+# --------------------------------------------------------
+# Batched NumPy boards
+# --------------------------------------------------------
+def bench_batch(num_envs=4096, steps=200):
+    import numpy as np
+    import drdr64_batch
+
+    # The kernel has to agree with Grid on every board before speed matters
+    w, h = drdr64_core.GRID_WIDTH, drdr64_core.GRID_HEIGHT
+    boards = []
+    chains = []
+    for seed in range(200):
+        grid = _build(drdr64_core.Grid, drdr64_core.Block, drdr64_core.Virus,
+                      w, h, _random_fill(w, h, seed))
+        boards.append(np.frombuffer(bytes(grid.cells), dtype=np.uint8).reshape(h, w))
+        count = 0
+        while grid.remove_matches():
+            grid.apply_gravity()
+            count += 1
+        chains.append((count, bytes(grid.cells)))
+    stack = np.array(boards)
+    batch_chains, _, _ = drdr64_batch.resolve(stack)
+    for i, (count, cells) in enumerate(chains):
+        assert batch_chains[i] == count and stack[i].tobytes() == cells, f"board {i} differs"
+    print(f"resolve() matches Grid on {len(chains)} random boards")
+
+    env = drdr64_batch.VecDrMarioEnv(num_envs, seed=0)
+    env.reset()
+    rng = np.random.default_rng(0)
+    episodes = 0
+    start = time.perf_counter()
+    for _ in range(steps):
+        legal = env.legal_actions()
+        # Random legal placement per board (falls back to action 0 if none)
+        scores = rng.random(legal.shape) * legal
+        _, _, dones, _ = env.step(scores.argmax(axis=1))
+        episodes += int(dones.sum())
+    elapsed = time.perf_counter() - start
+    print(f"{num_envs} envs x {steps} steps in {elapsed:.3f}s: "
+          f"{num_envs * steps / elapsed:,.0f} board-steps/s, {episodes} episodes finished")
+
+# --------------------------------------------------------
+# Dirty-cell match/gravity vs full scans
+# --------------------------------------------------------
+def _resolve(grid, full):
+    """Resolve chains; returns the list of per-step removal counts."""
+    steps = []
+    while True:
+        removed = grid.remove_matches_full() if full else grid.remove_matches()
+        if not removed:
+            return steps
+        steps.append(removed)
+        if full:
+            grid.apply_gravity_full()
+        else:
+            grid.apply_gravity()
+
+def _drop_pair(rng, width, height):
+    """A random capsule-like pair (possibly left floating) as Blocks."""
+    core = drdr64_core
+    x = rng.randrange(width - 1)
+    y = rng.randrange(height - 1)
+    colors = core.CAPSULE_COLORS
+    if rng.random() < 0.5:
+        return [core.Block(x, y, rng.choice(colors)), core.Block(x + 1, y, rng.choice(colors))]
+    return [core.Block(x, y, rng.choice(colors)), core.Block(x, y + 1, rng.choice(colors))]
+
+def check_incremental(trials=300):
+    """Randomized equivalence: incremental and full-scan grids must agree."""
+    core = drdr64_core
+    rng = random.Random(2024)
+    for trial in range(trials):
+        w = rng.randrange(4, 24)
+        h = rng.randrange(4, 40)
+        fill = _random_fill(w, h, seed=trial, density=rng.random() * 0.8)
+        a = _build(core.Grid, core.Block, core.Virus, w, h, fill)
+        b = _build(core.Grid, core.Block, core.Virus, w, h, fill)
+        for _ in range(30):
+            assert _resolve(a, False) == _resolve(b, True), f"trial {trial}: chain steps differ"
+            assert a.cells == b.cells and a.virus_count == b.virus_count, f"trial {trial}: boards differ"
+            for block in _drop_pair(rng, w, h):
+                if a.is_free(block.x, block.y):
+                    a.add_block(block)
+                    b.add_block(block)
+    print(f"incremental == full scan on {trials} random boards x 30 locks")
+
+def bench_incremental(trials=300):
+    check_incremental(trials)
+    core = drdr64_core
+    for w, h in [(10, 20), (60, 120), (200, 400)]:
+        # Long cascades: resolve a dense, unsettled random board from scratch
+        fill = _random_fill(w, h, seed=w + h, density=0.9)
+        timings = {}
+        for full in (True, False):
+            grid = _build(core.Grid, core.Block, core.Virus, w, h, fill)
+            start = time.perf_counter()
+            chains = len(_resolve(grid, full))
+            timings[full] = time.perf_counter() - start
+        print(f"{w}x{h} cascade ({chains} chain steps): full {timings[True] * 1000:.1f}ms, "
+              f"incremental {timings[False] * 1000:.1f}ms, "
+              f"{timings[True] / timings[False]:.1f}x")
+
+        # Single capsule locks on an already settled board
+        rng = random.Random(3)
+        locks = 200 if w * h <= 2000 else 20
+        pairs = [_drop_pair(rng, w, h) for _ in range(locks)]
+        for full in (True, False):
+            grid = _build(core.Grid, core.Block, core.Virus, w, h, fill)
+            _resolve(grid, full)
+            start = time.perf_counter()
+            for pair in pairs:
+                for block in pair:
+                    if grid.is_free(block.x, block.y):
+                        grid.add_block(block)
+                _resolve(grid, full)
+            timings[full] = (time.perf_counter() - start) / locks
+        print(f"{w}x{h} per lock: full {timings[True] * 1e6:.0f}us, "
+              f"incremental {timings[False] * 1e6:.0f}us, "
+              f"{timings[True] / timings[False]:.1f}x")
+
+# --------------------------------------------------------
+# Dirty-rect rendering vs full redraw
+# --------------------------------------------------------
+def _frame_stats(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+    return (f"mean {statistics.fmean(samples) * 1000:.3f}ms  "
+            f"p50 {pick(0.5):.3f}ms  p99 {pick(0.99):.3f}ms")
+
+def _headless_display():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import DRDR64
+    DRDR64.init_display()
+    return DRDR64
+
+def _versus_pair(DRDR64, seed):
+    players = []
+    for i, x in enumerate((50, 400)):
+        game = DRDR64.DrMarioGame(x_offset=x, y_offset=50, player_name=f"Player {i + 1}",
+                                  seed=seed + i)
+        game.start_level(3)
+        players.append(game)
+    return players
+
+def bench_render(frames=2000):
+    """Versus-mode frame cost: old full redraw + flip vs dirty rects + update."""
+    DRDR64 = _headless_display()
+    pygame = DRDR64.pygame
+    screen = DRDR64.screen
+    policy = drdr64_core.drop_policy(random.Random(5))
+
+    def play(draw_frame):
+        players = _versus_pair(DRDR64, seed=11)
+        samples = []
+        for _ in range(frames):
+            for game in players:
+                if not game.running:
+                    game.start_level(3)
+                game.step(policy(game) & ~drdr64_core.ACTION_DOWN)
+            start = time.perf_counter()
+            draw_frame(players)
+            samples.append(time.perf_counter() - start)
+        return samples
+
+    # The original board drawing: every cell outline and block, every frame
+    size = DRDR64.GRID_SIZE
+
+    def draw_cell(x, y, color, origin_x, origin_y):
+        pygame.draw.rect(screen, drdr64_core.PALETTE[color],
+                         (origin_x + x * size, origin_y + y * size, size, size))
+
+    def draw_grid(grid, origin_x, origin_y):
+        for row_index in range(grid.height):
+            for col_index in range(grid.width):
+                pygame.draw.rect(screen, drdr64_core.GRAY,
+                                 (origin_x + col_index * size, origin_y + row_index * size,
+                                  size, size), 1)
+        cells = grid.cells
+        for i in range(len(cells)):
+            if cells[i]:
+                y, x = divmod(i, grid.width)
+                draw_cell(x, y, cells[i] & drdr64_core.COLOR_MASK, origin_x, origin_y)
+
+    def draw_capsule(capsule, origin_x, origin_y):
+        for block in capsule.blocks:
+            draw_cell(block.x, block.y, block.color, origin_x, origin_y)
+
+    def full_redraw(players):
+        screen.fill(drdr64_core.BLACK)
+        for game in players:
+            draw_grid(game.grid, game.x_offset, game.y_offset)
+            draw_capsule(game.capsule, game.x_offset, game.y_offset)
+            font = pygame.font.SysFont(None, 24)
+            text_surf = font.render(game.hud_text(), True, drdr64_core.WHITE)
+            screen.blit(text_surf, (game.x_offset + 10, game.y_offset + 10))
+        pygame.display.flip()
+
+    def dirty_rects(players):
+        rects = []
+        for game in players:
+            rects += game.draw(screen)
+        pygame.display.update(rects)
+
+    print(f"full redraw:  {_frame_stats(play(full_redraw))}")
+    print(f"dirty rects:  {_frame_stats(play(dirty_rects))}")
+
+# --------------------------------------------------------
+# Placement-search bot
+# --------------------------------------------------------
+def bench_ai(n_games=10):
+    import drdr64_ai
+
+    bot = drdr64_ai.PlacementBot()
+    start = time.perf_counter()
+    levels = []
+    for seed in range(n_games):
+        controller = drdr64_ai.BotController(bot)
+        game = drdr64_core.DrMarioGame(seed=seed)
+        game.start_level(1)
+        while game.running and game.frame < 100000:
+            game.step(controller.actions(game))
+        levels.append(game.level if not game.has_cleared_all() else game.level + 1)
+    elapsed = time.perf_counter() - start
+    lookups = bot.evaluated + bot.table_hits
+    print(f"{n_games} bot games in {elapsed:.2f}s, mean level reached {statistics.fmean(levels):.2f}")
+    print(f"{bot.evaluated} placements scored, {bot.placements_per_second():,.0f} placements/s in search, "
+          f"transposition hits {bot.table_hits / max(1, lookups):.1%}")
+
+# --------------------------------------------------------
+# Tournament scaling across processes
+# --------------------------------------------------------
+def bench_tournament(n_matches=200):
+    import multiprocessing
+    import drdr64_tournament
+
+    cores = multiprocessing.cpu_count()
+    counts = sorted({1, 2, cores // 2, cores} - {0})
+    base = None
+    for workers in counts:
+        start = time.perf_counter()
+        report = drdr64_tournament.run_tournament(n_matches, "bot", "drop", workers=workers)
+        rate = report.matches / (time.perf_counter() - start)
+        base = base or rate
+        print(f"{workers:3d} workers: {rate:8.1f} matches/s  speedup {rate / base:.2f}x "
+              f"(ideal {min(workers, cores)}x)")
+
+# --------------------------------------------------------
+# Input-log replays
+# --------------------------------------------------------
+def bench_replay(seed=42):
+    import drdr64_ai
+    import drdr64_replay
+
+    game = drdr64_core.DrMarioGame(seed=seed)
+    game.start_level(1)
+    controller = drdr64_ai.BotController()
+    recorder = drdr64_replay.ReplayRecorder(game)
+    while game.running:
+        recorder.step(controller.actions(game))
+    replay = drdr64_replay.Replay.from_bytes(recorder.replay.to_bytes())
+    final = game.snapshot()
+    print(f"{replay.frames} frames ({replay.frames / drdr64_core.FPS:.0f}s of play), "
+          f"{len(recorder.replay.to_bytes())} bytes saved, {len(replay.snapshots)} snapshots")
+
+    player = drdr64_replay.ReplayPlayer(replay)
+    start = time.perf_counter()
+    player.play_to_end()
+    elapsed = time.perf_counter() - start
+    assert player.game.snapshot() == final, "replay diverged from the recorded game"
+    print(f"playback reproduces the game exactly, "
+          f"{replay.frames / drdr64_core.FPS / elapsed:,.0f}x real time")
+
+    # Every seek target must match linear playback, and cost about the same
+    player.seek(0)
+    linear = {}
+    while True:
+        linear[player.frame] = player.game.snapshot()
+        if not player.step():
+            break
+    rng = random.Random(seed)
+    for fraction in (0.1, 0.5, 0.9):
+        targets = [int(replay.frames * fraction) + rng.randrange(600) for _ in range(50)]
+        targets = [min(t, replay.frames) for t in targets]
+        start = time.perf_counter()
+        for target in targets:
+            player.seek(target)
+        per_seek = (time.perf_counter() - start) / len(targets)
+        assert all(player.seek(t) or player.game.snapshot() == linear[t] for t in targets)
+        print(f"seek near {fraction:.0%} of the game: {per_seek * 1000:.2f}ms")
+
+def bench_net(n_matches=100, max_frames=3000):
+    import asyncio
+    import drdr64_net
+
+    stats = asyncio.run(drdr64_net.run_loopback(n_matches, max_frames))
+    print(f"{stats['matches']} concurrent loopback matches, {stats['frames']} frames "
+          f"in {stats['elapsed']:.2f}s, all client mirrors in sync")
+    print(f"  {stats['bytes_per_frame']:.1f} bytes/frame per match "
+          f"(full snapshots: {stats['full_state_bytes']})")
+    print(f"  server CPU {stats['cpu_us_per_match_frame']:.1f}us per match-frame, "
+          f"~{1e6 / drdr64_core.FPS / stats['cpu_us_per_match_frame']:.0f} "
+          f"real-time matches per core")
+
+# --------------------------------------------------------
+# Fixed-timestep: outcomes independent of render rate
+# --------------------------------------------------------
+def _held_script(seed, ticks):
+    """Held ACTION_* bits per tick: random presses of random length."""
+    rng = random.Random(seed)
+    held = []
+    while len(held) < ticks:
+        keys = rng.choice((0, 0, 0, drdr64_core.ACTION_LEFT, drdr64_core.ACTION_RIGHT,
+                           drdr64_core.ACTION_ROTATE, drdr64_core.ACTION_DOWN))
+        held += [keys] * rng.randint(1, 8 if keys == drdr64_core.ACTION_DOWN else 40)
+    return held[:ticks]
+
+def _run_versus_at(seed, frame_times, ticks):
+    """
+    The live versus loop (FixedTimestep + KeyRepeat) driven by a list of
+    render frame durations instead of a clock. Returns the end state and
+    the number of frames rendered.
+    """
+    players = [drdr64_core.DrMarioGame(seed=seed) for _ in range(2)]
+    match = drdr64_core.VersusMatch(*players)
+    match.start(1)
+    scripts = [_held_script(seed * 2 + side, ticks) for side in range(2)]
+    repeats = [drdr64_core.KeyRepeat(), drdr64_core.KeyRepeat()]
+    timestep = drdr64_core.FixedTimestep(drdr64_core.TICK_RATE, max_ticks=10 ** 9)
+    tick = 0
+    rendered = 0
+    for dt in frame_times:
+        for _ in range(timestep.advance(dt)):
+            if tick >= ticks or match.is_over():
+                break
+            match.step(repeats[0].update(scripts[0][tick]),
+                       repeats[1].update(scripts[1][tick]))
+            tick += 1
+        rendered += 1
+        if tick >= ticks or match.is_over():
+            break
+    return [game.snapshot() for game in players], match.result(), tick, rendered
+
+def check_timing(n_seeds=20, seconds=120):
+    """Same per-tick inputs at 30/60/144 Hz and under stutter must end identically."""
+    ticks = seconds * drdr64_core.TICK_RATE
+    rng = random.Random(0)
+    profiles = {
+        "30 Hz": [1 / 30] * (seconds * 30 + 1),
+        "60 Hz": [1 / 60] * (seconds * 60 + 1),
+        "144 Hz": [1 / 144] * (seconds * 144 + 1),
+        # Mostly 144 Hz with frames that take anywhere up to 100ms
+        "stutter": [rng.choice((1 / 144, 1 / 144, 1 / 144, rng.uniform(0.02, 0.1)))
+                    for _ in range(seconds * 144 + 1)],
+    }
+    for seed in range(n_seeds):
+        outcomes = {}
+        for name, frame_times in profiles.items():
+            end, result, tick, rendered = _run_versus_at(seed, frame_times, ticks)
+            outcomes[name] = (end, result, tick)
+            if seed == 0:
+                print(f"  {name:>7}: {rendered} frames rendered for {tick} ticks")
+        reference = outcomes["60 Hz"]
+        for name, outcome in outcomes.items():
+            assert outcome == reference, f"seed {seed}: {name} diverged from 60 Hz"
+    print(f"{n_seeds} seeded versus matches end identically at every render rate")
+
+# --------------------------------------------------------
+# N-board versus frame time
+# --------------------------------------------------------
+def bench_versus(frames=1200):
+    """Frame time (all boards ticked by bots, drawn, one display update) by board count."""
+    import drdr64_ai
+    DRDR64 = _headless_display()
+    pygame = DRDR64.pygame
+    screen = DRDR64.screen
+    budget = 1000 / drdr64_core.FPS
+    for count in (1, 2, 4, 6, 8):
+        versus = DRDR64.VersusDrMarioGame(
+            controls=[drdr64_ai.BotController() for _ in range(count)])
+        for i, game in enumerate(versus.players):
+            game.rng.setstate(1000 + i)
+        versus.match.start(3)
+        screen.fill(drdr64_core.BLACK)
+        pygame.display.flip()
+        pressed = pygame.key.get_pressed()
+        samples = []
+        for _ in range(frames):
+            start = time.perf_counter()
+            versus.step(pressed)
+            pygame.display.update(versus.draw(screen))
+            samples.append(time.perf_counter() - start)
+            if versus.match.is_over():
+                versus.match.start(3)
+        p99 = sorted(samples)[int(len(samples) * 0.99)] * 1000
+        worst = max(samples) * 1000
+        print(f"{count} boards at {versus.players[0].renderer.cell_size}px: "
+              f"{_frame_stats(samples)}  ({p99 / budget:.0%} of the 60 FPS budget at p99, worst {worst:.1f}ms)")
+
+# --------------------------------------------------------
+# Rewind ring buffer
+# --------------------------------------------------------
+class _EventList:
+    """A telemetry sink that keeps every event as a tuple."""
+    def __init__(self):
+        self.events = []
+
+    def emit(self, *event):
+        self.events.append(event)
+
+def bench_rewind(seed=7):
+    """
+    Per-tick capture cost against the frame budget, restore cost and
+    exactness: after each rewind, the next ticks of play (with the
+    recorded inputs) must match the original run tick for tick, lock
+    timings in the telemetry events included.
+    """
+    import drdr64_ai
+    import drdr64_rewind
+
+    game = drdr64_core.DrMarioGame(seed=seed)
+    game.start_level(1)
+    controller = drdr64_ai.BotController()
+    rewind = drdr64_rewind.RewindBuffer(game)
+    original = game.telemetry = _EventList()
+    history = []
+    inputs = []
+    capture_time = step_time = 0.0
+    while game.running and game.frame < 20 * rewind.capacity:
+        start = time.perf_counter()
+        actions = controller.actions(game)
+        game.step(actions)
+        inputs.append(actions)
+        mid = time.perf_counter()
+        rewind.capture()
+        end = time.perf_counter()
+        step_time += mid - start
+        capture_time += end - mid
+        history.append(game.snapshot())
+    ticks = len(history)
+    per_capture = capture_time / ticks
+    budget = 1 / drdr64_core.FPS
+    print(f"{ticks} ticks, {rewind.capacity} x {rewind.slot_size}-byte slots "
+          f"({len(rewind.buffer) / 1024:.0f} KB preallocated)")
+    print(f"capture: {per_capture * 1e6:.2f}us/tick = {per_capture / budget:.3%} of the "
+          f"60 FPS frame budget (engine step + bot: {step_time / ticks * 1e6:.1f}us)")
+
+    timeline = list(history)
+    rng = random.Random(seed)
+    restore_time = 0.0
+    restores = 0
+    replay_ticks = 120
+    while len(rewind) > 1:
+        back = rng.randint(1, 120)
+        start = time.perf_counter()
+        undone = rewind.rewind(back)
+        restore_time += time.perf_counter() - start
+        restores += 1
+        history[len(history) - undone:] = []
+        tick = len(history)
+        assert game.snapshot() == history[-1], "rewind restored the wrong state"
+        # Play on from there: lock and gravity timing must match the original run
+        first = game.frame
+        replayed = game.telemetry = _EventList()
+        for i in range(tick, min(tick + replay_ticks, ticks)):
+            game.step(inputs[i])
+            assert game.snapshot() == timeline[i], f"play after a rewind diverged at tick {i}"
+        expected = [e for e in original.events if first < e[2] <= game.frame]
+        assert replayed.events == expected, f"events after a rewind to tick {tick} differ"
+        game.restore(history[-1])
+    per_restore = restore_time / restores
+    print(f"restore: {per_restore * 1e6:.1f}us each, {restores} random rewinds all exact, "
+          f"each matching the next {replay_ticks} ticks of the original run")
+
+# --------------------------------------------------------
+# Level bank
+# --------------------------------------------------------
+def bench_levels(per_level=8):
+    """Build a small bank in parallel, then time opening it and starting levels from it."""
+    import tempfile
+    import drdr64_levels
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bank.bin")
+        start = time.perf_counter()
+        drdr64_levels.build_bank(path, per_level)
+        elapsed = time.perf_counter() - start
+        total = per_level * drdr64_core.MAX_LEVEL
+        print(f"generated and rated {total} layouts in {elapsed:.1f}s "
+              f"({total / elapsed:.2f}/s on {os.cpu_count()} cores), "
+              f"{os.path.getsize(path)} bytes")
+
+        start = time.perf_counter()
+        bank = drdr64_levels.LevelBank(path)
+        print(f"open (mmap): {(time.perf_counter() - start) * 1e6:.0f}us")
+        for level in sorted(bank.levels):
+            ratings = bank.difficulties(level)
+            print(f"  level {level}: capsules to clear {ratings[0]:.1f} .. {ratings[-1]:.1f}")
+
+        game = drdr64_core.DrMarioGame(seed=1)
+        n = 2000
+        start = time.perf_counter()
+        for i in range(n):
+            game.start_level(i % drdr64_core.MAX_LEVEL + 1)
+        shuffled = (time.perf_counter() - start) / n
+        game.level_bank = bank
+        start = time.perf_counter()
+        for i in range(n):
+            game.target_difficulty = (i % 11) / 10
+            game.start_level(i % drdr64_core.MAX_LEVEL + 1)
+        banked = (time.perf_counter() - start) / n
+        print(f"start_level: {shuffled * 1e6:.1f}us shuffled, {banked * 1e6:.1f}us from the bank")
+
+        # Stored layouts must be exactly what their seeds generate, and
+        # stay readable after the bank is closed
+        records = [(level, bank.record(level, 0)) for level in sorted(bank.levels)]
+        bank.close()
+        for level, (seed, _, virus_count, cells) in records:
+            assert (virus_count, cells) == drdr64_levels.generate_layout(seed, level)
+
+# --------------------------------------------------------
+# Anytime hints
+# --------------------------------------------------------
+def bench_hints(frames=3000):
+    """Frame-time percentiles with and without the 2ms-budget hint engine."""
+    import drdr64_hints
+    DRDR64 = _headless_display()
+    pygame = DRDR64.pygame
+    screen = DRDR64.screen
+
+    def play(with_hints):
+        game = DRDR64.DrMarioGame(x_offset=50, y_offset=50, seed=3)
+        game.start_level(3)
+        if with_hints:
+            game.toggle_hints()
+        policy = drdr64_core.drop_policy(random.Random(3))
+        screen.fill(drdr64_core.BLACK)
+        game.renderer.invalidate()
+        samples = []
+        depths = []
+        capsule = None
+        for _ in range(frames):
+            start = time.perf_counter()
+            if not game.running:
+                game.running = True
+                game.start_level(3)
+            # A slow player: the capsule mostly falls on its own
+            game.step(policy(game) & ~drdr64_core.ACTION_DOWN)
+            if game.hints is not None:
+                if game.capsule is not capsule and capsule is not None:
+                    depths.append((game.hints.depth, game.hints.done))
+                capsule = game.capsule
+                game.hints.update(game)
+            pygame.display.update(game.draw(screen))
+            samples.append(time.perf_counter() - start)
+        return samples, depths
+
+    samples, _ = play(False)
+    print(f"no hints:    {_frame_stats(samples)}")
+    samples, depths = play(True)
+    print(f"hints (2ms): {_frame_stats(samples)}")
+    finished = sum(done for _, done in depths)
+    lookahead = sum(depth == 2 for depth, _ in depths)
+    print(f"  {len(depths)} capsules: lookahead hint reached for {lookahead}, "
+          f"search finished for {finished} before the capsule locked")
+
+# --------------------------------------------------------
+# Telemetry overhead
+# --------------------------------------------------------
+def bench_telemetry(n_games=3000):
+    """Batch throughput with telemetry off, into a bare ring, and with the file writer."""
+    import tempfile
+    import drdr64_telemetry
+
+    def run(repeats=3, **kwargs):
+        best = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            results = drdr64_core.run_batch(n_games, **kwargs)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, results
+
+    off, baseline = run()
+    ring = drdr64_telemetry.EventRing()
+    bare, _ = run(telemetry=ring)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "events.bin")
+        ring = drdr64_telemetry.EventRing()
+        with drdr64_telemetry.TelemetryWriter(ring, path) as writer:
+            written, results = run(repeats=1, telemetry=ring)
+        assert results == baseline, "telemetry changed game outcomes"
+        events = drdr64_telemetry.load_events(path)
+        size = os.path.getsize(path)
+    print(f"{n_games} games:")
+    print(f"  telemetry off:   {off:.3f}s")
+    print(f"  ring, unread:    {bare:.3f}s ({bare / off - 1:+.1%})")
+    print(f"  ring + writer:   {written:.3f}s ({written / off - 1:+.1%}), "
+          f"{writer.events} events, {ring.dropped} dropped, {size / 1024:.0f} KB")
+    print(drdr64_telemetry.summarize(events))
+
+BENCHMARKS = {
+    "games": bench_games,
+    "grid": bench_grid,
+    "batch": bench_batch,
+    "incremental": bench_incremental,
+    "render": bench_render,
+    "ai": bench_ai,
+    "tournament": bench_tournament,
+    "replay": bench_replay,
+    "net": bench_net,
+    "timing": check_timing,
+    "versus": bench_versus,
+    "rewind": bench_rewind,
+    "levels": bench_levels,
+    "hints": bench_hints,
+    "telemetry": bench_telemetry,
+}
+
+def main(argv):
+    if not argv or argv[0] not in BENCHMARKS:
+        print("usage: python drdr64_bench.py {%s} [args...]" % ",".join(BENCHMARKS))
+        return 1
+    BENCHMARKS[argv[0]](*(int(a) for a in argv[1:]))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
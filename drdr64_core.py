@@ -0,0 +1,822 @@
+import os
+import random
+import struct
+
+# --------------------------------------------------------
+# Headless Dr. Mario rules engine
+# --------------------------------------------------------
+# Everything in this module is pure game logic: no pygame, no window,
+# no clock. DRDR64.py renders on top of it, and batch tools can import
+# it in a few milliseconds and step thousands of games with explicit
+# action inputs.
+
+GRID_WIDTH = 10
+GRID_HEIGHT = 20
+
+FPS = 60
+INITIAL_DROP_SPEED = FPS // 2  # Capsule drop every half second initially
+
+# Colors
+BLACK  = (0, 0, 0)
+WHITE  = (255, 255, 255)
+RED    = (255, 0, 0)
+GREEN  = (0, 255, 0)
+BLUE   = (0, 0, 255)
+YELLOW = (255, 255, 0)
+GRAY   = (100, 100, 100)
+
+# Each board cell is one byte: the low bits hold a color code and the
+# high bits say what kind of piece sits there. 0 means empty.
+EMPTY         = 0
+COLOR_RED     = 1
+COLOR_GREEN   = 2
+COLOR_BLUE    = 3
+COLOR_YELLOW  = 4
+COLOR_MASK    = 0x07
+VIRUS_FLAG    = 0x10
+PILL_FLAG     = 0x20
+
+CAPSULE_COLORS = [COLOR_RED, COLOR_GREEN, COLOR_BLUE, COLOR_YELLOW]
+
+# cells.translate(CELL_COLORS) keeps only each cell's color
+CELL_COLORS = bytes(i & COLOR_MASK for i in range(256))
+MATCH_QUADS = [(color, bytes((color,)) * 4) for color in CAPSULE_COLORS]
+
+# Color code -> RGB, for renderers
+PALETTE = {
+    COLOR_RED: RED,
+    COLOR_GREEN: GREEN,
+    COLOR_BLUE: BLUE,
+    COLOR_YELLOW: YELLOW,
+}
+
+# Virus Count by level
+LEVEL_VIRUS_COUNTS = {
+    1: 10,
+    2: 15,
+    3: 20,
+    4: 25,
+    5: 30
+}
+MAX_LEVEL = 5
+
+# Per-frame action bits. Several can be held at once, exactly like keys.
+ACTION_NONE   = 0
+ACTION_LEFT   = 1
+ACTION_RIGHT  = 2
+ACTION_DOWN   = 4
+ACTION_ROTATE = 8
+
+# The rules advance in fixed simulation ticks (drop_speed and key repeat
+# are counted in them); renderers run step() as often as FixedTimestep
+# says, whatever their own frame rate.
+TICK_RATE = FPS
+
+# Gameplay event kinds, reported to DrMarioGame.telemetry when one is set
+# (see drdr64_telemetry). Every event carries the frame and level plus
+# three ints:
+EVENT_LEVEL_START = 1  # viruses, -, -
+EVENT_LOCK        = 2  # ticks the capsule was in play, pivot x, pivot y
+EVENT_CHAIN       = 3  # chain length, blocks removed, viruses cleared
+EVENT_LEVEL_CLEAR = 4  # score, -, -
+EVENT_GAME_CLEAR  = 5  # score, -, -
+EVENT_TOP_OUT     = 6  # score, viruses left, -
+
+# --------------------------------------------------------
+# Per-game RNG
+# --------------------------------------------------------
+MASK64 = (1 << 64) - 1
+
+class GameRng:
+    """
+    splitmix64: a tiny, fast PRNG whose whole state is one 64-bit int,
+    so a game can be reproduced from its seed and snapshotted in 8 bytes.
+    Provides the parts of the random module API the game uses.
+    """
+    __slots__ = ("state",)
+
+    def __init__(self, seed=None):
+        if seed is None:
+            seed = int.from_bytes(os.urandom(8), "little")
+        self.state = seed & MASK64
+
+    def next64(self):
+        self.state = z = (self.state + 0x9E3779B97F4A7C15) & MASK64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+        return z ^ (z >> 31)
+
+    def random(self):
+        return (self.next64() >> 11) * (1.0 / (1 << 53))
+
+    def randrange(self, n):
+        return self.next64() % n
+
+    def choice(self, seq):
+        return seq[self.next64() % len(seq)]
+
+    def shuffle(self, seq):
+        for i in range(len(seq) - 1, 0, -1):
+            j = self.next64() % (i + 1)
+            seq[i], seq[j] = seq[j], seq[i]
+
+    def getstate(self):
+        return self.state
+
+    def setstate(self, state):
+        self.state = state
+
+# --------------------------------------------------------
+# Block, Virus, and Grid Classes
+# --------------------------------------------------------
+class Block:
+    """A capsule half (or a piece being placed). color is a COLOR_* code."""
+    __slots__ = ("x", "y", "color")
+    kind = PILL_FLAG
+
+    def __init__(self, x, y, color):
+        self.x = x
+        self.y = y
+        self.color = color
+
+class Virus(Block):
+    """A Block that is stored with VIRUS_FLAG once it is on the grid."""
+    __slots__ = ()
+    kind = VIRUS_FLAG
+
+def _find_runs(line, start, end):
+    """(start, end) of every run of 4+ same nonzero bytes in line[start:end]."""
+    runs = []
+    for color, quad in MATCH_QUADS:
+        i = line.find(quad, start, end)
+        while i >= 0:
+            run_end = i + 4
+            while run_end < end and line[run_end] == color:
+                run_end += 1
+            runs.append((i, run_end))
+            i = line.find(quad, run_end, end)
+    return runs
+
+class Grid:
+    """
+    Manages the playfield as a flat bytearray, one byte per cell
+    (row-major, index = y * width + x). A 10x20 board is 200 bytes.
+
+    The grid also remembers which rows and columns changed since the last
+    match scan (dirty_rows, dirty_cols) and which columns had pieces added
+    or removed since the last gravity pass (unsettled), as int bitmasks
+    (bit y / bit x), so remove_matches()/apply_gravity() only revisit
+    those. The *_full variants scan the whole board and give the same
+    results.
+    """
+    __slots__ = ("width", "height", "cells", "virus_count",
+                 "dirty_rows", "dirty_cols", "unsettled")
+
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT):
+        self.width = width
+        self.height = height
+        self.cells = bytearray(width * height)
+        self.virus_count = 0
+        self.dirty_rows = 0
+        self.dirty_cols = 0
+        self.unsettled = 0
+
+    def copy(self):
+        grid = Grid(self.width, self.height)
+        grid.cells[:] = self.cells
+        grid.virus_count = self.virus_count
+        grid.dirty_rows = self.dirty_rows
+        grid.dirty_cols = self.dirty_cols
+        grid.unsettled = self.unsettled
+        return grid
+
+    def get(self, x, y):
+        return self.cells[y * self.width + x]
+
+    def is_free(self, x, y):
+        """True if (x, y) is inside the board and empty."""
+        return (0 <= x < self.width and 0 <= y < self.height
+                and not self.cells[y * self.width + x])
+
+    def add_block(self, block):
+        """Add a single block (or virus) to the grid if valid."""
+        x = block.x
+        y = block.y
+        if 0 <= y < self.height and 0 <= x < self.width:
+            self.cells[y * self.width + x] = block.color | block.kind
+            # The column is rescanned as unsettled, see remove_matches()
+            self.dirty_rows |= 1 << y
+            self.unsettled |= 1 << x
+
+    def mark_all_dirty(self):
+        """Call after writing self.cells directly."""
+        self.dirty_rows = (1 << self.height) - 1
+        self.dirty_cols = self.unsettled = (1 << self.width) - 1
+
+    def remove_matches(self):
+        """
+        Remove horizontal/vertical matches of 4 or more same-colored pieces
+        Returns the number of matched blocks removed. We'll use this for scoring.
+        Only dirty rows and dirty or unsettled columns are scanned (rows
+        in between dirty ones go along; outside the dirty lines there is
+        nothing left to match).
+        """
+        rows = self.dirty_rows
+        cols = self.dirty_cols | self.unsettled
+        if not rows and not cols:
+            return 0
+        width = self.width
+        colors = self.cells.translate(CELL_COLORS)
+        to_remove = set()
+        if rows:
+            # One pass from the lowest to the highest dirty row; runs are
+            # split where they wrap from one row into the next
+            start = ((rows & -rows).bit_length() - 1) * width
+            for run_start, run_end in _find_runs(colors, start, rows.bit_length() * width):
+                while run_start < run_end:
+                    piece_end = min(run_end, (run_start // width + 1) * width)
+                    if piece_end - run_start >= 4:
+                        to_remove.update(range(run_start, piece_end))
+                    run_start = piece_end
+        if cols:
+            # The dirty columns end to end, one empty cell apart
+            xs = []
+            while cols:
+                low = cols & -cols
+                cols ^= low
+                xs.append(low.bit_length() - 1)
+            line = b"\0".join([colors[x::width] for x in xs])
+            stride = self.height + 1
+            for run_start, run_end in _find_runs(line, 0, len(line)):
+                column, y = divmod(run_start, stride)
+                i = y * width + xs[column]
+                to_remove.update(range(i, i + (run_end - run_start) * width, width))
+        self.dirty_rows = self.dirty_cols = 0
+        return self._remove(to_remove)
+
+    def remove_matches_full(self):
+        """remove_matches() over every cell, ignoring the dirty set."""
+        cells = self.cells
+        width = self.width
+        height = self.height
+        to_remove = set()
+
+        for y in range(height):
+            row = y * width
+            for x in range(width):
+                i = row + x
+                cell = cells[i]
+                if not cell:
+                    continue
+                color = cell & COLOR_MASK
+
+                # Horizontal check
+                if (x <= width - 4
+                        and cells[i + 1] & COLOR_MASK == color
+                        and cells[i + 2] & COLOR_MASK == color
+                        and cells[i + 3] & COLOR_MASK == color):
+                    to_remove.update((i, i + 1, i + 2, i + 3))
+
+                # Vertical check
+                if (y <= height - 4
+                        and cells[i + width] & COLOR_MASK == color
+                        and cells[i + 2 * width] & COLOR_MASK == color
+                        and cells[i + 3 * width] & COLOR_MASK == color):
+                    to_remove.update((i, i + width, i + 2 * width, i + 3 * width))
+
+        self.dirty_rows = self.dirty_cols = 0
+        return self._remove(to_remove)
+
+    def _remove(self, to_remove):
+        cells = self.cells
+        width = self.width
+        unsettled = self.unsettled
+        for i in to_remove:
+            if cells[i] & VIRUS_FLAG:
+                # Decrease virus count if a virus is removed
+                self.virus_count -= 1
+            cells[i] = EMPTY
+            unsettled |= 1 << (i % width)
+        self.unsettled = unsettled
+        return len(to_remove)
+
+    def _settle_column(self, x):
+        # Walk the column bottom-up, packing pieces onto the lowest free cell
+        cells = self.cells
+        width = self.width
+        write = (self.height - 1) * width + x
+        moved = 0
+        for read in range(write, -1, -width):
+            cell = cells[read]
+            if cell:
+                if read != write:
+                    cells[write] = cell
+                    cells[read] = EMPTY
+                    moved |= 1 << (write // width)
+                write -= width
+        if moved:
+            self.dirty_rows |= moved
+            self.dirty_cols |= 1 << x
+
+    def apply_gravity(self):
+        """
+        Let any floating blocks fall down until they land on another block
+        or the bottom of the grid. Only unsettled columns can hold floating
+        blocks; every piece that moves marks its row and column dirty for
+        the next scan.
+        """
+        unsettled = self.unsettled
+        while unsettled:
+            low = unsettled & -unsettled
+            unsettled ^= low
+            self._settle_column(low.bit_length() - 1)
+        self.unsettled = 0
+
+    def apply_gravity_full(self):
+        """apply_gravity() over every column."""
+        for x in range(self.width):
+            self._settle_column(x)
+        self.unsettled = 0
+
+# --------------------------------------------------------
+# Capsule Class
+# --------------------------------------------------------
+class Capsule:
+    """Represents the falling pair of blocks."""
+    __slots__ = ("blocks", "locked", "grid_width", "grid_height")
+
+    def __init__(self, x, y, grid_width, grid_height, rng=random, colors=None):
+        if colors is None:
+            colors = (rng.choice(CAPSULE_COLORS), rng.choice(CAPSULE_COLORS))
+        self.blocks = [
+            Block(x, y, colors[0]),
+            Block(x + 1, y, colors[1])
+        ]
+        self.locked = False
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+
+    def _try_place(self, grid, x0, y0, x1, y1):
+        # The capsule is never stored in the grid while falling, so both
+        # target cells only need to be free on the board.
+        if grid.is_free(x0, y0) and grid.is_free(x1, y1):
+            a, b = self.blocks
+            a.x, a.y, b.x, b.y = x0, y0, x1, y1
+            return True
+        return False
+
+    def move(self, dx, dy, grid):
+        if self.locked:
+            return
+        a, b = self.blocks
+        self._try_place(grid, a.x + dx, a.y + dy, b.x + dx, b.y + dy)
+
+    def rotate(self, grid):
+        if self.locked:
+            return
+        # 90-degree rotation around the first block: (x, y) -> (-y, x)
+        a, b = self.blocks
+        self._try_place(grid, a.x, a.y,
+                        a.x - (b.y - a.y), a.y + (b.x - a.x))
+
+    def drop(self, grid):
+        if self.locked:
+            return
+        a, b = self.blocks
+        if not self._try_place(grid, a.x, a.y + 1, b.x, b.y + 1):
+            self.locked = True
+            for block in self.blocks:
+                grid.add_block(block)
+
+# --------------------------------------------------------
+# Dr. Mario Rules (chain scoring, level progression)
+# --------------------------------------------------------
+class DrMarioGame:
+    """
+    One player's board and rules, stepped one frame at a time.
+    Every game owns a GameRng; pass seed to make it reproducible, or
+    rng to supply any object with choice()/shuffle() instead (snapshots
+    need a GameRng).
+    """
+    def __init__(self, grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT,
+                 initial_level=1, player_name="Player", rng=None, seed=None):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.rng = rng if rng is not None else GameRng(seed)
+
+        self.grid = Grid(width=self.grid_width, height=self.grid_height)
+        self.level = initial_level
+        self.score = 0
+        self.capsule = None
+        self.drop_timer = 0
+        self.drop_speed = INITIAL_DROP_SPEED
+        self.running = True
+        self.player_name = player_name
+        self.frame = 0
+        self.total_chains = 0
+        self.max_chain = 0
+        # Optional drdr64_levels.LevelBank: start_level() then takes rated
+        # layouts from it around target_difficulty (0 easiest .. 1 hardest)
+        self.level_bank = None
+        self.target_difficulty = 0.5
+        # Optional event sink with emit(kind, game_id, frame, level, a, b, c)
+        self.telemetry = None
+        self.telemetry_id = 0
+        self.capsule_frame = 0
+
+    def start_level(self, level):
+        self.level = level
+        self.grid = Grid(width=self.grid_width, height=self.grid_height)
+        self.score = 0
+        self.drop_speed = max(FPS // (2 + level // 2), 5)
+        layout = None
+        if self.level_bank is not None:
+            layout = self.level_bank.pick(level, self.target_difficulty, self.rng,
+                                          self.grid_width, self.grid_height)
+        if layout is not None:
+            virus_count, cells = layout
+            self.grid.cells[:] = cells
+            self.grid.virus_count = virus_count
+            self.grid.mark_all_dirty()
+        else:
+            self._place_viruses(LEVEL_VIRUS_COUNTS.get(level, 10))
+
+        if self.telemetry is not None:
+            self.telemetry.emit(EVENT_LEVEL_START, self.telemetry_id, self.frame, level,
+                                self.grid.virus_count, 0, 0)
+        self.spawn_next_capsule()
+
+    def _place_viruses(self, virus_count):
+        self.grid.virus_count = virus_count
+
+        # Place viruses randomly in lower rows
+        available_positions = [
+            (x, y) for y in range(3, self.grid_height)
+            for x in range(self.grid_width)
+        ]
+        self.rng.shuffle(available_positions)
+        for i in range(virus_count):
+            vx, vy = available_positions[i]
+            virus_color = self.rng.choice(CAPSULE_COLORS)
+            self.grid.add_block(Virus(vx, vy, virus_color))
+
+    def spawn_next_capsule(self):
+        self.capsule = Capsule(self.grid_width // 2 - 1, 0,
+                               self.grid_width, self.grid_height, self.rng)
+        self.capsule_frame = self.frame
+        # If it collides, game over
+        topped_out = False
+        for block in self.capsule.blocks:
+            if self.grid.get(block.x, block.y):
+                self.running = False  # Topped out
+                topped_out = True
+        if topped_out and self.telemetry is not None:
+            self.telemetry.emit(EVENT_TOP_OUT, self.telemetry_id, self.frame, self.level,
+                                self.score, self.grid.virus_count, 0)
+
+    def peek_next_colors(self):
+        """
+        Colors of the capsule after this one, read from a copy of the RNG
+        (None without a GameRng). If the current capsule finishes the
+        level, the new viruses are drawn first and the real colors differ.
+        """
+        if not isinstance(self.rng, GameRng):
+            return None
+        rng = GameRng(self.rng.getstate())
+        return (rng.choice(CAPSULE_COLORS), rng.choice(CAPSULE_COLORS))
+
+    def apply_actions(self, actions):
+        """Apply one frame of held actions (a bitmask of ACTION_* flags)."""
+        if actions & ACTION_LEFT:
+            self.capsule.move(-1, 0, self.grid)
+        if actions & ACTION_RIGHT:
+            self.capsule.move(1, 0, self.grid)
+        if actions & ACTION_DOWN:
+            self.capsule.drop(self.grid)
+        if actions & ACTION_ROTATE:
+            self.capsule.rotate(self.grid)
+
+    def update(self):
+        if not self.running:
+            return
+
+        self.frame += 1
+        self.drop_timer += 1
+        if self.drop_timer >= self.drop_speed:
+            self.capsule.drop(self.grid)
+            self.drop_timer = 0
+
+        if self.capsule.locked:
+            # Attempt chain combos
+            chain_count = 0
+            removed_total = 0
+            viruses_before = self.grid.virus_count
+            while True:
+                removed = self.grid.remove_matches()
+                if removed > 0:
+                    chain_count += 1
+                    removed_total += removed
+                    self.grid.apply_gravity()
+                else:
+                    break
+
+            telemetry = self.telemetry
+            if telemetry is not None:
+                pivot = self.capsule.blocks[0]
+                telemetry.emit(EVENT_LOCK, self.telemetry_id, self.frame, self.level,
+                               self.frame - self.capsule_frame, pivot.x, pivot.y)
+                if chain_count:
+                    telemetry.emit(EVENT_CHAIN, self.telemetry_id, self.frame, self.level,
+                                   chain_count, removed_total,
+                                   viruses_before - self.grid.virus_count)
+
+            # Score example: (blocks_removed) + chain bonus
+            # We can do something like 100 points for first chain, 200 for second, etc.
+            if chain_count > 0:
+                # Just a simple chain bonus for demonstration
+                chain_bonus = 100 * chain_count
+                self.score += chain_bonus
+                self.total_chains += chain_count
+                self.max_chain = max(self.max_chain, chain_count)
+
+            # Check virus condition
+            if self.grid.virus_count <= 0:
+                # Next level or done
+                if telemetry is not None:
+                    telemetry.emit(EVENT_LEVEL_CLEAR if self.level < MAX_LEVEL else EVENT_GAME_CLEAR,
+                                   self.telemetry_id, self.frame, self.level, self.score, 0, 0)
+                if self.level < MAX_LEVEL:
+                    self.start_level(self.level + 1)
+                else:
+                    # Completed all levels
+                    self.running = False
+                    return
+
+            # Spawn next capsule
+            self.spawn_next_capsule()
+
+    def step(self, actions=ACTION_NONE):
+        """One full frame: held actions first, then gravity/locking/scoring."""
+        if self.running:
+            self.apply_actions(actions)
+        self.update()
+
+    def is_game_over(self):
+        # If the grid was topped out, or viruses cleared at max level
+        return not self.running
+
+    def has_cleared_all(self):
+        return self.grid.virus_count <= 0 and self.level >= MAX_LEVEL
+
+    # Snapshot layout: fixed header, then one byte per grid cell
+    SNAPSHOT_VERSION = 2
+    SNAPSHOT_HEADER = struct.Struct("<BHHBqiHHBIIHQBhhBhhBI")
+    CAPSULE_PRESENT = 1
+    CAPSULE_LOCKED = 2
+
+    def _snapshot_fields(self):
+        capsule = self.capsule
+        flags = 0
+        ax = ay = bx = by = ac = bc = 0
+        if capsule is not None:
+            flags = self.CAPSULE_PRESENT | (self.CAPSULE_LOCKED if capsule.locked else 0)
+            a, b = capsule.blocks
+            ax, ay, ac, bx, by, bc = a.x, a.y, a.color, b.x, b.y, b.color
+        return (
+            self.SNAPSHOT_VERSION, self.grid_width, self.grid_height, self.level,
+            self.score, self.grid.virus_count, self.drop_timer, self.drop_speed,
+            self.running, self.frame, self.total_chains, self.max_chain,
+            self.rng.getstate(), flags, ax, ay, ac, bx, by, bc, self.capsule_frame,
+        )
+
+    def snapshot_size(self):
+        return self.SNAPSHOT_HEADER.size + self.grid_width * self.grid_height
+
+    def snapshot(self):
+        """The whole game state as compact bytes (see restore())."""
+        return self.SNAPSHOT_HEADER.pack(*self._snapshot_fields()) + self.grid.cells
+
+    def snapshot_into(self, buffer, offset=0):
+        """Write snapshot() into a preallocated buffer at offset, without allocating."""
+        header = self.SNAPSHOT_HEADER
+        header.pack_into(buffer, offset, *self._snapshot_fields())
+        start = offset + header.size
+        buffer[start:start + len(self.grid.cells)] = self.grid.cells
+
+    def restore(self, data, offset=0):
+        """Return to a state captured by snapshot() (or snapshot_into() at offset)."""
+        header = self.SNAPSHOT_HEADER
+        (version, width, height, self.level, self.score, virus_count,
+         self.drop_timer, self.drop_speed, running, self.frame,
+         self.total_chains, self.max_chain, rng_state, flags,
+         ax, ay, ac, bx, by, bc, self.capsule_frame) = header.unpack_from(data, offset)
+        if version != self.SNAPSHOT_VERSION:
+            raise ValueError(f"unsupported snapshot version {version}")
+        if (width, height) != (self.grid_width, self.grid_height):
+            raise ValueError(f"snapshot is for a {width}x{height} board")
+        self.running = bool(running)
+        self.rng.setstate(rng_state)
+        grid = Grid(width, height)
+        start = offset + header.size
+        grid.cells[:] = data[start:start + width * height]
+        grid.virus_count = virus_count
+        # The dirty masks are not stored; rescanning everything once gives
+        # the same results as the incremental scan would have.
+        grid.mark_all_dirty()
+        self.grid = grid
+        if flags & self.CAPSULE_PRESENT:
+            capsule = Capsule(ax, ay, width, height, colors=(ac, bc))
+            b = capsule.blocks[1]
+            b.x, b.y = bx, by
+            capsule.locked = bool(flags & self.CAPSULE_LOCKED)
+            self.capsule = capsule
+        else:
+            self.capsule = None
+
+# --------------------------------------------------------
+# Versus Rules (2-Player)
+# --------------------------------------------------------
+class VersusMatch:
+    """
+    Any number of DrMarioGame boards stepped in lockstep. Topped-out
+    boards drop out; the match ends when a board clears every level or
+    only one is left standing (with two boards: as soon as either one
+    is over). VersusDrMarioGame draws one of these; tournaments and the
+    network server run them headless.
+    """
+    def __init__(self, *players):
+        self.players = list(players)
+        self.frame = 0
+
+    @property
+    def player1(self):
+        return self.players[0]
+
+    @property
+    def player2(self):
+        return self.players[1]
+
+    def start(self, level=1):
+        for player in self.players:
+            player.start_level(level)
+
+    def step(self, *actions):
+        """One frame with one ACTION_* bitmask per board (missing = none)."""
+        # Every input lands before any board updates, like the live loop
+        for player, action in zip(self.players, actions):
+            if player.running:
+                player.apply_actions(action)
+        for player in self.players:
+            player.update()
+        self.frame += 1
+
+    def standing(self):
+        """1-based numbers of the boards still in play."""
+        return [i + 1 for i, player in enumerate(self.players) if not player.is_game_over()]
+
+    def is_over(self):
+        if any(player.has_cleared_all() for player in self.players):
+            return True
+        return len(self.standing()) <= (1 if len(self.players) > 1 else 0)
+
+    def result(self):
+        """(winner, message): winner is the 1-based board number, or 0 for a tie."""
+        cleared = [i + 1 for i, player in enumerate(self.players) if player.has_cleared_all()]
+        standing = self.standing()
+        if len(self.players) == 2:
+            return self._result_two_players(cleared, standing)
+
+        if len(cleared) == 1:
+            return cleared[0], f"Player {cleared[0]} Wins!"
+        elif cleared:
+            return 0, f"Players {', '.join(map(str, cleared))} Cleared! It's a tie!"
+        if len(standing) == 1:
+            return standing[0], f"Player {standing[0]} Wins (Last One Standing)!"
+        return 0, "Everyone Topped Out! It's a tie!"
+
+    def _result_two_players(self, cleared, standing):
+        if cleared == [1]:
+            return 1, "Player 1 Wins!"
+        elif cleared == [2]:
+            return 2, "Player 2 Wins!"
+        elif cleared:
+            return 0, "Both Cleared! It's a tie!"
+        # If nobody cleared all viruses, decide who lost by top-out
+        if standing == [2]:
+            return 2, "Player 2 Wins (P1 Topped Out)!"
+        elif standing == [1]:
+            return 1, "Player 1 Wins (P2 Topped Out)!"
+        return 0, "Both Topped Out! It's a tie!"
+
+# --------------------------------------------------------
+# Fixed-Rate Timing
+# --------------------------------------------------------
+class FixedTimestep:
+    """
+    Accumulates real frame times and hands back how many fixed ticks to
+    simulate, so a 30 Hz, 144 Hz or stuttering renderer all run the
+    game at TICK_RATE. After a very long frame (a debugger pause, window
+    drag) at most max_ticks are run and the rest is dropped.
+    """
+    def __init__(self, tick_rate=TICK_RATE, max_ticks=None):
+        self.tick_rate = tick_rate
+        self.max_ticks = max_ticks if max_ticks is not None else max(1, tick_rate // 4)
+        self.accumulator = 0.0  # in ticks
+
+    def advance(self, dt):
+        """Add dt seconds of real time; returns the number of ticks to run."""
+        self.accumulator += dt * self.tick_rate
+        # The epsilon keeps e.g. 144 frames of 1/144s from coming up one tick short
+        ticks = int(self.accumulator + 1e-6)
+        self.accumulator -= ticks
+        if ticks > self.max_ticks:
+            ticks = self.max_ticks
+            self.accumulator = 0.0
+        return ticks
+
+    def alpha(self):
+        """How far (0..1) real time is into the next tick, for interpolation."""
+        return min(1.0, max(0.0, self.accumulator))
+
+# Held-key repeat per action bit as (delay, interval) in ticks: the action
+# fires on the tick it is pressed, again after delay ticks, then every
+# interval ticks while held. None means press only.
+KEY_REPEAT = {
+    ACTION_LEFT: (16, 6),
+    ACTION_RIGHT: (16, 6),
+    ACTION_DOWN: (0, 2),
+    ACTION_ROTATE: None,
+}
+
+class KeyRepeat:
+    """Turns held-key bits into the actions to apply this tick."""
+    def __init__(self, timing=None):
+        self.timing = dict(KEY_REPEAT if timing is None else timing)
+        self.held_for = {bit: 0 for bit in self.timing}
+
+    def update(self, held):
+        """Call once per simulation tick with the ACTION_* bits held now."""
+        actions = ACTION_NONE
+        for bit, repeat in self.timing.items():
+            if not held & bit:
+                self.held_for[bit] = 0
+                continue
+            ticks = self.held_for[bit]
+            self.held_for[bit] = ticks + 1
+            if ticks == 0:
+                actions |= bit
+            elif repeat is not None:
+                delay, interval = repeat
+                if ticks >= delay and (ticks - delay) % interval == 0:
+                    actions |= bit
+        return actions
+
+    def reset(self):
+        for bit in self.held_for:
+            self.held_for[bit] = 0
+
+# --------------------------------------------------------
+# Batch Simulation Helpers
+# --------------------------------------------------------
+def drop_policy(rng):
+    """
+    A cheap scripted player: holds DOWN and jiggles left/right/rotate
+    at random. Good enough to drive full games for regression runs.
+    """
+    def policy(game):
+        return ACTION_DOWN | rng.choice((ACTION_NONE, ACTION_LEFT,
+                                         ACTION_RIGHT, ACTION_ROTATE))
+    return policy
+
+def play_game(seed, policy=None, level=1, max_frames=100000,
+              grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT, telemetry=None):
+    """
+    Play one headless game from a seed and return a summary dict.
+    The same seed and policy always give the same summary. Events go to
+    telemetry, if given, tagged with the seed as the game id.
+    """
+    if policy is None:
+        policy = drop_policy(random.Random(seed ^ 0x5EED))
+    game = DrMarioGame(grid_width=grid_width, grid_height=grid_height,
+                       initial_level=level, seed=seed)
+    game.telemetry = telemetry
+    game.telemetry_id = seed & MASK64  # the seed GameRng uses
+    game.start_level(level)
+    while game.running and game.frame < max_frames:
+        game.step(policy(game))
+    return {
+        "seed": seed,
+        "frames": game.frame,
+        "level": game.level,
+        "score": game.score,
+        "viruses_left": game.grid.virus_count,
+        "cleared": game.has_cleared_all(),
+    }
+
+def run_batch(n_games, first_seed=0, policy_factory=None, **kwargs):
+    """Play n_games seeded games back to back; returns their summaries."""
+    results = []
+    for seed in range(first_seed, first_seed + n_games):
+        policy = policy_factory(seed) if policy_factory else None
+        results.append(play_game(seed, policy=policy, **kwargs))
+    return results
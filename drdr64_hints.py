@@ -0,0 +1,151 @@
+"""
+Anytime placement hints for Dr. Mario.
+
+HintEngine works out where the current capsule should go, looking one
+capsule ahead (DrMarioGame.peek_next_colors), in small time slices: call
+update(game) once per frame and it searches for at most `budget` seconds
+before returning. The search is a generator that yields after every
+small unit of work, so it can stop anywhere and resume on the next
+frame:
+
+    1. reachable resting spots for the current capsule (resumable BFS)
+    2. every spot scored by PlacementBot on its own -> first hint
+    3. the best spots, in order, re-scored with the next capsule's best
+       follow-up placed after them -> the hint keeps improving
+
+The work restarts whenever a new capsule spawns or the board changes.
+`hint` is always the best placement found so far (or None), and
+`hint_cells()` gives its cells for the ghost overlay in DRDR64.py.
+"""
+import time
+
+from drdr64_core import Block, Capsule
+from drdr64_ai import PlacementBot, capsule_state, search_steps
+
+HINT_BUDGET = 0.002  # seconds of search per frame
+
+class HintEngine:
+    def __init__(self, bot=None, budget=HINT_BUDGET):
+        self.bot = bot if bot is not None else PlacementBot()
+        self.budget = budget
+        self.capsule = None
+        self.cells = None
+        self.work = None
+        self.hint = None         # (ax, ay, bx, by) for the current capsule
+        self.follow_up = None    # where the next capsule would go after it
+        self.score = None
+        self.depth = 0           # 0 nothing yet, 1 current capsule only, 2 with lookahead
+        self.done = False
+        self.work_time = 0.0
+
+    def reset(self):
+        self.capsule = None
+        self.cells = None
+        self.work = None
+        self.hint = None
+        self.follow_up = None
+        self.score = None
+        self.depth = 0
+        self.done = False
+
+    def update(self, game, budget=None):
+        """Spend up to budget seconds (default self.budget) improving the hint."""
+        capsule = game.capsule
+        if not game.running or capsule is None or capsule.locked:
+            self.reset()
+            return
+        if capsule is not self.capsule or game.grid.cells != self.cells:
+            self.reset()
+            self.capsule = capsule
+            self.cells = bytes(game.grid.cells)
+            self.work = self._search(game.grid.copy(), capsule, game.peek_next_colors())
+        if self.done:
+            return
+
+        start = time.perf_counter()
+        deadline = start + (self.budget if budget is None else budget)
+        try:
+            while time.perf_counter() < deadline:
+                next(self.work)
+        except StopIteration:
+            self.done = True
+        self.work_time += time.perf_counter() - start
+
+    def hint_cells(self):
+        """[(x, y, color)] of the hinted placement, or [] if there is none yet."""
+        if self.hint is None:
+            return []
+        ax, ay, bx, by = self.hint
+        a, b = self.capsule.blocks
+        return [(ax, ay, a.color), (bx, by, b.color)]
+
+    # --------------------------------------------------------
+    # The search, as a generator
+    # --------------------------------------------------------
+    def _search(self, grid, capsule, next_colors):
+        bot = self.bot
+        colors = (capsule.blocks[0].color, capsule.blocks[1].color)
+        resting = []
+        yield from search_steps(grid, capsule_state(capsule), resting, {capsule_state(capsule): None})
+
+        # Depth 1: each spot on its own
+        key = bot.layout(grid).encode(grid.cells)
+        ranked = []
+        for state in resting:
+            score = bot.evaluate(grid, key, state, colors)
+            ranked.append((score, state))
+            if self.score is None or score > self.score:
+                self.hint, self.score = state, score
+            yield
+        self.depth = 1
+        if next_colors is None:
+            return
+
+        # Depth 2: best first, each spot plus the next capsule's best reply
+        ranked.sort(reverse=True)
+        best = None
+        for _, state in ranked:
+            after, gain = self._place(grid, state, colors)
+            yield
+            reply, reply_score = yield from self._best_reply(after, next_colors)
+            if reply is None:
+                continue
+            total = gain + reply_score
+            if best is None or total > best:
+                best = total
+                self.hint, self.follow_up, self.score = state, reply, total
+                self.depth = 2
+
+    def _place(self, grid, state, colors):
+        """Board after locking colors at state, and the bot's credit for what it cleared."""
+        ax, ay, bx, by = state
+        sim = grid.copy()
+        sim.add_block(Block(ax, ay, colors[0]))
+        sim.add_block(Block(bx, by, colors[1]))
+        removed = 0
+        while True:
+            count = sim.remove_matches()
+            if not count:
+                break
+            removed += count
+            sim.apply_gravity()
+        gain = (self.bot.VIRUS_CLEARED * (grid.virus_count - sim.virus_count)
+                + self.bot.REMOVED * removed)
+        return sim, gain
+
+    def _best_reply(self, grid, colors):
+        width = grid.width
+        spawn = Capsule(width // 2 - 1, 0, width, grid.height, colors=colors)
+        start = capsule_state(spawn)
+        if not (grid.is_free(start[0], start[1]) and grid.is_free(start[2], start[3])):
+            return None, None
+        resting = []
+        yield from search_steps(grid, start, resting, {start: None})
+        key = self.bot.layout(grid).encode(grid.cells)
+        best = best_score = None
+        for state in resting:
+            score = self.bot.evaluate(grid, key, state, colors)
+            if best_score is None or score > best_score:
+                best, best_score = state, score
+            yield
+        return best, best_score
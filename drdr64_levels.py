@@ -0,0 +1,221 @@
+"""
+Offline Dr. Mario level bank.
+
+Virus layouts are generated from seeds with the same placement rules as
+DrMarioGame.start_level(), then rated by simulated play: PlacementBot
+clears each layout with a few different capsule sequences, placing
+capsules directly (no per-frame stepping), and the difficulty is the
+mean number of capsules it needed (a top-out counts as max_capsules).
+Generation and rating are spread over a process pool.
+
+The bank file is a fixed header, a level table, then fixed-size records
+sorted by difficulty within each level:
+
+    header  magic "DRLB", version u8, width u8, height u8, levels u8
+    table   per level: level u8, first record u32, count u32
+    record  seed u64, difficulty f32, viruses u8, cells (width * height)
+
+LevelBank memory-maps the file, so opening it is instant whatever its
+size, and pick() finds a layout at a target difficulty percentile in
+O(1). Set game.level_bank to use it from start_level(); replays of such
+games need the same bank to play back.
+
+    python drdr64_levels.py build FILE [PER_LEVEL] [WORKERS]
+    python drdr64_levels.py info FILE
+"""
+import mmap
+import multiprocessing
+import struct
+import sys
+import time
+
+from drdr64_core import (
+    GRID_WIDTH, GRID_HEIGHT, MAX_LEVEL,
+    GameRng, Block, Capsule, DrMarioGame,
+)
+from drdr64_ai import PlacementBot
+
+MAGIC = b"DRLB"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBB")
+LEVEL_ENTRY = struct.Struct("<BII")
+RECORD_HEADER = struct.Struct("<QfB")
+
+RATING_TRIALS = 2
+CAPSULES_PER_VIRUS = 15  # rating gives up (and scores a loss) after this many per virus
+PICK_SPREAD = 0.05  # pick() varies the layout within +-5% of the bank around the target
+
+# --------------------------------------------------------
+# Generation & Rating (run in worker processes)
+# --------------------------------------------------------
+def generate_layout(seed, level, width=GRID_WIDTH, height=GRID_HEIGHT):
+    """(virus_count, cells) for one seeded layout, exactly as start_level() builds it."""
+    game = DrMarioGame(grid_width=width, grid_height=height, seed=seed)
+    game.start_level(level)
+    return game.grid.virus_count, bytes(game.grid.cells)
+
+def play_placements(grid, bot, rng, max_capsules):
+    """Let the bot clear grid in place; returns capsules used, or None on top-out."""
+    width = grid.width
+    for used in range(1, max_capsules + 1):
+        capsule = Capsule(width // 2 - 1, 0, width, grid.height, rng)
+        if any(not grid.is_free(block.x, block.y) for block in capsule.blocks):
+            return None
+        (ax, ay, bx, by), _ = bot.choose(grid, capsule)
+        grid.add_block(Block(ax, ay, capsule.blocks[0].color))
+        grid.add_block(Block(bx, by, capsule.blocks[1].color))
+        while grid.remove_matches():
+            grid.apply_gravity()
+        if grid.virus_count <= 0:
+            return used
+    return None
+
+def rate_layout(virus_count, cells, seed, width=GRID_WIDTH, height=GRID_HEIGHT,
+                trials=RATING_TRIALS, bot=None):
+    """Mean capsules the bot needs to clear the layout over a few capsule sequences."""
+    bot = bot if bot is not None else PlacementBot()
+    max_capsules = CAPSULES_PER_VIRUS * virus_count
+    total = 0
+    for trial in range(trials):
+        game = DrMarioGame(grid_width=width, grid_height=height)
+        grid = game.grid
+        grid.cells[:] = cells
+        grid.virus_count = virus_count
+        grid.mark_all_dirty()
+        used = play_placements(grid, bot, GameRng(seed * trials + trial + 1), max_capsules)
+        total += used if used is not None else max_capsules
+    return total / trials
+
+_worker_bot = None
+
+def _rate_task(task):
+    global _worker_bot
+    if _worker_bot is None:
+        # One bot (and transposition table) per worker process
+        _worker_bot = PlacementBot()
+    level, seed, width, height, trials = task
+    virus_count, cells = generate_layout(seed, level, width, height)
+    difficulty = rate_layout(virus_count, cells, seed, width, height, trials, _worker_bot)
+    return level, seed, difficulty, virus_count, cells
+
+# --------------------------------------------------------
+# Building the Bank
+# --------------------------------------------------------
+def build_bank(path, per_level=1000, levels=None, width=GRID_WIDTH, height=GRID_HEIGHT,
+               first_seed=0, trials=RATING_TRIALS, workers=None, on_progress=None):
+    """
+    Generate and rate per_level layouts for each level across a process
+    pool (workers=1 runs in-process) and write the bank to path.
+    on_progress(done, total) is called as ratings come in.
+    """
+    levels = list(levels) if levels is not None else list(range(1, MAX_LEVEL + 1))
+    workers = workers or multiprocessing.cpu_count()
+    tasks = [(level, first_seed + i, width, height, trials)
+             for level in levels for i in range(per_level)]
+    rated = {level: [] for level in levels}
+
+    def collect(results):
+        for done, (level, seed, difficulty, virus_count, cells) in enumerate(results, 1):
+            rated[level].append((difficulty, seed, virus_count, cells))
+            if on_progress is not None:
+                on_progress(done, len(tasks))
+
+    if workers == 1:
+        collect(map(_rate_task, tasks))
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            collect(pool.imap_unordered(_rate_task, tasks, chunksize=8))
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, width, height, len(levels)))
+        first = 0
+        for level in levels:
+            f.write(LEVEL_ENTRY.pack(level, first, len(rated[level])))
+            first += len(rated[level])
+        for level in levels:
+            for difficulty, seed, virus_count, cells in sorted(rated[level]):
+                f.write(RECORD_HEADER.pack(seed, difficulty, virus_count))
+                f.write(cells)
+
+# --------------------------------------------------------
+# Reading the Bank
+# --------------------------------------------------------
+class LevelBank:
+    """A memory-mapped bank file; records are read straight out of the map."""
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.width, self.height, n_levels = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a level bank")
+        if version != VERSION:
+            raise ValueError(f"unsupported level bank version {version}")
+        self.cell_count = self.width * self.height
+        self.record_size = RECORD_HEADER.size + self.cell_count
+        records_start = HEADER.size + n_levels * LEVEL_ENTRY.size
+        self.levels = {}
+        for i in range(n_levels):
+            level, first, count = LEVEL_ENTRY.unpack_from(self.map, HEADER.size + i * LEVEL_ENTRY.size)
+            self.levels[level] = (records_start + first * self.record_size, count)
+
+    def close(self):
+        self.map.close()
+
+    def count(self, level):
+        return self.levels.get(level, (0, 0))[1]
+
+    def record(self, level, index):
+        """
+        (seed, difficulty, virus_count, cells) of the index-th easiest
+        layout. cells is a bytes copy, so it outlives close().
+        """
+        start, count = self.levels[level]
+        if not 0 <= index < count:
+            raise IndexError(f"level {level} has {count} layouts")
+        offset = start + index * self.record_size
+        seed, difficulty, virus_count = RECORD_HEADER.unpack_from(self.map, offset)
+        cells_start = offset + RECORD_HEADER.size
+        return seed, difficulty, virus_count, self.map[cells_start:cells_start + self.cell_count]
+
+    def pick(self, level, target, rng=None, width=GRID_WIDTH, height=GRID_HEIGHT):
+        """
+        (virus_count, cells) of a layout near the target difficulty
+        percentile (0 easiest .. 1 hardest), varied a little with rng.
+        None if the bank has no layouts for this level or board size.
+        """
+        if (width, height) != (self.width, self.height) or not self.count(level):
+            return None
+        count = self.count(level)
+        index = round(min(1.0, max(0.0, target)) * (count - 1))
+        if rng is not None:
+            spread = int(count * PICK_SPREAD)
+            if spread:
+                index += rng.randrange(2 * spread + 1) - spread
+        index = min(count - 1, max(0, index))
+        _, _, virus_count, cells = self.record(level, index)
+        return virus_count, cells
+
+    def difficulties(self, level):
+        return [self.record(level, i)[1] for i in range(self.count(level))]
+
+def _print_progress(done, total):
+    if done % 100 == 0 or done == total:
+        print(f"  rated {done}/{total}", flush=True)
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if len(args) >= 2 and args[0] == "build":
+        per_level = int(args[2]) if len(args) > 2 else 1000
+        workers = int(args[3]) if len(args) > 3 else None
+        start = time.perf_counter()
+        build_bank(args[1], per_level, workers=workers, on_progress=_print_progress)
+        print(f"built {args[1]} in {time.perf_counter() - start:.1f}s")
+    elif len(args) >= 2 and args[0] == "info":
+        bank = LevelBank(args[1])
+        for level in sorted(bank.levels):
+            ratings = bank.difficulties(level)
+            print(f"level {level}: {len(ratings)} layouts, capsules to clear "
+                  f"min {ratings[0]:.1f} / median {ratings[len(ratings) // 2]:.1f} / "
+                  f"max {ratings[-1]:.1f}")
+    else:
+        print(__doc__)
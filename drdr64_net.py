@@ -0,0 +1,456 @@
+"""
+Networked Dr. Mario versus over asyncio.
+
+One DrMarioServer process hosts any number of matches; each match is a
+drdr64_core.VersusMatch run by its own task. Clients send their held
+ACTION_* bits for every frame and get back per-frame deltas: only the
+cells that changed, plus the capsule, score and status when those
+changed, for each board. A quiet frame costs 7 bytes on the wire.
+
+Wire format: every message is a u16 length followed by the payload,
+whose first byte is the message type.
+
+    HELLO   c->s  match_id u32
+    INPUT   c->s  frame u32, actions u8
+    WELCOME s->c  player u8, width u8, height u8
+    FRAME   s->c  frame u32, then per changed board:
+                  board u8, mask u8,
+                  [count u16, (cell u16, value u8) * count]   if DELTA_CELLS
+                  [ax, ay, ac, bx, by, bc as i8]              if DELTA_CAPSULE
+                  [score i32]                                 if DELTA_SCORE
+                  [level u8, viruses u16, running u8]         if DELTA_STATUS
+    END     s->c  winner u8, message utf-8
+
+In lockstep mode (the default, used by tests) a frame is simulated once
+both inputs for it have arrived; otherwise the server ticks at FPS and
+reuses a player's last input if the next one is late. A third client
+for a match gets END straight away, and a player who disconnects
+forfeits the match.
+
+    python drdr64_net.py [MATCHES] [FRAMES]   # loopback measurement
+"""
+import asyncio
+import random
+import struct
+import sys
+import time
+
+from drdr64_core import (
+    FPS, ACTION_NONE, ACTION_LEFT, ACTION_RIGHT, ACTION_DOWN, ACTION_ROTATE,
+    DrMarioGame, VersusMatch, Grid, Capsule,
+)
+
+MSG_HELLO   = 1
+MSG_INPUT   = 2
+MSG_WELCOME = 3
+MSG_FRAME   = 4
+MSG_END     = 5
+
+DELTA_CELLS   = 1
+DELTA_CAPSULE = 2
+DELTA_SCORE   = 4
+DELTA_STATUS  = 8
+
+LENGTH = struct.Struct("<H")
+HELLO = struct.Struct("<BI")
+INPUT = struct.Struct("<BIB")
+WELCOME = struct.Struct("<BBBB")
+FRAME = struct.Struct("<BI")
+BOARD = struct.Struct("<BB")
+COUNT = struct.Struct("<H")
+CELL = struct.Struct("<HB")
+CAPSULE = struct.Struct("<6b")
+SCORE = struct.Struct("<i")
+STATUS = struct.Struct("<BHB")
+END = struct.Struct("<BB")
+
+def _message(payload):
+    return LENGTH.pack(len(payload)) + payload
+
+async def _read_message(reader):
+    header = await reader.readexactly(LENGTH.size)
+    return await reader.readexactly(LENGTH.unpack(header)[0])
+
+# --------------------------------------------------------
+# Delta Encoding
+# --------------------------------------------------------
+def _capsule_tuple(game):
+    capsule = game.capsule
+    if capsule is None or capsule.locked:
+        return (-1, -1, 0, -1, -1, 0)
+    a, b = capsule.blocks
+    return (a.x, a.y, a.color, b.x, b.y, b.color)
+
+class BoardEncoder:
+    """Remembers what the clients last saw of one board and encodes the changes."""
+    def __init__(self, index, game):
+        self.index = index
+        self.game = game
+        self.cells = bytearray(game.grid_width * game.grid_height)
+        self.capsule = None
+        self.score = None
+        self.status = None
+
+    def encode(self):
+        game = self.game
+        mask = 0
+        parts = []
+
+        cells = game.grid.cells
+        if cells != self.cells:
+            seen = self.cells
+            changed = [i for i in range(len(cells)) if cells[i] != seen[i]]
+            parts.append(COUNT.pack(len(changed)))
+            parts.extend(CELL.pack(i, cells[i]) for i in changed)
+            self.cells = bytearray(cells)
+            mask |= DELTA_CELLS
+
+        capsule = _capsule_tuple(game)
+        if capsule != self.capsule:
+            parts.append(CAPSULE.pack(*capsule))
+            self.capsule = capsule
+            mask |= DELTA_CAPSULE
+
+        if game.score != self.score:
+            parts.append(SCORE.pack(game.score))
+            self.score = game.score
+            mask |= DELTA_SCORE
+
+        status = (game.level, game.grid.virus_count, game.running)
+        if status != self.status:
+            parts.append(STATUS.pack(*status))
+            self.status = status
+            mask |= DELTA_STATUS
+
+        if not mask:
+            return b""
+        return BOARD.pack(self.index, mask) + b"".join(parts)
+
+class RemoteBoard:
+    """A client's mirror of one board, rebuilt from FRAME deltas."""
+    def __init__(self, width, height):
+        self.grid = Grid(width, height)
+        self.capsule = None
+        self.score = 0
+        self.level = 0
+        self.running = True
+
+    def apply(self, data, offset, mask):
+        if mask & DELTA_CELLS:
+            (count,) = COUNT.unpack_from(data, offset)
+            offset += COUNT.size
+            cells = self.grid.cells
+            for _ in range(count):
+                i, value = CELL.unpack_from(data, offset)
+                cells[i] = value
+                offset += CELL.size
+        if mask & DELTA_CAPSULE:
+            ax, ay, ac, bx, by, bc = CAPSULE.unpack_from(data, offset)
+            offset += CAPSULE.size
+            if ax < 0:
+                self.capsule = None
+            else:
+                self.capsule = Capsule(ax, ay, self.grid.width, self.grid.height, colors=(ac, bc))
+                b = self.capsule.blocks[1]
+                b.x, b.y = bx, by
+        if mask & DELTA_SCORE:
+            (self.score,) = SCORE.unpack_from(data, offset)
+            offset += SCORE.size
+        if mask & DELTA_STATUS:
+            self.level, self.grid.virus_count, running = STATUS.unpack_from(data, offset)
+            self.running = bool(running)
+            offset += STATUS.size
+        return offset
+
+# --------------------------------------------------------
+# Server
+# --------------------------------------------------------
+class NetMatch:
+    def __init__(self, match_id, seed, level=1, max_frames=None):
+        self.match_id = match_id
+        self.players = [DrMarioGame(player_name=f"Player {i + 1}", seed=seed) for i in range(2)]
+        self.match = VersusMatch(*self.players)
+        self.level = level
+        self.max_frames = max_frames
+        self.encoders = [BoardEncoder(i, game) for i, game in enumerate(self.players)]
+        self.writers = []
+        self.inputs = [asyncio.Queue(), asyncio.Queue()]
+        self.last_input = [0, 0]
+        self.bytes_sent = 0
+        self.cpu_seconds = 0.0
+        self.task = None
+        self.forfeit = None  # 1-based board number of a player who disconnected
+        self.done = False
+
+    def join(self, writer):
+        """The new player's index, or None if the match already has both players."""
+        if len(self.writers) >= len(self.players):
+            return None
+        self.writers.append(writer)
+        return len(self.writers) - 1
+
+    def leave(self, player):
+        """Forfeit for a disconnected player, waking run() if it waits on their input."""
+        if self.done or self.forfeit is not None:
+            return
+        self.forfeit = player + 1
+        self.inputs[player].put_nowait(None)
+
+    def broadcast(self, data):
+        for writer in self.writers:
+            writer.write(data)
+        self.bytes_sent += len(data) * len(self.writers)
+
+    async def next_inputs(self, frame, timeout):
+        """
+        Both players' actions for frame, or None once one has left. Inputs
+        already queued are always used; with a timeout, both players share
+        one deadline, and a player still late then keeps their last input.
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        actions = []
+        for player, queue in enumerate(self.inputs):
+            value = self.last_input[player]
+            while self.forfeit is None:
+                if not queue.empty():
+                    item = queue.get_nowait()
+                elif deadline is None:
+                    item = await queue.get()
+                else:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    continue  # leave(): the loop ends on self.forfeit
+                input_frame, value = item
+                if input_frame >= frame:
+                    break
+            if self.forfeit is not None:
+                return None
+            self.last_input[player] = value
+            actions.append(value)
+        return actions
+
+    async def run(self, lockstep=True):
+        self.match.start(self.level)
+        width, height = self.players[0].grid_width, self.players[0].grid_height
+        for player, writer in enumerate(self.writers):
+            writer.write(_message(WELCOME.pack(MSG_WELCOME, player, width, height)))
+        self.send_frame(0)
+
+        frame_time = 1.0 / FPS
+        next_tick = time.perf_counter()
+        frame = 0
+        while not self.match.is_over() and (self.max_frames is None or frame < self.max_frames):
+            if lockstep:
+                actions = await self.next_inputs(frame, None)
+            else:
+                next_tick += frame_time
+                actions = await self.next_inputs(frame, max(0.0, next_tick - time.perf_counter()))
+                await asyncio.sleep(max(0.0, next_tick - time.perf_counter()))
+            if actions is None:
+                break
+            start = time.process_time()
+            self.match.step(*actions)
+            frame += 1
+            self.send_frame(frame)
+            self.cpu_seconds += time.process_time() - start
+            await self._drain()
+
+        self.done = True
+        if self.forfeit is not None:
+            winner = 2 if self.forfeit == 1 else 1
+            message = f"Player {winner} Wins (P{self.forfeit} Disconnected)!"
+        elif self.match.is_over():
+            winner, message = self.match.result()
+        else:
+            winner, message = 0, "Time limit"
+        self.broadcast(_message(END.pack(MSG_END, winner) + message.encode()))
+        await self._drain()
+        for writer in self.writers:
+            writer.close()
+
+    async def _drain(self):
+        for writer in self.writers:
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass  # that player has gone; handle_client calls leave()
+
+    def send_frame(self, frame):
+        body = b"".join(encoder.encode() for encoder in self.encoders)
+        self.broadcast(_message(FRAME.pack(MSG_FRAME, frame) + body))
+
+class DrMarioServer:
+    """Pairs up clients by match id and runs every match as its own task."""
+    def __init__(self, lockstep=True, level=1, max_frames=None):
+        self.lockstep = lockstep
+        self.level = level
+        self.max_frames = max_frames
+        self.matches = {}
+        self.finished = []
+        self.server = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        self.server = await asyncio.start_server(self.handle_client, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle_client(self, reader, writer):
+        match = player = None
+        try:
+            hello = await _read_message(reader)
+            _, match_id = HELLO.unpack(hello)
+            match = self.matches.get(match_id)
+            if match is None:
+                match = self.matches[match_id] = NetMatch(match_id, seed=match_id,
+                                                          level=self.level,
+                                                          max_frames=self.max_frames)
+            player = match.join(writer)
+            if player is None:
+                writer.write(_message(END.pack(MSG_END, 0) + b"Match is full"))
+                await writer.drain()
+                writer.close()
+                return
+            if player == 1:
+                match.task = asyncio.create_task(self._run_match(match))
+            while True:
+                data = await _read_message(reader)
+                if data[0] == MSG_INPUT:
+                    _, frame, actions = INPUT.unpack(data)
+                    match.inputs[player].put_nowait((frame, actions))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if player is not None:
+                self._leave(match, player)
+
+    def _leave(self, match, player):
+        if match.task is None:
+            # Nobody else joined yet: drop the match rather than wait for them
+            if self.matches.get(match.match_id) is match:
+                del self.matches[match.match_id]
+        else:
+            match.leave(player)
+
+    async def _run_match(self, match):
+        try:
+            await match.run(self.lockstep)
+        finally:
+            if self.matches.get(match.match_id) is match:
+                del self.matches[match.match_id]
+            self.finished.append(match)
+
+# --------------------------------------------------------
+# Client
+# --------------------------------------------------------
+class DrMarioClient:
+    """
+    Connects to a match, sends policy(frame, client) every frame and
+    mirrors both boards from the server's deltas.
+    """
+    def __init__(self, match_id, policy):
+        self.match_id = match_id
+        self.policy = policy
+        self.player = None
+        self.boards = []
+        self.frame = 0
+        self.bytes_received = 0
+        self.result = None
+
+    async def play(self, host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(_message(HELLO.pack(MSG_HELLO, self.match_id)))
+        try:
+            while True:
+                data = await _read_message(reader)
+                self.bytes_received += len(data) + LENGTH.size
+                kind = data[0]
+                if kind == MSG_WELCOME:
+                    _, self.player, width, height = WELCOME.unpack(data)
+                    self.boards = [RemoteBoard(width, height), RemoteBoard(width, height)]
+                elif kind == MSG_FRAME:
+                    self.apply_frame(data)
+                    actions = self.policy(self.frame, self)
+                    writer.write(_message(INPUT.pack(MSG_INPUT, self.frame, actions)))
+                elif kind == MSG_END:
+                    winner, = data[1:2]
+                    self.result = (winner, data[2:].decode())
+                    break
+        finally:
+            writer.close()
+
+    def apply_frame(self, data):
+        _, self.frame = FRAME.unpack_from(data)
+        offset = FRAME.size
+        while offset < len(data):
+            board, mask = BOARD.unpack_from(data, offset)
+            offset = self.boards[board].apply(data, offset + BOARD.size, mask)
+
+# --------------------------------------------------------
+# Loopback Harness
+# --------------------------------------------------------
+def scripted_policy(seed):
+    """
+    Deterministic test player that presses something every few frames
+    and otherwise lets the capsule fall, roughly like a person would.
+    """
+    rng = random.Random(seed)
+    moves = (ACTION_LEFT, ACTION_RIGHT, ACTION_ROTATE, ACTION_DOWN)
+    def policy(frame, client):
+        return rng.choice(moves) if rng.random() < 0.25 else ACTION_NONE
+    return policy
+
+async def run_loopback(n_matches=50, max_frames=3000, lockstep=True):
+    """
+    Host n_matches on a loopback server with scripted clients, check
+    every client mirror against the server's boards, and return stats.
+    """
+    server = DrMarioServer(lockstep=lockstep, max_frames=max_frames)
+    port = await server.start()
+    clients = [DrMarioClient(match_id, scripted_policy(match_id * 2 + side))
+               for match_id in range(n_matches) for side in range(2)]
+    start = time.perf_counter()
+    await asyncio.gather(*(client.play("127.0.0.1", port) for client in clients))
+    elapsed = time.perf_counter() - start
+    await server.close()
+
+    matches = {match.match_id: match for match in server.finished}
+    for client in clients:
+        match = matches[client.match_id]
+        for mirror, game in zip(client.boards, match.players):
+            assert mirror.grid.cells == game.grid.cells, "client board out of sync"
+            assert mirror.score == game.score and mirror.grid.virus_count == game.grid.virus_count
+
+    frames = sum(m.match.frame for m in server.finished)
+    sent = sum(m.bytes_sent for m in server.finished)
+    cpu = sum(m.cpu_seconds for m in server.finished)
+    # Sending full snapshots instead: both boards of a match to both clients
+    boards = server.finished[0].players if server.finished else []
+    full_state = 2 * sum(len(board.snapshot()) for board in boards)
+    return {
+        "matches": len(server.finished),
+        "frames": frames,
+        "bytes_per_frame": sent / max(1, frames),
+        "full_state_bytes": full_state,
+        "cpu_us_per_match_frame": cpu / max(1, frames) * 1e6,
+        "elapsed": elapsed,
+    }
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    stats = asyncio.run(run_loopback(int(args[0]) if args else 50,
+                                     int(args[1]) if len(args) > 1 else 3000))
+    print(f"{stats['matches']} matches, {stats['frames']} frames in {stats['elapsed']:.2f}s, "
+          f"all client mirrors in sync")
+    print(f"  {stats['bytes_per_frame']:.1f} bytes/frame sent per match "
+          f"to both clients (full snapshots would be {stats['full_state_bytes']})")
+    print(f"  server CPU {stats['cpu_us_per_match_frame']:.1f}us per match-frame "
+          f"({stats['cpu_us_per_match_frame'] * FPS / 1e4:.3f}% of a core per match at {FPS} FPS)")
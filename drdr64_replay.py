@@ -0,0 +1,133 @@
+"""
+Deterministic Dr. Mario replays.
+
+A game is fully determined by its starting state (which includes the
+GameRng state) and the ACTION_* byte fed to it on every frame, so a
+Replay stores just that: one input byte per frame plus a snapshot every
+snapshot_interval frames. Saved files zlib-compress both, which shrinks
+held-key runs to almost nothing. ReplayPlayer can play back as fast as
+the engine steps, and seek() restores the nearest earlier snapshot and
+re-simulates at most snapshot_interval - 1 frames, so jumping anywhere
+costs the same no matter how long the game is.
+"""
+import struct
+import zlib
+
+from drdr64_core import DrMarioGame
+
+SNAPSHOT_INTERVAL = 600  # every 10 seconds at 60 FPS
+
+# --------------------------------------------------------
+# Replay Data
+# --------------------------------------------------------
+class Replay:
+    MAGIC = b"DRRP"
+    VERSION = 1
+    HEADER = struct.Struct("<4sBHHIII")  # magic, version, w, h, interval, frames, snapshots
+
+    def __init__(self, grid_width, grid_height, snapshot_interval=SNAPSHOT_INTERVAL):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.snapshot_interval = snapshot_interval
+        self.inputs = bytearray()
+        self.snapshots = []
+
+    @property
+    def frames(self):
+        return len(self.inputs)
+
+    def to_bytes(self):
+        snapshots = b"".join(struct.pack("<I", len(s)) + s for s in self.snapshots)
+        body = zlib.compress(bytes(self.inputs) + snapshots, 9)
+        return self.HEADER.pack(self.MAGIC, self.VERSION, self.grid_width, self.grid_height,
+                                self.snapshot_interval, len(self.inputs),
+                                len(self.snapshots)) + body
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, width, height, interval, frames, count = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError("not a Dr. Mario replay (or an unsupported version)")
+        if not count:
+            raise ValueError("replay has no starting snapshot")
+        body = zlib.decompress(data[cls.HEADER.size:])
+        replay = cls(width, height, interval)
+        replay.inputs = bytearray(body[:frames])
+        offset = frames
+        for _ in range(count):
+            (size,) = struct.unpack_from("<I", body, offset)
+            offset += 4
+            replay.snapshots.append(body[offset:offset + size])
+            offset += size
+        return replay
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+# --------------------------------------------------------
+# Recording
+# --------------------------------------------------------
+class ReplayRecorder:
+    """
+    Wraps a started game: call step(actions) instead of game.step(),
+    or record(actions) right before something else steps it.
+    The first snapshot is taken here, so start the level before
+    recording; even a replay saved before the first step can be played.
+    """
+    def __init__(self, game, snapshot_interval=SNAPSHOT_INTERVAL):
+        self.game = game
+        self.replay = Replay(game.grid_width, game.grid_height, snapshot_interval)
+        self.replay.snapshots.append(game.snapshot())
+
+    def record(self, actions):
+        """Log this frame's input without stepping (when something else steps the game)."""
+        replay = self.replay
+        if replay.inputs and len(replay.inputs) % replay.snapshot_interval == 0:
+            replay.snapshots.append(self.game.snapshot())
+        replay.inputs.append(actions)
+
+    def step(self, actions):
+        self.record(actions)
+        self.game.step(actions)
+
+# --------------------------------------------------------
+# Playback
+# --------------------------------------------------------
+class ReplayPlayer:
+    """Steps a game through a Replay; frame is the number of inputs applied."""
+    def __init__(self, replay, game=None):
+        self.replay = replay
+        self.game = game if game is not None else DrMarioGame(replay.grid_width, replay.grid_height)
+        self.frame = 0
+        self.seek(0)
+
+    def seek(self, frame):
+        replay = self.replay
+        frame = max(0, min(frame, replay.frames))
+        index = min(frame // replay.snapshot_interval, len(replay.snapshots) - 1)
+        self.game.restore(replay.snapshots[index])
+        self.frame = index * replay.snapshot_interval
+        while self.frame < frame:
+            self.step()
+
+    def step(self):
+        """Apply the next recorded input; False once the replay is over."""
+        if self.frame >= self.replay.frames:
+            return False
+        self.game.step(self.replay.inputs[self.frame])
+        self.frame += 1
+        return True
+
+    def at_end(self):
+        return self.frame >= self.replay.frames
+
+    def play_to_end(self):
+        while self.step():
+            pass
+        return self.game
@@ -0,0 +1,62 @@
+"""
+Time rewind for Dr. Mario.
+
+RewindBuffer keeps the last few seconds of one DrMarioGame as a ring of
+fixed-size snapshot slots inside a single preallocated bytearray. Each
+capture() writes the game's snapshot (see DrMarioGame.snapshot_into) over
+the oldest slot, so recording every tick allocates nothing; rewind()
+restores a slot in place. Practice-mode undo in DRDR64.py and debugging
+tools build on it.
+"""
+from drdr64_core import TICK_RATE
+
+REWIND_SECONDS = 10
+
+class RewindBuffer:
+    def __init__(self, game, seconds=REWIND_SECONDS, tick_rate=TICK_RATE):
+        self.game = game
+        self.capacity = max(1, int(seconds * tick_rate))
+        self.slot_size = game.snapshot_size()
+        self.buffer = bytearray(self.capacity * self.slot_size)
+        self.view = memoryview(self.buffer)
+        self.head = 0   # slot the next capture goes into
+        self.count = 0  # slots holding a capture
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+    def capture(self):
+        """Store the game's current state, replacing the oldest if full."""
+        self.game.snapshot_into(self.buffer, self.head * self.slot_size)
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def _offset(self, back):
+        return ((self.head - 1 - back) % self.capacity) * self.slot_size
+
+    def peek(self, back=0):
+        """Snapshot bytes from `back` captures before the latest (0 = latest)."""
+        if not 0 <= back < self.count:
+            raise IndexError(f"only {self.count} captures stored")
+        offset = self._offset(back)
+        return self.view[offset:offset + self.slot_size]
+
+    def rewind(self, ticks=1):
+        """
+        Restore the state captured `ticks` captures before the latest and
+        forget everything newer. Returns how many ticks were actually
+        undone (fewer if the buffer doesn't reach that far back).
+        """
+        if not self.count:
+            return 0
+        ticks = max(0, min(ticks, self.count - 1))
+        self.game.restore(self.buffer, self._offset(ticks))
+        # The restored capture stays in the buffer as the new latest
+        self.head = (self.head - ticks) % self.capacity
+        self.count -= ticks
+        return ticks
@@ -0,0 +1,208 @@
+"""
+Gameplay telemetry for Dr. Mario.
+
+Set game.telemetry to an EventRing and DrMarioGame reports level starts,
+capsule locks (with how long the capsule was in play), chains (length,
+blocks removed, viruses cleared), level and game clears, and top-outs.
+With no ring set the engine only pays for one attribute check per event.
+
+EventRing is a preallocated bytearray of fixed 26-byte records written
+with struct.pack_into, so emitting allocates nothing. It has one
+producer (the game loop) and one consumer; if the consumer falls a full
+ring behind, the oldest events are overwritten and counted as dropped.
+TelemetryWriter is that consumer: a background thread that drains the
+ring every `interval` seconds into a binary file (a header, then the raw
+records) or JSONL.
+
+    python drdr64_telemetry.py GAMES FILE.bin|FILE.jsonl   # record a batch, then summarize
+"""
+import json
+import statistics
+import struct
+import sys
+import threading
+import time
+
+from drdr64_core import (
+    EVENT_LEVEL_START, EVENT_LOCK, EVENT_CHAIN,
+    EVENT_LEVEL_CLEAR, EVENT_GAME_CLEAR, EVENT_TOP_OUT,
+    run_batch,
+)
+
+RECORD = struct.Struct("<BQIBiii")  # kind, game (a 64-bit seed), frame, level, a, b, c
+FILE_MAGIC = b"DRTL"
+FILE_VERSION = 2
+FILE_HEADER = struct.Struct("<4sBB")  # magic, version, record size
+RING_CAPACITY = 1 << 16
+
+EVENT_NAMES = {
+    EVENT_LEVEL_START: "level_start",
+    EVENT_LOCK: "lock",
+    EVENT_CHAIN: "chain",
+    EVENT_LEVEL_CLEAR: "level_clear",
+    EVENT_GAME_CLEAR: "game_clear",
+    EVENT_TOP_OUT: "top_out",
+}
+# Names of the a, b, c fields per kind, for JSONL
+EVENT_FIELDS = {
+    EVENT_LEVEL_START: ("viruses",),
+    EVENT_LOCK: ("ticks", "x", "y"),
+    EVENT_CHAIN: ("length", "removed", "viruses_cleared"),
+    EVENT_LEVEL_CLEAR: ("score",),
+    EVENT_GAME_CLEAR: ("score",),
+    EVENT_TOP_OUT: ("score", "viruses_left"),
+}
+
+# --------------------------------------------------------
+# Ring Buffer
+# --------------------------------------------------------
+class EventRing:
+    def __init__(self, capacity=RING_CAPACITY):
+        self.capacity = capacity
+        self.buffer = bytearray(capacity * RECORD.size)
+        self.written = 0  # events ever emitted; only the producer changes it
+        self.read = 0     # events ever consumed; only the consumer changes it
+        self.dropped = 0
+
+    def emit(self, kind, game, frame, level, a, b, c):
+        RECORD.pack_into(self.buffer, (self.written % self.capacity) * RECORD.size,
+                         kind, game, frame, level, a, b, c)
+        self.written += 1
+
+    def drain(self):
+        """Copy out every unread event as raw records (a bytes object)."""
+        written = self.written
+        start = self.read
+        if written - start > self.capacity:
+            self.dropped += written - start - self.capacity
+            start = written - self.capacity
+        size = RECORD.size
+        first = (start % self.capacity) * size
+        last = (written % self.capacity) * size
+        if written == start:
+            data = b""
+        elif first < last:
+            data = bytes(self.buffer[first:last])
+        else:
+            data = bytes(self.buffer[first:]) + bytes(self.buffer[:last])
+        # Anything the producer lapped while we copied is unreliable
+        # (+1 for a record it may be packing right now)
+        lapped = self.written + 1 - self.capacity - start
+        if lapped > 0:
+            self.dropped += lapped
+            data = data[lapped * size:]
+        self.read = written
+        return data
+
+def iter_records(data):
+    """Decode raw records into (kind, game, frame, level, a, b, c) tuples."""
+    return RECORD.iter_unpack(data)
+
+def record_dict(record):
+    kind, game, frame, level, a, b, c = record
+    event = {"event": EVENT_NAMES.get(kind, kind), "game": game, "frame": frame, "level": level}
+    event.update(zip(EVENT_FIELDS.get(kind, ("a", "b", "c")), (a, b, c)))
+    return event
+
+# --------------------------------------------------------
+# Background Writer
+# --------------------------------------------------------
+class TelemetryWriter:
+    """Drains an EventRing to path on a daemon thread until close()."""
+    def __init__(self, ring, path, interval=0.05):
+        self.ring = ring
+        self.path = path
+        self.jsonl = path.endswith(".jsonl")
+        self.interval = interval
+        self.events = 0
+        self.file = open(path, "w" if self.jsonl else "wb")
+        if not self.jsonl:
+            self.file.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, RECORD.size))
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="telemetry-writer", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self.stop.wait(self.interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        data = self.ring.drain()
+        if not data:
+            return
+        self.events += len(data) // RECORD.size
+        if self.jsonl:
+            self.file.write("".join(json.dumps(record_dict(r)) + "\n" for r in iter_records(data)))
+        else:
+            self.file.write(data)
+
+    def close(self):
+        self.stop.set()
+        self.thread.join()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# --------------------------------------------------------
+# Reading & Analysis
+# --------------------------------------------------------
+def load_events(path):
+    """Every event in a telemetry file as a dict (either format)."""
+    if path.endswith(".jsonl"):
+        with open(path) as f:
+            return [json.loads(line) for line in f]
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, size = FILE_HEADER.unpack_from(data)
+    if magic != FILE_MAGIC:
+        raise ValueError(f"{path} is not a telemetry file")
+    if version != FILE_VERSION or size != RECORD.size:
+        raise ValueError(f"unsupported telemetry version {version}")
+    return [record_dict(r) for r in iter_records(data[FILE_HEADER.size:])]
+
+def summarize(events):
+    """Balance numbers across every game in an event list."""
+    games = {e["game"] for e in events}
+    by_kind = {}
+    for event in events:
+        by_kind.setdefault(event["event"], []).append(event)
+    chains = by_kind.get("chain", [])
+    locks = by_kind.get("lock", [])
+    lines = [f"{len(events)} events from {len(games)} games"]
+    if locks:
+        lines.append(f"  locks: {len(locks)}, capsule in play "
+                     f"mean {statistics.fmean(e['ticks'] for e in locks):.1f} ticks")
+    if chains:
+        lengths = {}
+        for e in chains:
+            lengths[e["length"]] = lengths.get(e["length"], 0) + 1
+        lines.append(f"  chains: {len(chains)} ({len(chains) / max(1, len(locks)):.1%} of locks), "
+                     f"lengths " + ", ".join(f"{k}x{v}" for k, v in sorted(lengths.items())))
+        lines.append(f"  viruses cleared: {sum(e['viruses_cleared'] for e in chains)}, "
+                     f"blocks removed: {sum(e['removed'] for e in chains)}")
+    for name in ("level_clear", "game_clear", "top_out"):
+        per_level = {}
+        for e in by_kind.get(name, []):
+            per_level[e["level"]] = per_level.get(e["level"], 0) + 1
+        if per_level:
+            lines.append(f"  {name} by level: " +
+                         ", ".join(f"L{k}: {v}" for k, v in sorted(per_level.items())))
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    n_games = int(args[0]) if args else 1000
+    path = args[1] if len(args) > 1 else "telemetry.bin"
+    ring = EventRing()
+    start = time.perf_counter()
+    with TelemetryWriter(ring, path) as writer:
+        run_batch(n_games, telemetry=ring)
+    elapsed = time.perf_counter() - start
+    print(f"{n_games} games, {writer.events} events to {path} in {elapsed:.2f}s "
+          f"({ring.dropped} dropped)")
+    print(summarize(load_events(path)))
@@ -0,0 +1,197 @@
+"""
+Headless Dr. Mario versus tournaments across every CPU core.
+
+    python drdr64_tournament.py MATCHES [WORKERS] [P1 P2]
+
+Each match is a drdr64_core.VersusMatch between two player specs
+("bot", "drop", or {"kind": "bot", "weights": {...}} to try different
+PlacementBot weights). Matches are seeded from (base_seed, index), so
+any single match can be replayed exactly. Each board gets its own seed
+derived from the match seed (board_seed()): with a shared seed, a
+mirror pairing such as "bot" vs "bot" would play the same game twice
+and always tie. Results are
+streamed back from the worker pool as matches finish and folded into a
+TournamentReport in the parent. With record=True each result also
+carries both players' drdr64_replay bytes.
+"""
+import multiprocessing
+import random
+import statistics
+import sys
+import time
+
+from drdr64_core import DrMarioGame, VersusMatch, drop_policy
+from drdr64_ai import BotController, PlacementBot
+from drdr64_replay import ReplayRecorder
+
+MAX_MATCH_FRAMES = 60 * 60 * 30  # 30 minutes of game time
+
+# --------------------------------------------------------
+# Players
+# --------------------------------------------------------
+class PolicyController:
+    """Adapts a drdr64_core policy function to the controller interface."""
+    def __init__(self, policy):
+        self.policy = policy
+
+    def actions(self, game):
+        return self.policy(game)
+
+def spec_label(spec):
+    if isinstance(spec, dict):
+        weights = ",".join(f"{k}={v}" for k, v in sorted(spec.get("weights", {}).items()))
+        return f"{spec['kind']}({weights})" if weights else spec["kind"]
+    return spec
+
+def make_controller(spec, seed):
+    kind = spec["kind"] if isinstance(spec, dict) else spec
+    if kind == "bot":
+        bot = PlacementBot()
+        for name, value in (spec.get("weights", {}) if isinstance(spec, dict) else {}).items():
+            setattr(bot, name, value)
+        return BotController(bot)
+    elif kind == "drop":
+        return PolicyController(drop_policy(random.Random(seed)))
+    raise ValueError(f"unknown player kind: {kind!r}")
+
+def match_seed(base_seed, index):
+    return base_seed * 1000003 + index
+
+def board_seed(seed, side):
+    """The seed of side 0 or 1's board in the match seeded with seed."""
+    return seed * 2 + side
+
+# --------------------------------------------------------
+# One Match (runs in a worker process)
+# --------------------------------------------------------
+def play_match(task):
+    """task = (index, seed, level, spec1, spec2, record) -> result dict."""
+    index, seed, level, spec1, spec2, record = task
+    start = time.perf_counter()
+    players = [DrMarioGame(initial_level=level, player_name=f"Player {side + 1}",
+                           seed=board_seed(seed, side))
+               for side in range(2)]
+    controls = [make_controller(spec1, seed * 2), make_controller(spec2, seed * 2 + 1)]
+    match = VersusMatch(*players)
+    match.start(level)
+    recorders = [ReplayRecorder(game) for game in players] if record else None
+    while not match.is_over() and match.frame < MAX_MATCH_FRAMES:
+        actions1 = controls[0].actions(players[0])
+        actions2 = controls[1].actions(players[1])
+        if recorders:
+            # Versus boards don't interact, so each side replays on its own
+            recorders[0].record(actions1)
+            recorders[1].record(actions2)
+        match.step(actions1, actions2)
+    winner, message = match.result() if match.is_over() else (0, "Time limit")
+    result = {
+        "index": index,
+        "seed": seed,
+        "winner": winner,
+        "message": message,
+        "frames": match.frame,
+        "seconds": time.perf_counter() - start,
+        "players": [
+            {
+                "label": spec_label(spec),
+                "seed": board_seed(seed, side),
+                "score": game.score,
+                "level": game.level,
+                "viruses_left": game.grid.virus_count,
+                "total_chains": game.total_chains,
+                "max_chain": game.max_chain,
+            }
+            for side, (spec, game) in enumerate(zip((spec1, spec2), players))
+        ],
+    }
+    if recorders:
+        result["replays"] = [r.replay.to_bytes() for r in recorders]
+    return result
+
+# --------------------------------------------------------
+# Aggregation
+# --------------------------------------------------------
+class TournamentReport:
+    """Running totals, fed one match result at a time."""
+    def __init__(self):
+        self.matches = 0
+        self.wins = [0, 0]
+        self.ties = 0
+        self.frames = []
+        self.seconds = []
+        self.chains = [[], []]
+        self.max_chain = [0, 0]
+        self.labels = [None, None]
+        self.started = time.perf_counter()
+
+    def add(self, result):
+        self.matches += 1
+        if result["winner"]:
+            self.wins[result["winner"] - 1] += 1
+        else:
+            self.ties += 1
+        self.frames.append(result["frames"])
+        self.seconds.append(result["seconds"])
+        for side, player in enumerate(result["players"]):
+            self.labels[side] = player["label"]
+            self.chains[side].append(player["total_chains"])
+            self.max_chain[side] = max(self.max_chain[side], player["max_chain"])
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        lines = [f"{self.matches} matches in {elapsed:.2f}s "
+                 f"({self.matches / elapsed:.2f} matches/s)"]
+        for side in range(2):
+            lines.append(
+                f"  P{side + 1} {self.labels[side]}: {self.wins[side]} wins "
+                f"({self.wins[side] / max(1, self.matches):.1%}), "
+                f"chains/match {statistics.fmean(self.chains[side] or [0]):.1f}, "
+                f"best chain {self.max_chain[side]}")
+        lines.append(f"  ties: {self.ties}")
+        if self.frames:
+            frames = sorted(self.frames)
+            lines.append(
+                f"  duration: mean {statistics.fmean(frames):.0f} frames, "
+                f"p50 {frames[len(frames) // 2]}, p95 {frames[int(len(frames) * 0.95)]}, "
+                f"mean wall {statistics.fmean(self.seconds) * 1000:.1f}ms/match")
+        return "\n".join(lines)
+
+# --------------------------------------------------------
+# Runner
+# --------------------------------------------------------
+def run_tournament(n_matches, spec1="bot", spec2="bot", level=1, base_seed=0,
+                   workers=None, on_result=None, record=False):
+    """
+    Play n_matches across a process pool (workers defaults to the CPU
+    count; 1 runs in-process). on_result(result, report) is called in
+    the parent as each match finishes. Returns the TournamentReport.
+    """
+    workers = workers or multiprocessing.cpu_count()
+    tasks = [(i, match_seed(base_seed, i), level, spec1, spec2, record)
+             for i in range(n_matches)]
+    report = TournamentReport()
+
+    def collect(results):
+        for result in results:
+            report.add(result)
+            if on_result is not None:
+                on_result(result, report)
+
+    if workers == 1:
+        collect(map(play_match, tasks))
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            collect(pool.imap_unordered(play_match, tasks, chunksize=1))
+    return report
+
+def _print_progress(result, report):
+    if report.matches % 10 == 0:
+        print(f"  {report.matches} done, P1 {report.wins[0]} / P2 {report.wins[1]} / ties {report.ties}",
+              flush=True)
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    n = int(args[0]) if args else 100
+    workers = int(args[1]) if len(args) > 1 else None
+    specs = args[2:4] if len(args) > 3 else ("bot", "drop")
+    print(run_tournament(n, *specs, workers=workers, on_result=_print_progress).summary())